@@ -0,0 +1,189 @@
+"""
+Admission Control Module
+Estimates the cost of a request before it runs and schedules it on a fast
+or a bounded slow execution lane, rejecting work the slow lane cannot queue
+"""
+
+import math
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+
+# Evaluations of the integrand per integrate(...) and of the body per diff(...),
+# matching the engine's Calculus
+INTEGRAL_SAMPLES = 1001
+DIFF_SAMPLES = 2
+
+# Loop iterations charged for a factorial whose operand is not a literal
+MAX_FACTORIAL = 170
+
+# Rough cost of running the toolchain (g++, objdump) once, in node evaluations
+TOOLCHAIN_COST = 10 ** 7
+
+# Requests up to this cost run on the fast lane
+FAST_LANE_MAX_COST = 10 ** 5
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+)|([A-Za-z_]\w*)|(.))')
+
+
+def expression_cost(expression: str) -> int:
+    """
+    Estimate node evaluations for one evaluation of an expression
+
+    Works on tokens so it is cheap enough to run before parsing: every
+    token inside integrate(...) counts once per integration sample, inside
+    diff(...) once per difference quotient, and factorials add their loop
+    length (the literal operand, or the worst case).
+    """
+    multipliers = [1]
+    pending_call = 1
+    cost = 0
+    previous = None
+
+    for number, name, symbol in TOKEN_PATTERN.findall(expression):
+        scale = multipliers[-1]
+        if symbol == '(':
+            multipliers.append(scale * pending_call)
+            pending_call = 1
+        elif symbol == ')':
+            if len(multipliers) > 1:
+                multipliers.pop()
+        elif symbol == '!':
+            magnitude = MAX_FACTORIAL
+            if previous is not None and previous[0]:
+                magnitude = min(float(previous[0]), MAX_FACTORIAL)
+            cost += scale * int(magnitude)
+        elif name in ('integrate', 'diff'):
+            pending_call = INTEGRAL_SAMPLES if name == 'integrate' else DIFF_SAMPLES
+        elif name in ('nCr', 'nPr'):
+            cost += scale * 3 * MAX_FACTORIAL
+
+        if symbol not in ('(', ')', ','):
+            cost += scale
+        previous = (number, name, symbol)
+
+    return max(cost, 1)
+
+
+def nodes_cost(nodes: List[Dict[str, Any]]) -> int:
+    """Estimate node evaluations for one evaluation of a parsed (--ast) expression"""
+    costs = []
+    for node in nodes:
+        children = node.get('children', [])
+        inner = sum(costs[child] for child in children)
+        node_type = node['type']
+
+        if node_type == 'INTEGRATE_NODE':
+            cost = 1 + INTEGRAL_SAMPLES * inner
+        elif node_type == 'DIFF_NODE':
+            cost = 1 + DIFF_SAMPLES * inner
+        elif node_type == 'FACTORIAL' or (node_type == 'UNARY_OP' and node['op'] == '!'):
+            operand = nodes[children[0]]
+            magnitude = MAX_FACTORIAL
+            if operand['type'] == 'NUMBER' and operand['value'] is not None:
+                magnitude = min(max(operand['value'], 0), MAX_FACTORIAL)
+            cost = 1 + inner + int(magnitude)
+        elif node_type in ('NCR', 'NPR'):
+            cost = 1 + inner + 3 * MAX_FACTORIAL
+        else:
+            cost = 1 + inner
+        costs.append(cost)
+
+    return max(costs[-1] if costs else 1, 1)
+
+
+class LaneFull(Exception):
+    """Raised when a lane cannot accept more work; carries a retry hint"""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f'The {lane} lane is at capacity; retry in {retry_after}s')
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class Lane:
+    """A bounded pool of execution slots with a bounded wait queue"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 timeout: float, max_wait: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_wait = max_wait
+
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        # Exponentially weighted mean service time, for Retry-After
+        self.mean_seconds = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until a queued request would likely get a slot"""
+        backlog = (self.waiting + self.active) / self.max_concurrent
+        return max(1, math.ceil(backlog * self.mean_seconds))
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room in it"""
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise LaneFull(self.name, self.retry_after())
+
+                self.waiting += 1
+                try:
+                    deadline = time.monotonic() + self.max_wait
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected += 1
+                            raise LaneFull(self.name, self.retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            self.active += 1
+
+    def release(self, seconds: float):
+        """Free a slot and record how long it was held"""
+        with self._condition:
+            self.active -= 1
+            self.mean_seconds = 0.8 * self.mean_seconds + 0.2 * seconds
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current occupancy and limits"""
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'rejected': self.rejected,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'timeout': self.timeout,
+            'mean_seconds': round(self.mean_seconds, 4)
+        }
+
+
+class Scheduler:
+    """Routes requests to the fast or slow lane by estimated cost"""
+
+    def __init__(self, fast: Lane, slow: Lane, fast_max_cost: int = FAST_LANE_MAX_COST):
+        self.fast = fast
+        self.slow = slow
+        self.fast_max_cost = fast_max_cost
+
+    def lane_for(self, cost: Optional[float]) -> Lane:
+        """Unknown costs (None) go to the slow lane"""
+        return self.fast if cost is not None and cost <= self.fast_max_cost else self.slow
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy of both lanes"""
+        return {
+            'fast_max_cost': self.fast_max_cost,
+            'fast': self.fast.stats(),
+            'slow': self.slow.stats()
+        }
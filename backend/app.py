@@ -1,13 +1,36 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import subprocess
 import json
 import os
 import sys
-import tempfile
-import shutil
-import re
+import math
+import time
+import functools
+import concurrent.futures
+import numpy as np
 from object_analyzer import ObjectFileAnalyzer
+from object_catalog import ObjectCatalog, CatalogError, DIGEST
+from cpp_codegen import expression_to_cpp, parse_expression, CodegenError, KERNEL_ERRORS
+from jit_compiler import ExpressionJIT
+from expression_analyzer import ExpressionAnalyzer
+from job_queue import JobQueue
+from result_store import ResultStore, file_fingerprint
+from prepared import PreparedExpression, PreparedRegistry, BindingError
+from streaming import iter_line_blocks, stream_csv, stream_ndjson
+from plotting import adaptive_sample
+import binary_io
+from binary_io import BinaryFormatError
+from profiling import RequestProfiler
+from tracing import Tracer
+import fast_json
+from native_engine import NativeEngine, nesting_depth, MAX_DEPTH as NATIVE_MAX_DEPTH
+from live_compile import LiveCompiler
+from static_assets import StaticAssets
+from worksheet import Worksheet, WorksheetRegistry, WorksheetError
+from monte_carlo import MonteCarlo, ModelError, is_ratio, recognize
+from admission import (Lane, LaneFull, Scheduler, expression_cost, nodes_cost,
+                       TOOLCHAIN_COST)
 
 app = Flask(__name__, static_folder='../frontend')
 CORS(app)
@@ -17,22 +40,365 @@ COMPILER_PATH = os.path.join(os.path.dirname(__file__), '..', 'compiler', 'compi
 if not os.path.exists(COMPILER_PATH):
     COMPILER_PATH = os.path.join(os.path.dirname(__file__), '..', 'compiler', 'compiler')
 
+# The engine as a shared library (built by `make`), called in-process for
+# shallow fast-lane expressions. Slow-lane work still runs in a child process
+# so it can be killed on timeout, and deeply nested input in one because it
+# can overflow a thread's stack and crash the whole server
+native_engine = NativeEngine.load(os.path.dirname(COMPILER_PATH))
+
+def native_safe(expression):
+    """Whether an expression may run in-process without risking the server's stack"""
+    return native_engine is not None and nesting_depth(expression) <= NATIVE_MAX_DEPTH
+
+def run_engine(expression, stdin=False):
+    """Run the engine on one expression; returns a CompletedProcess"""
+    if g.lane is scheduler.fast and native_safe(expression):
+        with tracer.span('native engine'):
+            status, document = native_engine.compile(expression)
+        return subprocess.CompletedProcess(
+            native_engine.library_path, status,
+            document if status == 0 else '', document if status != 0 else ''
+        )
+    
+    if stdin:
+        return tracer.run([COMPILER_PATH], timeout=g.lane.timeout, input=expression)
+    return tracer.run([COMPILER_PATH, expression], timeout=g.lane.timeout)
+
+# Native kernel cache shared by all requests of this process
+jit = ExpressionJIT()
+
+# Expression optimization analysis; keeps the precompiled runtime prelude warm
+expression_analyzer = ExpressionAnalyzer()
+
+# Results shared by all server processes; preload the hottest into memory
+result_store = ResultStore()
+result_store.warm_up()
+
+# Parsed expressions by handle; handles are also persisted in the result
+# store so any worker can resolve them after eviction or a restart
+prepared_expressions = PreparedRegistry(max_entries=1024)
+
+# Cheap requests run on the fast lane; expensive ones share a few slow-lane
+# slots with a short queue and are turned away with 429 when it is full
+scheduler = Scheduler(
+    fast=Lane('fast', max_concurrent=32, max_queue=256, timeout=10, max_wait=5),
+    slow=Lane('slow', max_concurrent=max(1, (os.cpu_count() or 1) // 2), max_queue=8,
+              timeout=60, max_wait=30)
+)
+
+# Native kernels and NumPy batches cost this many times less per value
+# than an engine evaluation
+NATIVE_SPEEDUP = 100
+VECTOR_SPEEDUP = 10
+
+def admitted(estimate):
+    """
+    Run a view on the lane chosen by its estimated cost
+    
+    estimate receives the view's arguments and returns a cost in node
+    evaluations, or None when it cannot tell (slow lane). The lane is held
+    until a streamed response has been fully sent.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with tracer.span('cost estimate'):
+                try:
+                    cost = estimate(*args, **kwargs)
+                except Exception:
+                    cost = None
+            lane = scheduler.lane_for(cost)
+            tracer.annotate(lane=lane.name, cost=cost)
+            
+            try:
+                with tracer.span('lane wait'):
+                    lane.acquire()
+            except LaneFull as e:
+                response = jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'lane': e.lane
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            
+            g.lane = lane
+            start = time.perf_counter()
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except Exception:
+                lane.release(time.perf_counter() - start)
+                raise
+            
+            if response.is_streamed:
+                response.call_on_close(lambda: lane.release(time.perf_counter() - start))
+            else:
+                lane.release(time.perf_counter() - start)
+            response.headers['X-Lane'] = lane.name
+            return response
+        return wrapper
+    return decorator
+
+def request_expression_cost():
+    """Cost of evaluating the expression in a JSON body once"""
+    return expression_cost((request.get_json(silent=True) or {}).get('expression', ''))
+
+def pnc_cost():
+    """The expression once, plus any simulated trials (batched in NumPy)"""
+    data = request.get_json(silent=True) or {}
+    cost = expression_cost(data.get('expression', ''))
+    options = simulation_options(data)
+    if options is not None:
+        cost += options[0] // VECTOR_SPEEDUP
+    return cost
+
+def jit_cost():
+    """Values times per-value cost, plus a compile if the kernel is not loaded"""
+    if request.mimetype == 'application/octet-stream':
+        data, count = request.args, (request.content_length or 0) // 8
+    else:
+        data = request.get_json(silent=True) or {}
+        if 'path' in data:
+            return None
+        count = len(data.get('values') or [])
+    expression = data.get('expression', '')
+    cost = expression_cost(expression) * count // NATIVE_SPEEDUP
+    if not jit.has_kernel(expression.strip(), data.get('variable', 'x')):
+        cost += TOOLCHAIN_COST
+    return cost
+
+def worksheet_cost(worksheet_id=None):
+    """The submitted definitions once each; downstream re-evaluations are not known yet"""
+    definitions = (request.get_json(silent=True) or {}).get('definitions') or {}
+    return sum(expression_cost(expression) for expression in definitions.values()
+               if isinstance(expression, str))
+
+def prepared_cost(handle):
+    """Rows times the prepared expression's per-row cost"""
+    prepared = get_prepared(handle)
+    if prepared is None:
+        return 1
+    if request.mimetype == 'application/octet-stream':
+        rows = (request.content_length or 0) // (8 * max(len(prepared.variables), 1))
+    else:
+        data = request.get_json(silent=True) or {}
+        if 'path' in data:
+            return None
+        bindings = data.get('bindings', {})
+        if isinstance(bindings, list):
+            rows = len(bindings)
+        else:
+            rows = max([len(v) for v in bindings.values() if isinstance(v, list)] or [1])
+    return nodes_cost(prepared.nodes) * max(rows // VECTOR_SPEEDUP, 1)
+
+# Adaptive plot sampling limits
+PLOT_DEFAULT_POINTS = 2000
+PLOT_MAX_POINTS = 20000
+PLOT_MAX_PIXELS = 10000
+
+def plot_cost():
+    """Per-point cost times the point budget, vectorized"""
+    data = request.get_json(silent=True) or {}
+    points = data.get('maxPoints', PLOT_DEFAULT_POINTS)
+    if not isinstance(points, int):
+        points = PLOT_DEFAULT_POINTS
+    return expression_cost(str(data.get('expression', ''))) * max(points // VECTOR_SPEEDUP, 1)
+
+# Directory that bulk endpoints may memory-map input files from (disabled if unset)
+DATA_DIR = os.environ.get('SEC_DATA_DIR')
+
+# Toolchain builds run one job at a time on at most half the CPUs so they
+# cannot starve evaluation requests
+toolchain_jobs = JobQueue(max_workers=1)
+TOOLCHAIN_PROCESSES = max(1, (os.cpu_count() or 1) // 2)
+
+def submit_build(levels, force=False):
+    """Queue an object file build, attaching to an identical one in flight"""
+    compiler_dir = os.path.join(os.path.dirname(__file__), '..', 'compiler')
+    analyzer = ObjectFileAnalyzer(compiler_dir, result_store)
+    return toolchain_jobs.submit(
+        'build', (tuple(levels), force),
+        analyzer.build_object_files, levels, force, TOOLCHAIN_PROCESSES
+    )
+
+# Opt-in profiling: ?profile=1 or an X-Profile: 1 header, or a sampled
+# fraction of requests (SEC_PROFILE_RATE); off by default
+profiler = RequestProfiler(sample_rate=float(os.environ.get('SEC_PROFILE_RATE', 0)))
+
+# Every request is traced as a sequence of timed spans; the most recent
+# traces are kept in memory and optionally appended to SEC_TRACE_FILE
+tracer = Tracer(
+    capacity=int(os.environ.get('SEC_TRACE_CAPACITY', 256)),
+    export_path=os.environ.get('SEC_TRACE_FILE')
+)
+
+@app.before_request
+def start_trace():
+    tracer.begin(f'{request.method} {request.path}')
+
+@app.after_request
+def finish_trace(response):
+    # Streamed bodies are produced after this point and are not included
+    tracer.end(response.status_code)
+    return response
+
+@app.teardown_request
+def abandon_trace(exc):
+    # after_request does not run when a handler raises
+    if tracer.current() is not None:
+        tracer.end(500)
+
+@app.route('/api/debug/traces', methods=['GET'])
+def list_traces():
+    """
+    List recent request traces
+    
+    Query parameters:
+    - sort: slowest (default) or recent
+    - limit: maximum number of traces (default: all kept)
+    
+    Returns:
+    {
+        "success": true,
+        "traces": [
+            {
+                "id": "...", "name": "POST /api/compile", "status": 200, "duration_ms": 9.8,
+                "tags": {"lane": "fast", "cost": 12, "cache": "miss"},
+                "spans": [{"name": "subprocess spawn", "offset_ms": 0.9, "duration_ms": 1.7}, ...]
+            },
+            ...
+        ]
+    }
+    """
+    order = request.args.get('sort', 'slowest')
+    if order not in ('slowest', 'recent'):
+        return jsonify({
+            'success': False,
+            'error': 'sort must be slowest or recent'
+        }), 400
+    
+    try:
+        limit = int(request.args.get('limit', 0))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit must be an integer'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'traces': tracer.traces(order, limit)
+    })
+
+@app.before_request
+def start_profile():
+    explicit = request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+    if profiler.wanted(explicit):
+        g.profile = profiler.start()
+        g.profile_skipped = g.profile is None and explicit
+
+@app.after_request
+def finish_profile(response):
+    session = g.pop('profile', None)
+    if session is not None:
+        # Streamed bodies are produced after this point and are not included
+        report = profiler.finish(session, f'{request.method} {request.path}', response.status_code)
+        response.headers['X-Profile-Id'] = report['id']
+    elif g.pop('profile_skipped', False):
+        response.headers['X-Profile-Skipped'] = 'another request is being profiled'
+    return response
+
+@app.teardown_request
+def stop_profile(exc):
+    # after_request does not run when a handler raises
+    session = g.pop('profile', None)
+    if session is not None:
+        profiler.stop(session)
+
+@app.route('/api/debug/profiles', methods=['GET'])
+def list_profiles():
+    """List stored profile reports, newest first"""
+    return jsonify({
+        'success': True,
+        'profiles': profiler.list()
+    })
+
+@app.route('/api/debug/profiles/<report_id>', methods=['GET'])
+def get_profile(report_id):
+    """
+    Get one profile report
+    
+    Returns:
+    {
+        "success": true,
+        "profile": {
+            "id": "...", "request": "POST /api/compile", "status": 200, "wall_ms": 12.4,
+            "subprocess": {"spawn_ms": 1.9, "wait_ms": 8.7, "cpu": {"user_ms": 3.1, "system_ms": 1.2}},
+            "hotspots": [{"function": "...", "calls": 1, "self_ms": 8.5, "cumulative_ms": 8.7}, ...]
+        }
+    }
+    """
+    report = profiler.get(report_id)
+    if report is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown profile: {report_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'profile': report
+    })
+
+# The frontend, fingerprinted and gzipped once at startup; restart the
+# server to pick up edits
+static_assets = StaticAssets(app.static_folder)
+
+def serve_asset(url):
+    """Serve a frontend file from memory, or 404"""
+    response = static_assets.response(url, request)
+    if response is None:
+        return jsonify({
+            'success': False,
+            'error': 'Endpoint not found'
+        }), 404
+    return response
+
 @app.route('/')
 def index():
     """Serve the main HTML page"""
-    return send_from_directory(app.static_folder, 'index.html')
+    return serve_asset('/index.html')
 
 @app.route('/js/<path:filename>')
 def serve_js(filename):
     """Serve JavaScript files"""
-    return send_from_directory(os.path.join(app.static_folder, 'js'), filename)
+    return serve_asset('/js/' + filename)
 
 @app.route('/css/<path:filename>')
 def serve_css(filename):
     """Serve CSS files"""
-    return send_from_directory(os.path.join(app.static_folder, 'css'), filename)
+    return serve_asset('/css/' + filename)
+
+def etagged(view):
+    """
+    Tag a deterministic GET report with a hash of its body
+    
+    Clients revalidating with If-None-Match get 304 without the body when
+    the report has not changed.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        response.add_etag()
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    return wrapper
 
 @app.route('/api/compile', methods=['POST'])
+@admitted(request_expression_cost)
 def compile_expression():
     """
     Endpoint to compile and evaluate mathematical expressions
@@ -56,7 +422,8 @@ def compile_expression():
     }
     """
     try:
-        data = request.get_json()
+        with tracer.span('request parse'):
+            data = request.get_json()
         
         if not data or 'expression' not in data:
             return jsonify({
@@ -79,27 +446,32 @@ def compile_expression():
                 'error': f'Compiler not found. Please build the C++ compiler first. Looking for: {COMPILER_PATH}'
             }), 500
         
+        # Reuse a result from any worker, keyed by the exact compiler binary
+        with tracer.span('cache lookup'):
+            cache_key = result_store.make_key('compile', file_fingerprint(COMPILER_PATH), expression)
+            cached = result_store.get_text(cache_key)
+        tracer.annotate(cache='hit' if cached is not None else 'miss')
+        if cached is not None:
+            return app.response_class(cached, mimetype='application/json')
+        
         # Run the C++ compiler
         try:
-            result = subprocess.run(
-                [COMPILER_PATH, expression],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            result = run_engine(expression)
             
-            # Parse the JSON output from the compiler
+            # The compiler's JSON is forwarded as is, never decoded; only its
+            # framing is checked
             if result.returncode == 0:
-                try:
-                    output = json.loads(result.stdout)
-                    return jsonify(output)
-                except json.JSONDecodeError:
+                with tracer.span('output check'):
+                    valid = fast_json.is_engine_success(result.stdout)
+                if not valid:
                     return jsonify({
                         'success': False,
                         'error': 'Invalid JSON output from compiler',
                         'stdout': result.stdout,
                         'stderr': result.stderr
                     }), 500
+                result_store.put_text(cache_key, 'compile', result.stdout)
+                return app.response_class(result.stdout, mimetype='application/json')
             else:
                 # Try to parse error as JSON
                 try:
@@ -137,40 +509,60 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'compiler_path': COMPILER_PATH,
-        'compiler_exists': compiler_exists
+        'compiler_exists': compiler_exists,
+        'native_engine': native_engine.library_path if native_engine else None,
+        'result_store': result_store.stats(),
+        'lanes': scheduler.stats(),
+        'live': live_compiler.stats(),
+        'static_assets': static_assets.stats(),
+        'object_catalog': object_catalog.stats()
     })
 
 @app.route('/api/analyze/build', methods=['POST'])
 def build_object_files():
     """
-    Build object files with different optimization levels
+    Queue a build of object files with different optimization levels
     
-    Returns:
+    Optional JSON input:
+    {
+        "levels": ["O0", "O1", "O2", "O3", "Os", "O2-native"],
+        "force": false,
+        "wait": false
+    }
+    
+    Profiles are built in parallel; unchanged profiles are reused unless force is set.
+    The build runs in the background: poll /api/jobs/<id> or stream
+    /api/jobs/<id>/events. An identical build already in progress is reused.
+    With "wait": true the response is sent once the build has finished.
+    
+    Returns (202):
     {
         "success": true,
-        "built": [
-            {"level": "O0", "file": "...", "size": 12345},
-            {"level": "O2", "file": "...", "size": 10234}
-        ]
+        "job": {"id": "...", "kind": "build", "status": "queued", "progress": [], ...},
+        "created": true
     }
     """
     try:
-        compiler_dir = os.path.join(os.path.dirname(__file__), '..', 'compiler')
-        analyzer = ObjectFileAnalyzer(compiler_dir)
+        data = request.get_json(silent=True) or {}
+        levels = data.get('levels', list(ObjectFileAnalyzer.DEFAULT_PROFILES))
         
-        result = analyzer.build_object_files()
-        
-        if result['status'] == 'success':
-            return jsonify({
-                'success': True,
-                'data': result
-            })
-        else:
+        if not levels or any(level not in ObjectFileAnalyzer.OPTIMIZATION_PROFILES for level in levels):
             return jsonify({
                 'success': False,
-                'error': result.get('error', 'Build failed'),
-                'data': result
-            }), 500
+                'error': 'Invalid optimization levels. Use: ' + ', '.join(ObjectFileAnalyzer.OPTIMIZATION_PROFILES)
+            }), 400
+        
+        job, created = submit_build(levels, bool(data.get('force', False)))
+        
+        if data.get('wait'):
+            job = toolchain_jobs.wait(job['id'])
+            return job_response(job)
+        
+        return jsonify({
+            'success': True,
+            'job': job,
+            'created': created
+        }), 202
     
     except Exception as e:
         return jsonify({
@@ -178,27 +570,193 @@ def build_object_files():
             'error': f'Build error: {str(e)}'
         }), 500
 
+def job_response(job):
+    """Render a job's state; finished builds carry their result as data"""
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'success': True, 'job': job})
+    
+    result = job['result'] or {}
+    if job['status'] == 'success' and result.get('status') == 'success':
+        return jsonify({'success': True, 'job': job, 'data': result})
+    
+    return jsonify({
+        'success': False,
+        'error': job['error'] or result.get('error', result.get('message', 'Build failed')),
+        'job': job,
+        'data': result
+    }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the state of a background job
+    
+    Query parameters:
+    - wait: seconds to wait for the job to finish (default: 0, max: 30)
+    """
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), 30.0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'wait must be a number'}), 400
+    
+    job = toolchain_jobs.wait(job_id, timeout=wait) if wait else toolchain_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown job: {job_id}'}), 404
+    
+    return job_response(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """
+    Stream job progress as server-sent events
+    
+    Each event carries the job state as JSON; the stream ends when the job finishes.
+    """
+    job = toolchain_jobs.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Unknown job: {job_id}'}), 404
+    
+    def events(job):
+        while True:
+            yield f"data: {json.dumps(job)}\n\n"
+            if job['status'] not in ('queued', 'running'):
+                return
+            # Bounded waits double as keep-alives for idle connections
+            job = toolchain_jobs.wait(job_id, version=job['version'], timeout=15) or job
+    
+    return Response(stream_with_context(events(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+def live_run(expression, on_process):
+    """Compile for a live session: in-process when cheap, else in a killable child"""
+    if native_safe(expression) and expression_cost(expression) <= scheduler.fast_max_cost:
+        return native_engine.compile(expression)
+    
+    process = subprocess.Popen(
+        [COMPILER_PATH, expression],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    on_process(process)
+    try:
+        stdout, stderr = process.communicate(timeout=scheduler.slow.timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return 1, json.dumps({'success': False, 'error': 'Compilation timeout'})
+    return process.returncode, stdout if process.returncode == 0 else stderr
+
+def store_live_result(expression, status, document):
+    if status == 0:
+        cache_key = result_store.make_key('compile', file_fingerprint(COMPILER_PATH), expression)
+        result_store.put_text(cache_key, 'compile', document)
+
+# Live previews: one in-flight compile per session, superseded by newer input
+# and shared between sessions typing the same expression
+live_compiler = LiveCompiler(live_run, max_workers=max(2, os.cpu_count() or 1),
+                             on_result=store_live_result)
+
+def valid_session_id(session_id):
+    return 8 <= len(session_id) <= 64 and all(c.isalnum() or c in '-_' for c in session_id)
+
+@app.route('/api/live/<session_id>', methods=['POST'])
+def live_compile(session_id):
+    """
+    Submit the latest input of a live-preview session
+    
+    Expected JSON input:
+    {
+        "expression": "sin(x",
+        "seq": 7            (increases with every input; older inputs are ignored)
+    }
+    
+    The result arrives on /api/live/<session_id>/events. Pending work for
+    the session's previous input is cancelled.
+    
+    Returns (202):
+    {"success": true, "seq": 7, "cached": false, "coalesced": false}
+    """
+    if not valid_session_id(session_id):
+        return jsonify({
+            'success': False,
+            'error': 'Session ids are 8-64 letters, digits, - or _'
+        }), 400
+    
+    data = request.get_json(silent=True) or {}
+    expression = str(data.get('expression', '')).strip()
+    seq = data.get('seq')
+    if not isinstance(seq, int) or isinstance(seq, bool):
+        return jsonify({
+            'success': False,
+            'error': 'seq must be an integer'
+        }), 400
+    if not expression:
+        return jsonify({
+            'success': False,
+            'error': 'Empty expression'
+        }), 400
+    
+    cache_key = result_store.make_key('compile', file_fingerprint(COMPILER_PATH), expression)
+    submitted = live_compiler.submit(session_id, seq, expression, cached=result_store.get_text(cache_key))
+    if submitted is None:
+        return jsonify({
+            'success': False,
+            'error': 'A newer input was already submitted',
+            'seq': seq
+        }), 409
+    
+    return jsonify(dict(submitted, success=True, seq=seq)), 202
+
+@app.route('/api/live/<session_id>/events', methods=['GET'])
+def live_events(session_id):
+    """
+    Stream a live-preview session's results as server-sent events
+    
+    Each event is {"seq": 7, "expression": "...", "output": {...}} where
+    output is the /api/compile response for that input. Only the newest
+    result is sent; results superseded while the client was busy are skipped.
+    """
+    if not valid_session_id(session_id):
+        return jsonify({
+            'success': False,
+            'error': 'Session ids are 8-64 letters, digits, - or _'
+        }), 400
+    
+    def events():
+        # Sends the headers right away so the client sees the stream open
+        yield ": connected\n\n"
+        version = 0
+        while True:
+            # Bounded waits double as keep-alives for idle connections
+            event, version = live_compiler.wait(session_id, version, timeout=15)
+            yield f"data: {event}\n\n" if event is not None else ": keep-alive\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/analyze/object', methods=['GET'])
+@etagged
 def analyze_object():
     """
     Perform complete object file analysis
     
     Query parameters:
-    - level: O0 or O2 (default: O0)
+    - level: O0, O1, O2, O3, Os or O2-native (default: O0)
     
     Returns complete analysis including disassembly, symbols, sections, and size
     """
     try:
         opt_level = request.args.get('level', 'O0')
         
-        if opt_level not in ['O0', 'O2']:
+        if opt_level not in ObjectFileAnalyzer.OPTIMIZATION_PROFILES:
             return jsonify({
                 'success': False,
-                'error': 'Invalid optimization level. Use O0 or O2'
+                'error': 'Invalid optimization level. Use: ' + ', '.join(ObjectFileAnalyzer.OPTIMIZATION_PROFILES)
             }), 400
         
         compiler_dir = os.path.join(os.path.dirname(__file__), '..', 'compiler')
-        analyzer = ObjectFileAnalyzer(compiler_dir)
+        analyzer = ObjectFileAnalyzer(compiler_dir, result_store)
         
         # Check if object file exists
         obj_file = analyzer.object_files.get(opt_level)
@@ -224,6 +782,7 @@ def analyze_object():
         }), 500
 
 @app.route('/api/analyze/optimization', methods=['GET'])
+@etagged
 def compare_optimizations():
     """
     Compare -O0 vs -O2 optimization results
@@ -232,11 +791,12 @@ def compare_optimizations():
     """
     try:
         compiler_dir = os.path.join(os.path.dirname(__file__), '..', 'compiler')
-        analyzer = ObjectFileAnalyzer(compiler_dir)
+        analyzer = ObjectFileAnalyzer(compiler_dir, result_store)
         
         # Check if both object files exist
         missing_files = []
-        for level, path in analyzer.object_files.items():
+        for level in ObjectFileAnalyzer.DEFAULT_PROFILES:
+            path = analyzer.object_files[level]
             if not os.path.exists(path):
                 missing_files.append(f'{level}: {path}')
         
@@ -261,25 +821,87 @@ def compare_optimizations():
             'error': f'Comparison error: {str(e)}'
         }), 500
 
+@app.route('/api/analyze/matrix', methods=['GET'])
+@etagged
+@admitted(lambda: TOOLCHAIN_COST)
+def compare_optimization_matrix():
+    """
+    Compare every optimization profile in one response
+    
+    Query parameters:
+    - levels: comma-separated profiles (default: O0,O1,O2,O3,Os,O2-native);
+      the first one is the baseline for reductions
+    
+    Missing or out-of-date profiles are built first, in parallel.
+    
+    Returns:
+    {
+        "success": true,
+        "data": {
+            "baseline": "O0",
+            "profiles": {
+                "O2": {"flags": "-O2", "instructions": 4321, "functions": 120,
+                       "size": {...}, "symbols": 310,
+                       "instruction_reduction_percent": 41.2, "size_reduction_percent": 30.5},
+                ...
+            }
+        }
+    }
+    """
+    try:
+        levels = request.args.get('levels', ','.join(ObjectFileAnalyzer.OPTIMIZATION_PROFILES)).split(',')
+        
+        if any(level not in ObjectFileAnalyzer.OPTIMIZATION_PROFILES for level in levels):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid optimization levels. Use: ' + ', '.join(ObjectFileAnalyzer.OPTIMIZATION_PROFILES)
+            }), 400
+        
+        compiler_dir = os.path.join(os.path.dirname(__file__), '..', 'compiler')
+        analyzer = ObjectFileAnalyzer(compiler_dir, result_store)
+        
+        # Missing profiles are built through the shared queue, never inline
+        if not all(analyzer.is_current(level) for level in levels):
+            job, _ = submit_build(levels)
+            job = toolchain_jobs.wait(job['id'])
+            build = job['result'] or {'status': 'error', 'error': job['error']}
+            if build['status'] == 'error':
+                return jsonify({
+                    'success': False,
+                    'error': build.get('error', build.get('message', 'Build failed'))
+                }), 500
+        
+        return jsonify({
+            'success': True,
+            'data': analyzer.compare_profiles(levels)
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Comparison error: {str(e)}'
+        }), 500
+
 @app.route('/api/analyze/disassembly', methods=['GET'])
+@etagged
 def get_disassembly():
     """
     Get detailed disassembly for specific optimization level
     
     Query parameters:
-    - level: O0 or O2 (default: O0)
+    - level: O0, O1, O2, O3, Os or O2-native (default: O0)
     """
     try:
         opt_level = request.args.get('level', 'O0')
         
-        if opt_level not in ['O0', 'O2']:
+        if opt_level not in ObjectFileAnalyzer.OPTIMIZATION_PROFILES:
             return jsonify({
                 'success': False,
-                'error': 'Invalid optimization level. Use O0 or O2'
+                'error': 'Invalid optimization level. Use: ' + ', '.join(ObjectFileAnalyzer.OPTIMIZATION_PROFILES)
             }), 400
         
         compiler_dir = os.path.join(os.path.dirname(__file__), '..', 'compiler')
-        analyzer = ObjectFileAnalyzer(compiler_dir)
+        analyzer = ObjectFileAnalyzer(compiler_dir, result_store)
         
         disassembly = analyzer.get_disassembly(opt_level)
         
@@ -300,204 +922,872 @@ def get_disassembly():
             'error': f'Disassembly error: {str(e)}'
         }), 500
 
-def expression_to_cpp(expression):
-    """
-    Convert a mathematical expression to standalone C++ code
-    Supports: arithmetic, factorial, nCr, nPr, differentiation, integration, trig functions
-    """
-    # Add necessary math functions and constants
-    cpp_code = """#include <iostream>
-#include <cmath>
-#include <functional>
+# Uploaded objects by content hash, indexed once per file
+object_catalog = ObjectCatalog(os.environ.get('SEC_OBJECT_DIR'))
 
-#ifndef M_PI
-#define M_PI 3.14159265358979323846
-#endif
-
-#ifndef M_E
-#define M_E 2.71828182845904523536
-#endif
+def catalog_entry(digest):
+    """The summary of a stored object, or a 404 response"""
+    summary = object_catalog.summary(digest) if DIGEST.match(digest) else None
+    if summary is None:
+        return None, (jsonify({
+            'success': False,
+            'error': f'Unknown object: {digest}'
+        }), 404)
+    return summary, None
 
-// Factorial function
-double factorial(double n) {
-    if (n < 0 || n != floor(n)) return -1;
-    if (n > 170) return -1;
-    double result = 1.0;
-    for (int i = 2; i <= (int)n; i++) {
-        result *= i;
-    }
-    return result;
-}
-
-// nCr function
-double nCr(double n, double r) {
-    if (n < 0 || r < 0 || r > n) return -1;
-    if (n != floor(n) || r != floor(r)) return -1;
-    double n_fact = factorial(n);
-    double r_fact = factorial(r);
-    double nr_fact = factorial(n - r);
-    return n_fact / (r_fact * nr_fact);
-}
-
-// nPr function
-double nPr(double n, double r) {
-    if (n < 0 || r < 0 || r > n) return -1;
-    if (n != floor(n) || r != floor(r)) return -1;
-    double n_fact = factorial(n);
-    double nr_fact = factorial(n - r);
-    return n_fact / nr_fact;
-}
-
-// Numerical differentiation using central difference method
-double differentiate(std::function<double(double)> f, double x, double h = 1e-5) {
-    return (f(x + h) - f(x - h)) / (2.0 * h);
-}
-
-// Numerical integration using Simpson's rule
-double integrate(std::function<double(double)> f, double a, double b, int n = 1000) {
-    if (n % 2 == 1) n++; // Simpson's rule requires even number of intervals
-    double h = (b - a) / n;
-    double sum = f(a) + f(b);
-    
-    for (int i = 1; i < n; i++) {
-        double x = a + i * h;
-        sum += (i % 2 == 0) ? 2.0 * f(x) : 4.0 * f(x);
+@app.route('/api/objects', methods=['POST'])
+@admitted(lambda: TOOLCHAIN_COST)
+def upload_object():
+    """
+    Store an object file or binary and index its functions
+    
+    Send the file as the raw body (Content-Type: application/octet-stream,
+    optional ?name=) or as the "file" field of a multipart form. Files are
+    stored by SHA-256; uploading one already indexed returns its summary
+    without running the toolchain again.
+    
+    Returns (201 when new, 200 when already stored):
+    {
+        "success": true,
+        "created": true,
+        "object": {
+            "digest": "7bc3e345...", "name": "compiler", "bytes": 229592,
+            "functions": 347, "instructions": 30075, "function_bytes": 134697,
+            "sections": [...], "size": {...}, "symbols": {"global": 36, ...},
+            "instruction_frequency": {"mov": 9113, ...}, "index_seconds": 0.49
+        }
     }
+    """
+    if (request.content_length or 0) > object_catalog.max_bytes:
+        return jsonify({
+            'success': False,
+            'error': f'Object file exceeds {object_catalog.max_bytes} bytes'
+        }), 413
     
-    return sum * h / 3.0;
-}
-
-int main() {
-    double result = """
-    
-    # Convert expression to C++ syntax
-    cpp_expr = expression
-    
-    # Replace constants with word boundaries (don't replace 'e' in 'integrate')
-    cpp_expr = re.sub(r'\bpi\b', 'M_PI', cpp_expr)
-    cpp_expr = re.sub(r'\be\b', 'M_E', cpp_expr)
-    
-    # Check if expression contains calculus operations
-    has_calculus = 'diff(' in expression or 'integrate(' in expression
-    
-    # Handle differentiation: diff(expr, var, point)
-    # Example: diff(x^2, x, 3) -> differentiate([](double x){ return pow(x, 2); }, 3)
-    diff_pattern = r'diff\(([^,]+),\s*(\w+),\s*([^)]+)\)'
-    diff_matches = re.findall(diff_pattern, cpp_expr)
-    
-    for expr, var, point in diff_matches:
-        # Clean up the expression
-        expr = expr.strip()
-        # Replace variable with lambda parameter
-        lambda_expr = expr.replace(var, var)  # Keep var as-is for now, will be in lambda
-        # Handle power in lambda expression
-        lambda_expr = lambda_expr.replace('^', '**POWER**')  # Temp marker
-        while '**POWER**' in lambda_expr:
-            lambda_expr = re.sub(r'(\w+|\d+\.?\d*|\([^)]+\))\s*\*\*POWER\*\*\s*(\w+|\d+\.?\d*|\([^)]+\))', 
-                                r'pow(\1, \2)', lambda_expr)
-        
-        # Create lambda function
-        lambda_code = f'[](double {var}){{ return {lambda_expr}; }}'
-        replacement = f'differentiate({lambda_code}, {point})'
-        
-        # Replace in cpp_expr
-        original = f'diff({expr}, {var}, {point})'
-        cpp_expr = cpp_expr.replace(original, replacement)
-    
-    # Handle integration: integrate(expr, var, lower, upper)
-    # Example: integrate(x^2, x, 0, 3) -> integrate([](double x){ return pow(x, 2); }, 0, 3)
-    integrate_pattern = r'integrate\(([^,]+),\s*(\w+),\s*([^,]+),\s*([^)]+)\)'
-    integrate_matches = re.findall(integrate_pattern, cpp_expr)
-    
-    for expr, var, lower, upper in integrate_matches:
-        # Clean up the expression
-        expr = expr.strip()
-        # Handle power in lambda expression
-        lambda_expr = expr.replace(var, var)
-        lambda_expr = lambda_expr.replace('^', '**POWER**')
-        while '**POWER**' in lambda_expr:
-            lambda_expr = re.sub(r'(\w+|\d+\.?\d*|\([^)]+\))\s*\*\*POWER\*\*\s*(\w+|\d+\.?\d*|\([^)]+\))', 
-                                r'pow(\1, \2)', lambda_expr)
-        
-        # Create lambda function
-        lambda_code = f'[](double {var}){{ return {lambda_expr}; }}'
-        replacement = f'integrate({lambda_code}, {lower}, {upper})'
-        
-        # Replace in cpp_expr
-        original = f'integrate({expr}, {var}, {lower}, {upper})'
-        cpp_expr = cpp_expr.replace(original, replacement)
-    
-    # Handle factorial (convert 5! to factorial(5))
-    # Match number or parenthesized expression followed by !
-    cpp_expr = re.sub(r'(\d+\.?\d*)\s*!', r'factorial(\1)', cpp_expr)
-    cpp_expr = re.sub(r'\(([^)]+)\)\s*!', r'factorial(\1)', cpp_expr)
-    
-    # Handle power operator ^ (convert to pow function)
-    # This handles x^y including nested expressions
-    while '^' in cpp_expr:
-        cpp_expr = re.sub(r'(\w+|\d+\.?\d*|\([^)]+\))\s*\^\s*(\w+|\d+\.?\d*|\([^)]+\))', r'pow(\1, \2)', cpp_expr)
-    
-    # Handle mathematical functions (already in C++ math.h)
-    # These work as-is: sin, cos, tan, asin, acos, atan, log, ln->log, exp, sqrt, abs, etc.
-    cpp_expr = cpp_expr.replace('ln(', 'log(')  # ln is log in C++
-    cpp_expr = cpp_expr.replace('cbrt(', 'cbrt(')  # cube root is already cbrt
-    
-    cpp_code += cpp_expr + ";\n"
-    cpp_code += "    std::cout << result << std::endl;\n"
-    cpp_code += "    return 0;\n"
-    cpp_code += "}\n"
-    
-    return cpp_code
-
-@app.route('/api/test/cpp-gen', methods=['POST'])
-def test_cpp_generation():
-    """Test endpoint to verify C++ code generation"""
     try:
-        data = request.get_json()
-        expression = data.get('expression', '2+3')
-        cpp_code = expression_to_cpp(expression)
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, name = upload.stream, upload.filename or 'upload'
+        else:
+            stream, name = request.stream, request.args.get('name', 'upload')
+        with tracer.span('index'):
+            summary, created = object_catalog.add(stream, os.path.basename(name))
         return jsonify({
             'success': True,
-            'expression': expression,
-            'cpp_code': cpp_code
-        })
-    except Exception as e:
+            'created': created,
+            'object': summary
+        }), 201 if created else 200
+    
+    except CatalogError as e:
         return jsonify({
             'success': False,
             'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Indexing error: {str(e)}'
         }), 500
 
-@app.route('/api/object/analyze-expression', methods=['POST'])
-def analyze_expression_optimization():
+@app.route('/api/objects', methods=['GET'])
+def list_objects():
+    """Stored objects, newest first"""
+    return jsonify({
+        'success': True,
+        'objects': object_catalog.objects()
+    })
+
+@app.route('/api/objects/<digest>', methods=['GET'])
+@etagged
+def get_object(digest):
+    """Summary of a stored object: sections, sizes, symbol counts and instruction totals"""
+    summary, error = catalog_entry(digest)
+    if error:
+        return error
+    return jsonify({
+        'success': True,
+        'object': summary
+    })
+
+@app.route('/api/objects/<digest>/functions', methods=['GET'])
+@etagged
+def get_object_functions(digest):
     """
-    Analyze optimization for a specific mathematical expression
+    A page of a stored object's function index
     
-    Generates C++ code for the expression, compiles it with -O0 and -O2,
-    and compares the resulting binaries
+    Query parameters:
+    - sort: size (default), instructions or address
+    - limit: functions per page (default: 20, at most 1000)
+    - offset: functions to skip (default: 0)
+    - match: only functions whose demangled name contains this text
     
-    Expected JSON input:
-    {
-        "expression": "2 + 3 * 4"
-    }
+    Each function has its symbol, demangled name, section, address, size,
+    binding, instruction count and mnemonic histogram.
+    """
+    _, error = catalog_entry(digest)
+    if error:
+        return error
     
-    Returns:
-    {
-        "success": true,
-        "expression": "2 + 3 * 4",
-        "cpp_code": "...",
-        "O0": {
-            "size": 12345,
-            "assembly_lines": 150,
-            "assembly": "..."
-        },
-        "O2": {
-            "size": 8000,
-            "assembly_lines": 45,
+    try:
+        limit = min(int(request.args.get('limit', 20)), 1000)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit must be a positive and offset a non-negative integer'
+        }), 400
+    
+    try:
+        page = object_catalog.functions(digest, request.args.get('sort', 'size'), limit, offset,
+                                        request.args.get('match'))
+    except CatalogError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    page['success'] = True
+    return jsonify(page)
+
+@app.route('/api/objects/<digest>/function', methods=['GET'])
+@etagged
+def get_object_function(digest):
+    """
+    Disassembly of one function of a stored object
+    
+    Query parameters:
+    - symbol: mangled symbol or demangled name (required)
+    
+    Returns every function with that name (local functions may repeat),
+    each with its index entry and instructions [{"address", "code"}].
+    """
+    _, error = catalog_entry(digest)
+    if error:
+        return error
+    
+    symbol = request.args.get('symbol')
+    if not symbol:
+        return jsonify({
+            'success': False,
+            'error': 'symbol is required'
+        }), 400
+    
+    functions = object_catalog.function(digest, symbol)
+    if not functions:
+        return jsonify({
+            'success': False,
+            'error': f'No function named {symbol}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'functions': functions
+    })
+
+@app.route('/api/objects/<digest>/diff/<other>', methods=['GET'])
+@etagged
+def diff_objects(digest, other):
+    """
+    Compare two stored objects function by function
+    
+    Query parameters:
+    - limit: entries per list (default: 50, at most 1000)
+    - symbol: instead, a unified diff of this function's instructions
+    
+    Functions are matched by symbol and count as changed when their
+    instructions differ beyond addresses that move with the layout.
+    Returns totals, mnemonic count changes and the added, removed and
+    changed functions, largest change first.
+    """
+    for key in (digest, other):
+        _, error = catalog_entry(key)
+        if error:
+            return error
+    
+    symbol = request.args.get('symbol')
+    if symbol:
+        diff = object_catalog.diff_function(digest, other, symbol)
+        if diff is None:
+            return jsonify({
+                'success': False,
+                'error': f'No function named {symbol} in either object'
+            }), 404
+    else:
+        try:
+            limit = min(int(request.args.get('limit', 50)), 1000)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'limit must be an integer'
+            }), 400
+        diff = object_catalog.diff(digest, other, max(limit, 0))
+    
+    diff['success'] = True
+    return jsonify(diff)
+
+@app.route('/api/test/cpp-gen', methods=['POST'])
+def test_cpp_generation():
+    """Test endpoint to verify C++ code generation"""
+    try:
+        data = request.get_json()
+        expression = data.get('expression', '2+3')
+        cpp_code = expression_to_cpp(expression)
+        return jsonify({
+            'success': True,
+            'expression': expression,
+            'cpp_code': cpp_code
+        })
+    except CodegenError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def read_bulk_input(columns):
+    """
+    Return bulk float64 input as an (n, columns) array without copying
+    
+    Reads an application/octet-stream body, or memory-maps the file named by
+    "path" in a JSON body. Returns None for ordinary JSON requests.
+    """
+    if request.mimetype == binary_io.CONTENT_TYPE:
+        return binary_io.read_matrix(request.get_data(cache=False), columns)
+    
+    data = request.get_json(silent=True) or {}
+    if 'path' in data:
+        return binary_io.read_matrix(binary_io.map_file(str(data['path']), DATA_DIR), columns)
+    return None
+
+def binary_response(count, blocks, headers=None):
+    """
+    Stream results as raw float64 blocks behind their header
+
+    blocks is evaluated lazily while the response is sent; the lane stays
+    held until it is done
+    """
+    return Response(binary_io.iter_response(count, blocks, KERNEL_ERRORS),
+                    mimetype=binary_io.CONTENT_TYPE, headers=headers)
+
+@app.route('/api/jit/evaluate', methods=['POST'])
+@admitted(jit_cost)
+def jit_evaluate():
+    """
+    Evaluate an expression of one variable over many values with a native kernel
+
+    The expression is compiled once with -O3 -march=native into a shared
+    library cached by source hash; later calls reuse the loaded kernel.
+
+    Expected JSON input:
+    {
+        "expression": "sin(x) * x^2",
+        "variable": "x",
+        "values": [0.0, 0.5, 1.0, ...]
+    }
+
+    Returns:
+    {
+        "success": true,
+        "results": [0.0, 0.0599..., 0.8414..., ...],   (null where evaluation failed)
+        "errors": [null, null, "sqrt domain error", ...], (only if some evaluation failed)
+        "cached": "memory|disk|null",
+        "compile_time_ms": 412.3,
+        "eval_time_ms": 0.02
+    }
+
+    Bulk input, answered with a binary result buffer (see binary_io):
+    - POST /api/jit/evaluate?expression=...&variable=x with an
+      application/octet-stream body of little-endian float64 values
+    - {"expression": ..., "variable": "x", "path": "values.f64"}, a file
+      in SEC_DATA_DIR that is memory-mapped instead of read
+    """
+    try:
+        matrix = read_bulk_input(1)
+        data = request.args if request.mimetype == binary_io.CONTENT_TYPE else (request.get_json() or {})
+        expression = data.get('expression', '').strip()
+
+        if not expression:
+            return jsonify({
+                'success': False,
+                'error': 'Expression is required'
+            }), 400
+
+        values = data.get('values', []) if matrix is None else matrix[:, 0]
+        if not isinstance(values, (list, np.ndarray)):
+            return jsonify({
+                'success': False,
+                'error': 'values must be a list of numbers'
+            }), 400
+
+        variable = data.get('variable', 'x')
+        if matrix is not None:
+            # Build (or load) the kernel up front so errors still get a status
+            result = jit.get_kernel(expression, variable)
+            result.pop('kernel', None)
+        else:
+            result = jit.evaluate(expression, values, variable)
+
+        if result['status'] == 'timeout':
+            return jsonify({
+                'success': False,
+                'error': result['error']
+            }), 408
+
+        if result['status'] != 'success':
+            return jsonify({
+                'success': False,
+                'error': result['error'],
+                'details': result.get('details'),
+                'cpp_code': result.get('cpp_code')
+            }), 400
+
+        if matrix is not None:
+            blocks = jit.evaluate_blocks(expression, values, variable, binary_io.BLOCK_ROWS)
+            return binary_response(len(values), blocks, headers={
+                'X-Kernel-Cached': str(result['cached'])
+            })
+
+        codes = result['codes']
+        failed = bool(codes.any())
+
+        response = {
+            'success': True,
+            'expression': expression,
+            # NaN and infinity are not valid JSON
+            'results': [v if math.isfinite(v) else None for v in result['results'].tolist()],
+            'cached': result['cached'],
+            'compile_time_ms': result.get('compile_time_ms'),
+            'eval_time_ms': result['eval_time_ms']
+        }
+        if failed:
+            # The engine's message per row, as /api/evaluate/<handle> reports them
+            response['errors'] = [KERNEL_ERRORS[code - 1] if code else None for code in codes.tolist()]
+        return jsonify(response)
+
+    except BinaryFormatError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid values: {str(e)}'
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'JIT error: {str(e)}'
+        }), 500
+
+@app.route('/api/prepare', methods=['POST'])
+def prepare_expression():
+    """
+    Parse an expression once for repeated evaluation
+    
+    Expected JSON input:
+    {
+        "expression": "x^2 * y + sin(x)"
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "handle": "3f9a...",
+        "expression": "x^2 * y + sin(x)",
+        "variables": ["x", "y"]
+    }
+    """
+    try:
+        data = request.get_json()
+        expression = (data or {}).get('expression', '').strip()
+        
+        if not expression:
+            return jsonify({
+                'success': False,
+                'error': 'No expression provided'
+            }), 400
+        
+        handle, prepared = load_prepared(expression)
+        
+        return jsonify({
+            'success': True,
+            'handle': handle,
+            'expression': expression,
+            'variables': prepared.variables
+        })
+    
+    except CodegenError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+def load_prepared(expression):
+    """Parse an expression once; returns (handle, PreparedExpression)"""
+    # Identical expressions share a handle across requests and workers
+    handle = result_store.make_key('prepared', file_fingerprint(COMPILER_PATH), expression)[:32]
+    
+    prepared = get_prepared(handle)
+    if prepared is None:
+        nodes = parse_expression(expression, COMPILER_PATH)
+        prepared = PreparedExpression(expression, nodes)
+        result_store.put(handle, 'prepared', {'expression': expression, 'nodes': nodes})
+        prepared_expressions.add(handle, prepared)
+    return handle, prepared
+
+def get_prepared(handle):
+    """Resolve a handle from this worker's registry or the shared result store"""
+    prepared = prepared_expressions.get(handle)
+    if prepared is None:
+        stored = result_store.get(handle)
+        if stored is None:
+            return None
+        prepared = PreparedExpression(stored['expression'], stored['nodes'])
+        prepared_expressions.add(handle, prepared)
+    return prepared
+
+@app.route('/api/evaluate/<handle>', methods=['POST'])
+@admitted(prepared_cost)
+def evaluate_prepared(handle):
+    """
+    Evaluate a prepared expression with variable bindings
+    
+    Expected JSON input, one of:
+    {"bindings": {"x": 2, "y": 3}}                       -> single result
+    {"bindings": [{"x": 1, "y": 3}, {"x": 2, "y": 3}]}   -> one result per binding
+    {"bindings": {"x": [1, 2, 3], "y": 3}}               -> lists are swept together,
+                                                            numbers are shared
+    
+    Variables bound by diff/integrate are local to them; every other
+    variable must be bound.
+    
+    Bulk input, answered with a binary result buffer (see binary_io):
+    - an application/octet-stream body of little-endian float64 rows, one
+      value per variable in the order given by ?variables=x,y (default:
+      the order returned by /api/prepare)
+    - {"path": "rows.f64", "variables": [...]}, a file in SEC_DATA_DIR
+      that is memory-mapped instead of read
+    
+    Returns:
+    {
+        "success": true,
+        "result": 12.9...,                  (single binding)
+        "results": [3.84..., 12.9...],      (multiple bindings; null where evaluation failed)
+        "errors": [null, "Division by zero"] (only if some evaluation failed)
+    }
+    """
+    try:
+        prepared = get_prepared(handle)
+        if prepared is None:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown handle: {handle}',
+                'hint': 'Call /api/prepare again'
+            }), 404
+        
+        # Bulk input: columns in the order of "variables" (default: the handle's)
+        data = request.args if request.mimetype == binary_io.CONTENT_TYPE else (request.get_json() or {})
+        variables = data.get('variables', prepared.variables)
+        if isinstance(variables, str):
+            variables = [name for name in variables.split(',') if name]
+        matrix = read_bulk_input(len(variables))
+        if matrix is not None:
+            missing = [name for name in prepared.variables if name not in variables]
+            if missing:
+                raise BindingError(f'Undefined variable: {missing[0]}')
+            # Evaluated a block at a time while the response streams
+            return binary_response(len(matrix), binary_io.evaluate_blocks(prepared, matrix, variables,
+                                                                          KERNEL_ERRORS))
+        
+        bindings = data.get('bindings', {})
+        
+        if isinstance(bindings, list):
+            if not all(isinstance(binding, dict) for binding in bindings):
+                raise BindingError('bindings must be an object or a list of objects')
+            columns = {}
+            for name in prepared.variables:
+                missing = [binding for binding in bindings if name not in binding]
+                if missing:
+                    raise BindingError(f'Undefined variable: {name}')
+                columns[name] = [binding[name] for binding in bindings]
+            single = False
+        elif isinstance(bindings, dict):
+            columns = bindings
+            single = not any(isinstance(value, list) for value in bindings.values())
+        else:
+            raise BindingError('bindings must be an object or a list of objects')
+        
+        with tracer.span('evaluation'):
+            results, errors = prepared.evaluate(columns)
+        
+        if isinstance(bindings, list) and not prepared.variables:
+            # A constant expression still answers once per binding
+            results = np.broadcast_to(results, (len(bindings),))
+            errors = None if errors is None else [errors] * len(bindings)
+        
+        if single:
+            if errors is not None:
+                return jsonify({
+                    'success': False,
+                    'error': errors
+                }), 400
+            value = float(results)
+            return jsonify({
+                'success': True,
+                'result': value if math.isfinite(value) else None
+            })
+        
+        with tracer.span('serialization'):
+            response = {
+                'success': True,
+                # NaN and infinity are not valid JSON
+                'results': [v if math.isfinite(v) else None for v in np.atleast_1d(results).tolist()]
+            }
+            if errors is not None:
+                response['results'] = [None if error else v for v, error in zip(response['results'], errors)]
+                response['errors'] = errors
+            return jsonify(response)
+    
+    except (BindingError, BinaryFormatError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Evaluation error: {str(e)}'
+        }), 500
+
+@app.route('/api/evaluate/<handle>/stream', methods=['POST'])
+@admitted(lambda handle: None)
+def evaluate_prepared_stream(handle):
+    """
+    Evaluate a prepared expression over a streamed dataset
+    
+    Request body (sent with chunked transfer encoding for large inputs):
+    - Content-Type: text/csv              header row naming the variables, one row per binding
+    - Content-Type: application/x-ndjson  one {"x": 1, "y": 2} object per line
+    
+    Rows are evaluated as they arrive and results stream back in the same
+    format, one line per input row, so memory use does not grow with the
+    input size:
+    - CSV:    result,error
+    - NDJSON: {"result": 13.0} or {"result": null, "error": "Division by zero"}
+    """
+    prepared = get_prepared(handle)
+    if prepared is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown handle: {handle}',
+            'hint': 'Call /api/prepare again'
+        }), 404
+    
+    if request.mimetype == 'text/csv':
+        stream, mimetype = stream_csv, 'text/csv'
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        stream, mimetype = stream_ndjson, 'application/x-ndjson'
+    else:
+        return jsonify({
+            'success': False,
+            'error': 'Content-Type must be text/csv or application/x-ndjson'
+        }), 415
+    
+    # Read the raw body incrementally instead of letting Flask buffer it
+    blocks = iter_line_blocks(request.stream)
+    return Response(stream_with_context(stream(prepared, blocks)), mimetype=mimetype)
+
+# Worksheets by id; definitions share prepared expressions with /api/prepare
+worksheets = WorksheetRegistry(max_entries=256)
+
+def worksheet_edit(data):
+    """(definitions, remove) from a worksheet request body"""
+    definitions = data.get('definitions', {})
+    remove = data.get('remove', [])
+    if not isinstance(definitions, dict):
+        raise WorksheetError('definitions must be an object of name: expression')
+    if not isinstance(remove, list):
+        raise WorksheetError('remove must be a list of names')
+    return definitions, remove
+
+@app.route('/api/worksheets', methods=['POST'])
+@admitted(worksheet_cost)
+def create_worksheet():
+    """
+    Create a worksheet of named definitions and evaluate it
+    
+    Expected JSON input:
+    {
+        "definitions": {
+            "a": "nCr(52,5)",
+            "p": "nCr(4,1)*nCr(48,4)/a",
+            "q": "integrate(x^2 * p, x, 0, 3)"
+        }
+    }
+    
+    A definition may use other definitions by name; variables bound by
+    diff/integrate stay local.
+    
+    Returns (201):
+    {
+        "success": true,
+        "id": "9c1f...",
+        "version": 1,
+        "definitions": {
+            "p": {"expression": "...", "value": 0.2995, "error": null,
+                  "uses": ["a"], "version": 1},
+            ...
+        },
+        "recomputed": [{"name": "a", "seconds": 0.00004}, ...],   (in evaluation order)
+        "reused": []
+    }
+    """
+    try:
+        definitions, remove = worksheet_edit(request.get_json(silent=True) or {})
+        worksheet = Worksheet(lambda expression: load_prepared(expression)[1])
+        with tracer.span('evaluation'):
+            report = worksheet.update(definitions)
+        worksheets.add(worksheet)
+        report['success'] = True
+        return app.response_class(fast_json.dumps(report), status=201, mimetype='application/json')
+    
+    except WorksheetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/worksheets/<worksheet_id>', methods=['PATCH'])
+@admitted(worksheet_cost)
+def update_worksheet(worksheet_id):
+    """
+    Edit a worksheet and re-evaluate only what the edit affects
+    
+    Expected JSON input:
+    {
+        "definitions": {"a": "nCr(52,6)"},   (added or changed definitions)
+        "remove": ["q"]
+    }
+    
+    The edited definitions are re-evaluated, then, in dependency order,
+    every definition whose inputs changed value; all others keep their
+    cached values. Returns the same report as creation.
+    """
+    worksheet = worksheets.get(worksheet_id)
+    if worksheet is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown worksheet: {worksheet_id}'
+        }), 404
+    
+    try:
+        definitions, remove = worksheet_edit(request.get_json(silent=True) or {})
+        with tracer.span('evaluation'):
+            report = worksheet.update(definitions, remove)
+        report['success'] = True
+        return app.response_class(fast_json.dumps(report), mimetype='application/json')
+    
+    except WorksheetError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/api/worksheets/<worksheet_id>', methods=['GET'])
+def get_worksheet(worksheet_id):
+    """Current definitions and values of a worksheet"""
+    worksheet = worksheets.get(worksheet_id)
+    if worksheet is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown worksheet: {worksheet_id}'
+        }), 404
+    
+    report = worksheet.snapshot()
+    report['success'] = True
+    return app.response_class(fast_json.dumps(report), mimetype='application/json')
+
+@app.route('/api/worksheets/<worksheet_id>', methods=['DELETE'])
+def delete_worksheet(worksheet_id):
+    """Forget a worksheet"""
+    if not worksheets.remove(worksheet_id):
+        return jsonify({
+            'success': False,
+            'error': f'Unknown worksheet: {worksheet_id}'
+        }), 404
+    return jsonify({'success': True})
+
+@app.route('/api/plot', methods=['POST'])
+@admitted(plot_cost)
+def plot_expression():
+    """
+    Sample a one-variable expression adaptively for plotting
+    
+    Expected JSON input:
+    {
+        "expression": "tan(x)",
+        "variable": "x",              (default: x)
+        "xMin": -10, "xMax": 10,
+        "width": 800, "height": 400,  (plot size in pixels)
+        "yMin": -5, "yMax": 5,        (optional; default: fitted to the curve)
+        "tolerance": 0.5,             (maximum chord error in pixels)
+        "maxPoints": 2000             (evaluation budget)
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "segments": [[[x, y], ...], ...],   (polylines; split at gaps and jumps)
+        "breaks": [-7.85, ...],             (x of detected discontinuities)
+        "yRange": [-5.2, 5.2],
+        "evaluations": 849,
+        "complete": true                    (false if the budget ran out first)
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        expression = str(data.get('expression', '')).strip()
+        variable = data.get('variable', 'x')
+        
+        if not expression:
+            return jsonify({
+                'success': False,
+                'error': 'No expression provided'
+            }), 400
+        
+        try:
+            x_min, x_max = float(data['xMin']), float(data['xMax'])
+            width = int(data.get('width', 800))
+            height = int(data.get('height', 400))
+            tolerance = float(data.get('tolerance', 0.5))
+            max_points = int(data.get('maxPoints', PLOT_DEFAULT_POINTS))
+            y_range = None
+            if data.get('yMin') is not None and data.get('yMax') is not None:
+                y_range = (float(data['yMin']), float(data['yMax']))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'xMin and xMax are required; sizes, tolerance and bounds must be numbers'
+            }), 400
+        
+        if not (math.isfinite(x_min) and math.isfinite(x_max) and x_min < x_max):
+            return jsonify({
+                'success': False,
+                'error': 'xMin must be less than xMax'
+            }), 400
+        if y_range is not None and not (math.isfinite(y_range[0]) and math.isfinite(y_range[1])
+                                        and y_range[0] < y_range[1]):
+            return jsonify({
+                'success': False,
+                'error': 'yMin must be less than yMax'
+            }), 400
+        if not (0 < width <= PLOT_MAX_PIXELS and 0 < height <= PLOT_MAX_PIXELS
+                and tolerance > 0 and 2 <= max_points <= PLOT_MAX_POINTS):
+            return jsonify({
+                'success': False,
+                'error': f'width and height must be 1-{PLOT_MAX_PIXELS}, tolerance positive '
+                         f'and maxPoints 2-{PLOT_MAX_POINTS}'
+            }), 400
+        
+        _, prepared = load_prepared(expression)
+        other = [name for name in prepared.variables if name != variable]
+        if other:
+            raise BindingError(f'Undefined variable: {other[0]}')
+        
+        with tracer.span('evaluation'):
+            plot = adaptive_sample(prepared, variable, x_min, x_max, width, height,
+                                   y_range, tolerance, max_points)
+        
+        with tracer.span('serialization'):
+            body = fast_json.dumps(dict(plot, success=True))
+        return app.response_class(body, mimetype='application/json')
+    
+    except (CodegenError, BindingError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Plotting error: {str(e)}'
+        }), 500
+
+@app.route('/api/object/analyze-expression', methods=['POST'])
+@admitted(lambda: TOOLCHAIN_COST)
+def analyze_expression_optimization():
+    """
+    Analyze optimization for a specific mathematical expression
+    
+    Generates C++ code for the expression, compiles it with -O0 and -O2
+    against a precompiled runtime prelude, and compares main() in each build.
+    By default only assembly is generated (g++ -S); set include_size to also
+    link executables and report their sizes. Set benchmark to also time the
+    generated code at each of benchmark_levels (O0, O1, O2, O3, Os, O2-native).
+    
+    Expected JSON input:
+    {
+        "expression": "2 + 3 * 4",
+        "include_size": false,
+        "benchmark": false,
+        "benchmark_levels": ["O0", "O2"]
+    }
+    
+    Returns:
+    {
+        "success": true,
+        "mode": "assembly|executable",
+        "expression": "2 + 3 * 4",
+        "cpp_code": "...",
+        "O0": {
+            "size": null,
+            "assembly_lines": 150,
+            "instruction_classes": {"data_movement": 80, "control": 12, ...},
+            "assembly": "..."
+        },
+        "O2": {
+            "size": null,
+            "assembly_lines": 45,
+            "instruction_classes": {...},
             "assembly": "..."
         },
         "improvement": {
             "size_reduction": "35.4%",
             "instruction_reduction": "70.0%"
+        },
+        "benchmark": {
+            "O0": {"ns_per_eval": 4.1, "ci95_ns": [4.0, 4.2], "speedup": 1.0, ...},
+            "O2": {"ns_per_eval": 1.3, "ci95_ns": [1.2, 1.4], "speedup": 3.15, ...}
         }
     }
     """
@@ -511,144 +1801,48 @@ def analyze_expression_optimization():
                 'error': 'Expression is required'
             }), 400
         
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix='expr_analyze_')
+        benchmark_levels = data.get('benchmark_levels', list(ExpressionAnalyzer.COMPARED_LEVELS))
+        if not benchmark_levels or any(level not in ExpressionAnalyzer.OPTIMIZATION_FLAGS
+                                       for level in benchmark_levels):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid benchmark levels. Use: ' + ', '.join(ExpressionAnalyzer.OPTIMIZATION_FLAGS)
+            }), 400
         
         try:
-            # Generate C++ code
-            cpp_code = expression_to_cpp(expression)
-            cpp_file = os.path.join(temp_dir, 'expr.cpp')
-            
-            # Debug: print generated code
-            print(f"\n{'='*60}")
-            print(f"Expression: {expression}")
-            print(f"{'='*60}")
-            print(f"Generated C++ Code:")
-            print(cpp_code)
-            print(f"{'='*60}\n")
-            
-            with open(cpp_file, 'w') as f:
-                f.write(cpp_code)
-            
-            # Compile with -O0
-            o0_exe = os.path.join(temp_dir, 'expr_O0.exe')
-            o0_compile = subprocess.run(
-                ['g++', '-std=c++11', '-O0', '-o', o0_exe, cpp_file],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if o0_compile.returncode != 0:
-                return jsonify({
-                    'success': False,
-                    'error': 'Compilation failed (O0)',
-                    'details': o0_compile.stderr,
-                    'stdout': o0_compile.stdout,
-                    'cpp_code': cpp_code
-                }), 500
-            
-            # Compile with -O2
-            o2_exe = os.path.join(temp_dir, 'expr_O2.exe')
-            o2_compile = subprocess.run(
-                ['g++', '-std=c++11', '-O2', '-o', o2_exe, cpp_file],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if o2_compile.returncode != 0:
-                return jsonify({
-                    'success': False,
-                    'error': 'Compilation failed (O2)',
-                    'details': o2_compile.stderr,
-                    'stdout': o2_compile.stdout,
-                    'cpp_code': cpp_code
-                }), 500
-            
-            # Get file sizes
-            o0_size = os.path.getsize(o0_exe)
-            o2_size = os.path.getsize(o2_exe)
-            
-            # Disassemble both
-            o0_asm = subprocess.run(
-                ['objdump', '-d', o0_exe],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            o2_asm = subprocess.run(
-                ['objdump', '-d', o2_exe],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            # Extract main function assembly
-            def extract_main_function(asm_text):
-                lines = asm_text.split('\n')
-                main_lines = []
-                in_main = False
-                
-                for line in lines:
-                    if '<main>:' in line or '<_main>:' in line:
-                        in_main = True
-                        main_lines.append(line)
-                    elif in_main:
-                        if line.strip() and not line.startswith(' '):
-                            # New function started
-                            break
-                        main_lines.append(line)
-                
-                return '\n'.join(main_lines)
-            
-            o0_main = extract_main_function(o0_asm.stdout)
-            o2_main = extract_main_function(o2_asm.stdout)
-            
-            # Count instructions (lines with opcodes)
-            def count_instructions(asm_text):
-                return len([line for line in asm_text.split('\n') 
-                           if ':' in line and any(op in line.lower() for op in 
-                           ['mov', 'add', 'sub', 'mul', 'div', 'call', 'ret', 'jmp', 'cmp', 'push', 'pop', 'imul', 'lea'])])
-            
-            o0_instructions = count_instructions(o0_main)
-            o2_instructions = count_instructions(o2_main)
-            
-            # Calculate improvements
-            size_reduction = ((o0_size - o2_size) / o0_size * 100) if o0_size > 0 else 0
-            instr_reduction = ((o0_instructions - o2_instructions) / o0_instructions * 100) if o0_instructions > 0 else 0
-            
+            result = expression_analyzer.analyze(expression, bool(data.get('include_size', False)))
+            if result['status'] == 'success' and data.get('benchmark'):
+                benchmark = expression_analyzer.benchmark(expression, tuple(benchmark_levels))
+                if benchmark['status'] == 'success':
+                    result['benchmark'] = benchmark['levels']
+                else:
+                    result['benchmark'] = {'error': benchmark['error'], 'details': benchmark.get('details')}
+        except CodegenError as e:
             return jsonify({
-                'success': True,
-                'expression': expression,
-                'cpp_code': cpp_code,
-                'O0': {
-                    'size': o0_size,
-                    'assembly_lines': o0_instructions,
-                    'assembly': o0_main,
-                    'full_assembly': o0_asm.stdout
-                },
-                'O2': {
-                    'size': o2_size,
-                    'assembly_lines': o2_instructions,
-                    'assembly': o2_main,
-                    'full_assembly': o2_asm.stdout
-                },
-                'improvement': {
-                    'size_reduction_bytes': o0_size - o2_size,
-                    'size_reduction_percent': round(size_reduction, 2),
-                    'instruction_reduction': o2_instructions - o0_instructions,
-                    'instruction_reduction_percent': round(instr_reduction, 2)
-                }
-            })
+                'success': False,
+                'error': f'Code generation failed: {str(e)}'
+            }), 400
         
-        finally:
-            # Cleanup temporary directory
-            try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
+        # Debug: print generated code
+        print(f"\n{'='*60}")
+        print(f"Expression: {expression}")
+        print(f"{'='*60}")
+        print(f"Generated C++ Code:")
+        print(result['cpp_code'])
+        print(f"{'='*60}\n")
+        
+        status = result.pop('status')
+        if status == 'timeout':
+            return jsonify({
+                'success': False,
+                'error': result['error'],
+                'cpp_code': result['cpp_code']
+            }), 408
+        
+        if status != 'success':
+            return jsonify(dict(result, success=False)), 500
+        
+        return jsonify(dict(result, success=True))
     
     except Exception as e:
         return jsonify({
@@ -663,14 +1857,44 @@ def not_found(e):
         'error': 'Endpoint not found'
     }), 404
 
+# Monte Carlo checks of probability expressions, on a process pool
+# started on first use
+monte_carlo = MonteCarlo()
+SIMULATION_DEFAULT_TRIALS = 10 ** 6
+SIMULATION_MAX_TRIALS = 10 ** 9
+
+def simulation_options(data):
+    """
+    (trials, seed) requested by a PnC body's "simulate" field, or None
+    
+    Raises ValueError for malformed options.
+    """
+    options = data.get('simulate')
+    if options is None or options is False:
+        return None
+    if options is True:
+        options = {}
+    if not isinstance(options, dict):
+        raise ValueError('simulate must be true or an object')
+    
+    trials = options.get('trials', SIMULATION_DEFAULT_TRIALS)
+    seed = options.get('seed')
+    if not isinstance(trials, int) or isinstance(trials, bool) or not 1 <= trials <= SIMULATION_MAX_TRIALS:
+        raise ValueError(f'trials must be an integer from 1 to {SIMULATION_MAX_TRIALS}')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise ValueError('seed must be a non-negative integer')
+    return trials, seed
+
 @app.route('/api/analyze/pnc', methods=['POST'])
+@admitted(pnc_cost)
 def analyze_pnc():
     """
     Endpoint for Probability and Combinatorics analysis
     
     Expected JSON input:
     {
-        "expression": "nCr(10,3)" or "nCr(5,2)/nCr(10,2)"
+        "expression": "nCr(10,3)" or "nCr(5,2)/nCr(10,2)",
+        "simulate": {"trials": 100000000, "seed": 42}   (optional; or true)
     }
     
     Returns:
@@ -686,11 +1910,13 @@ def analyze_pnc():
             ...
         ],
         "isProbability": false,
-        "probabilityValid": null
+        "probabilityValid": null,
+        "simulation": {...}   (when requested; see attach_simulation)
     }
     """
     try:
-        data = request.get_json()
+        with tracer.span('request parse'):
+            data = request.get_json()
         expression = data.get('expression', '').strip()
         
         if not expression:
@@ -699,25 +1925,35 @@ def analyze_pnc():
                 'error': 'No expression provided'
             }), 400
         
-        # Call the C++ compiler
-        process = subprocess.Popen(
-            [COMPILER_PATH],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        try:
+            simulation = simulation_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
-        stdout, stderr = process.communicate(input=expression)
+        with tracer.span('cache lookup'):
+            cache_key = result_store.make_key('pnc', file_fingerprint(COMPILER_PATH), expression)
+            cached = result_store.get_text(cache_key)
+        tracer.annotate(cache='hit' if cached is not None else 'miss')
+        if cached is not None:
+            if simulation is None:
+                return app.response_class(cached, mimetype='application/json')
+            return attach_simulation(fast_json.loads(cached), *simulation)
+        
+        # Call the C++ compiler
+        process = run_engine(expression, stdin=True)
         
         if process.returncode != 0:
             return jsonify({
                 'success': False,
-                'error': stderr or 'Compilation failed'
+                'error': process.stderr or 'Compilation failed'
             }), 400
         
         # Parse the JSON output from compiler
-        compiler_output = json.loads(stdout)
+        with tracer.span('output decode'):
+            compiler_output = fast_json.loads(process.stdout)
         
         if not compiler_output.get('success'):
             return jsonify({
@@ -730,10 +1966,12 @@ def analyze_pnc():
         intermediate_code = compiler_output.get('intermediateCode', [])
         
         # Generate step-by-step evaluation
-        steps = generate_pnc_steps(intermediate_code, expression)
+        with tracer.span('post-processing'):
+            steps = generate_pnc_steps(intermediate_code, expression)
         
-        # Check if expression is a probability (contains division)
-        is_probability = '/' in expression
+        # A probability is a ratio of counts, i.e. a division at the root of
+        # the AST; a '/' inside an argument or a term does not make one
+        is_probability = is_ratio(compiler_output.get('ast') or {})
         probability_valid = None
         
         if is_probability:
@@ -746,7 +1984,7 @@ def analyze_pnc():
                     'warning': True
                 })
         
-        return jsonify({
+        response = {
             'success': True,
             'expression': expression,
             'ast': compiler_output.get('ast', {}),
@@ -757,7 +1995,13 @@ def analyze_pnc():
             'steps': steps,
             'isProbability': is_probability,
             'probabilityValid': probability_valid
-        })
+        }
+        with tracer.span('serialization'):
+            body = fast_json.dumps(response)
+        result_store.put_text(cache_key, 'pnc', body.decode())
+        if simulation is not None:
+            return attach_simulation(response, *simulation)
+        return app.response_class(body, mimetype='application/json')
         
     except json.JSONDecodeError:
         return jsonify({
@@ -769,12 +2013,48 @@ def analyze_pnc():
             'success': False,
             'error': 'Compilation timeout'
         }), 500
+    except concurrent.futures.TimeoutError:
+        return jsonify({
+            'success': False,
+            'error': 'Simulation timeout'
+        }), 500
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def attach_simulation(response, trials, seed):
+    """
+    Add a Monte Carlo estimate to a PnC analysis (never cached)
+    
+    The expression must be an urn or selection model, e.g.
+    nCr(4,2)*nCr(48,3)/nCr(52,5) or nPr(5,3)/nPr(10,3). The simulation
+    reports:
+    {
+        "model": {"model": "hypergeometric", "population": 52, "draws": 5, ...},
+        "trials": 100000000, "successes": 3994178,
+        "estimate": 0.0399418, "exact": 0.0399298,
+        "confidenceInterval": [0.0399034, 0.0399802], "confidenceLevel": 0.95,
+        "consistent": true, "zScore": 0.61,
+        "seconds": 7.9, "trialsPerSecond": 12620819, "workers": 1, "seed": 42
+    }
+    """
+    try:
+        model = recognize(response.get('ast') or {})
+    except ModelError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Cannot simulate this expression: {e}'
+        }), 400
+    
+    with tracer.span('simulation'):
+        response['simulation'] = monte_carlo.simulate(model, trials, seed, timeout=g.lane.timeout)
+    tracer.annotate(trials=trials)
+    with tracer.span('serialization'):
+        body = fast_json.dumps(response)
+    return app.response_class(body, mimetype='application/json')
+
 def generate_pnc_steps(intermediate_code, expression):
     """
     Generate human-readable evaluation steps from intermediate code
@@ -0,0 +1,113 @@
+"""
+Assembly Parsing Module
+Extracts functions from GNU assembler and objdump listings and classifies
+x86-64 (AT&T syntax) instructions by kind
+"""
+
+import re
+from typing import Dict, List, Any, Optional
+
+
+# Ordered rules: the first matching class wins
+INSTRUCTION_CLASSES = [
+    ('nop', re.compile(r'^(nop\w*|endbr(32|64)|pause)$')),
+    ('control', re.compile(r'^(j[a-z]+|call\w?|ret\w?|loop\w*|syscall|hlt|ud2)$')),
+    ('stack', re.compile(r'^((push|pop)\w*|leave\w?|enter\w?)$')),
+    ('data_movement', re.compile(r'^(mov\w*|lea\w?|xchg\w?|cmov\w+|set\w+|c[lqw]t[dlqw]|cqto|bswap\w?)$')),
+    ('compare', re.compile(r'^(cmp\w*|test\w?|v?u?comis[sd]|bt\w?)$')),
+    ('float_simd', re.compile(r'^(v\w+|cvt\w+|p[a-z]\w*|(unpck|shuf)\w+|\w+[ps][sd])$')),
+    ('arithmetic', re.compile(r'^(add|sub|adc|sbb|i?mul|i?div|inc|dec|neg|not|and|x?or|sh[lr]d?|sa[lr]|ro[lr]|rc[lr])[bwlq]?$')),
+]
+
+# Instruction prefixes that precede the real mnemonic
+PREFIXES = {'rep', 'repe', 'repz', 'repne', 'repnz', 'lock', 'notrack', 'bnd', 'data16', 'cs', 'ds'}
+
+
+def mnemonic_of(instruction: str) -> str:
+    """Return the mnemonic of an instruction, skipping prefixes"""
+    for token in instruction.split():
+        if token not in PREFIXES:
+            return token.lower()
+    return ''
+
+
+def classify_instruction(mnemonic: str) -> str:
+    """Classify a mnemonic into a coarse instruction class"""
+    for name, pattern in INSTRUCTION_CLASSES:
+        if pattern.match(mnemonic):
+            return name
+    return 'other'
+
+
+def summarize_instructions(instructions: List[str]) -> Dict[str, Any]:
+    """Count instructions by class and by mnemonic"""
+    classes = {}
+    mnemonics = {}
+    for instruction in instructions:
+        mnemonic = mnemonic_of(instruction)
+        if not mnemonic:
+            continue
+        category = classify_instruction(mnemonic)
+        classes[category] = classes.get(category, 0) + 1
+        mnemonics[mnemonic] = mnemonics.get(mnemonic, 0) + 1
+
+    return {
+        'total': sum(classes.values()),
+        'classes': classes,
+        'mnemonics': mnemonics
+    }
+
+
+def extract_gas_function(asm_text: str, symbols=('main', '_main')) -> Optional[Dict[str, Any]]:
+    """
+    Extract one function from compiler-generated assembly (g++ -S)
+
+    Returns the function listing without assembler directives and the list
+    of its instructions, or None if the symbol is not defined.
+    """
+    lines = []
+    instructions = []
+    in_function = False
+
+    for line in asm_text.split('\n'):
+        stripped = line.split('#', 1)[0].strip()
+        if not in_function:
+            if stripped.endswith(':') and stripped[:-1] in symbols:
+                in_function = True
+                lines.append(stripped)
+            continue
+
+        if not stripped:
+            continue
+        if stripped.startswith('.size') or stripped == '.cfi_endproc':
+            break
+        if stripped.endswith(':'):
+            # Keep local branch targets, drop unwind and exception-table labels
+            if not re.match(r'^\.L(FB|FE|VL|BB|EHB|EHE|LSDA|COLD)', stripped):
+                lines.append(stripped)
+        elif not stripped.startswith('.'):
+            instructions.append(stripped)
+            lines.append('    ' + stripped)
+
+    if not in_function:
+        return None
+
+    return {
+        'listing': '\n'.join(lines),
+        'instructions': instructions
+    }
+
+
+def objdump_instructions(asm_text: str) -> List[str]:
+    """Return the instruction text of every line in an objdump -d listing"""
+    instructions = []
+    for line in asm_text.split('\n'):
+        if not re.match(r'^\s*[0-9a-f]+:\t', line):
+            continue
+        parts = line.split('\t')
+        # Lines with only raw bytes continue the previous instruction
+        if len(parts) >= 3 and parts[2].strip():
+            instructions.append(parts[2].strip())
+        elif len(parts) == 2 and not re.fullmatch(r'[0-9a-f]{2}( [0-9a-f]{2})*', parts[1].strip()):
+            instructions.append(parts[1].strip())
+    return instructions
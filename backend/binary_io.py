@@ -0,0 +1,164 @@
+"""
+Binary Buffer I/O Module
+Reads little-endian float64 request bodies and memory-mapped files without
+copying, and encodes results as raw float64 buffers behind a small header
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+CONTENT_TYPE = 'application/octet-stream'
+
+# Response layout:
+#   b'SECB' | u32 little-endian header length | JSON header (space padded to
+#   a multiple of 8 bytes) | blocks
+# The header is {"dtype": "<f8", "shape": [n], "block": rows, "mask": "u1",
+# "errors": [...]}. Each block covers up to `block` rows: their float64
+# results, then one uint8 error code per row, zero padded to a multiple of
+# 8 bytes. A non-zero code i marks a failed row with errors[i - 1]. Blocks
+# are encoded as they are evaluated, so no buffer spans the whole input.
+MAGIC = b'SECB'
+DTYPE = np.dtype('<f8')
+
+# Rows per evaluation block, bounding temporaries for mapped multi-GB inputs
+BLOCK_ROWS = 1 << 20
+
+# Bytes per response chunk
+WRITE_CHUNK = 1 << 20
+
+
+class BinaryFormatError(ValueError):
+    """Raised when a binary body or mapped file is malformed or not allowed"""
+    pass
+
+
+def read_matrix(buffer, columns: int) -> np.ndarray:
+    """View a float64 buffer as rows of `columns` values, without copying"""
+    columns = max(columns, 1)
+    if len(buffer) % (DTYPE.itemsize * columns):
+        raise BinaryFormatError(
+            f'Body length must be a multiple of {DTYPE.itemsize * columns} bytes '
+            f'({columns} little-endian float64 value(s) per row)'
+        )
+    return np.frombuffer(buffer, dtype=DTYPE).reshape(-1, columns)
+
+
+def map_file(path: str, data_dir: Optional[str]) -> memoryview:
+    """
+    Memory-map a float64 file from the configured data directory
+
+    Returns a read-only buffer over the mapping; pages are read on demand.
+    """
+    if not data_dir:
+        raise BinaryFormatError('Reading local files is disabled; set SEC_DATA_DIR to enable it')
+
+    root = os.path.realpath(data_dir)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise BinaryFormatError('Path must be inside the data directory')
+    if not os.path.isfile(full_path):
+        raise BinaryFormatError(f'File not found: {path}')
+
+    with open(full_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b'')
+        # The mapping stays valid after the file is closed
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapping)
+
+
+def encode_header(count: int, errors: List[str]) -> bytes:
+    """Magic, header length and the aligned JSON header"""
+    header = json.dumps({
+        'dtype': DTYPE.str,
+        'shape': [count],
+        'block': BLOCK_ROWS,
+        'mask': 'u1',
+        'errors': errors
+    }).encode()
+    # Keep the float64 payload 8-byte aligned for frombuffer on the client
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 8)
+    return MAGIC + struct.pack('<I', len(header)) + header
+
+
+def _chunks(array: np.ndarray, dtype) -> Iterator[bytes]:
+    data = memoryview(np.ascontiguousarray(array, dtype=dtype)).cast('B')
+    for start in range(0, len(data), WRITE_CHUNK):
+        yield bytes(data[start:start + WRITE_CHUNK])
+
+
+def iter_response(count: int, blocks: Iterable[Tuple[np.ndarray, np.ndarray]],
+                  errors: List[str]) -> Iterator[bytes]:
+    """
+    Yield the encoded response for `count` rows in bounded chunks
+
+    blocks yields (results, codes) for consecutive runs of BLOCK_ROWS rows
+    (fewer for the last) and is consumed lazily, one block at a time.
+    """
+    yield encode_header(count, errors)
+
+    for results, codes in blocks:
+        yield from _chunks(results, DTYPE)
+        yield from _chunks(codes, np.uint8)
+        padding = -len(codes) % 8
+        if padding:
+            yield bytes(padding)
+
+
+def decode(buffer) -> Tuple[np.ndarray, Optional[List[Optional[str]]]]:
+    """Decode a response into results and per-row errors (client side)"""
+    if bytes(buffer[:4]) != MAGIC:
+        raise BinaryFormatError('Not a binary result buffer')
+    (length,) = struct.unpack('<I', bytes(buffer[4:8]))
+    header = json.loads(bytes(buffer[8:8 + length]))
+    count, block = header['shape'][0], header['block']
+    offset = 8 + length
+
+    results = np.empty(count, dtype=header['dtype'])
+    codes = np.empty(count, dtype=np.uint8)
+    for start in range(0, count, block):
+        rows = min(block, count - start)
+        results[start:start + rows] = np.frombuffer(buffer, dtype=header['dtype'], count=rows, offset=offset)
+        offset += rows * DTYPE.itemsize
+        codes[start:start + rows] = np.frombuffer(buffer, dtype=np.uint8, count=rows, offset=offset)
+        offset += rows + (-rows % 8)
+
+    if not codes.any():
+        return results, None
+    messages = [None] + header['errors']
+    return results, [messages[code] for code in codes.tolist()]
+
+
+def evaluate_blocks(prepared, matrix: np.ndarray, variables: List[str],
+                    errors: List[str]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Evaluate a prepared expression over rows of a float64 matrix, a block at a time
+
+    Column j of the matrix binds variables[j]. Yields each block's results
+    and error codes into errors, the table of every message the evaluator
+    can report.
+    """
+    codes_for: Dict[str, int] = {message: code for code, message in enumerate(errors, 1)}
+    count = matrix.shape[0]
+
+    for start in range(0, count, BLOCK_ROWS):
+        block = matrix[start:start + BLOCK_ROWS]
+        # Strided column views; no copy of the input is made
+        columns = {name: block[:, index] for index, name in enumerate(variables)}
+        results, block_errors = prepared.evaluate(columns)
+        results = np.broadcast_to(results, (len(block),))
+        codes = np.zeros(len(block), dtype=np.uint8)
+
+        if block_errors is not None:
+            if not isinstance(block_errors, list):
+                block_errors = [block_errors] * len(block)
+            block_errors = np.array(block_errors, dtype=object)
+            for error in set(block_errors.tolist()) - {None}:
+                codes[block_errors == error] = codes_for[error]
+        yield results, codes
@@ -0,0 +1,527 @@
+"""
+C++ Code Generation Module
+Translates mathematical expressions into standalone C++ source code
+Used by the optimization analysis and the native JIT evaluator
+"""
+
+import json
+import os
+import subprocess
+
+
+# Fixed runtime shared by every generated program: constants plus the
+# factorial/nCr/nPr/differentiate/integrate helpers. Helpers are inline so
+# the prelude can live in a (precompiled) header and still be inlined at -O2
+RUNTIME_PRELUDE = """#include <cmath>
+#include <functional>
+
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+
+#ifndef M_E
+#define M_E 2.71828182845904523536
+#endif
+
+// Factorial function
+inline double factorial(double n) {
+    if (n < 0 || n != floor(n)) return -1;
+    if (n > 170) return -1;
+    double result = 1.0;
+    for (int i = 2; i <= (int)n; i++) {
+        result *= i;
+    }
+    return result;
+}
+
+// nCr function
+inline double nCr(double n, double r) {
+    if (n < 0 || r < 0 || r > n) return -1;
+    if (n != floor(n) || r != floor(r)) return -1;
+    double n_fact = factorial(n);
+    double r_fact = factorial(r);
+    double nr_fact = factorial(n - r);
+    return n_fact / (r_fact * nr_fact);
+}
+
+// nPr function
+inline double nPr(double n, double r) {
+    if (n < 0 || r < 0 || r > n) return -1;
+    if (n != floor(n) || r != floor(r)) return -1;
+    double n_fact = factorial(n);
+    double nr_fact = factorial(n - r);
+    return n_fact / nr_fact;
+}
+
+// Numerical differentiation using central difference method
+inline double differentiate(std::function<double(double)> f, double x, double h = 1e-5) {
+    return (f(x + h) - f(x - h)) / (2.0 * h);
+}
+
+// Numerical integration using Simpson's rule
+inline double integrate(std::function<double(double)> f, double a, double b, int n = 1000) {
+    if (n % 2 == 1) n++; // Simpson's rule requires even number of intervals
+    double h = (b - a) / n;
+    double sum = f(a) + f(b);
+
+    for (int i = 1; i < n; i++) {
+        double x = a + i * h;
+        sum += (i % 2 == 0) ? 2.0 * f(x) : 4.0 * f(x);
+    }
+
+    return sum * h / 3.0;
+}
+"""
+
+# Engine runtime errors a kernel (or the prepared evaluator) can report per
+# row; code i marks KERNEL_ERRORS[i - 1], and 0 a row that evaluated. Binary
+# responses carry this table in their header
+KERNEL_ERRORS = [
+    'Division by zero',
+    'Modulo by zero',
+    'Factorial requires non-negative integer',
+    'Factorial overflow',
+    'nCr requires non-negative integers',
+    'nCr requires integer arguments',
+    'nCr requires n >= r',
+    'nPr requires non-negative integers',
+    'nPr requires integer arguments',
+    'nPr requires n >= r',
+    'asin domain error',
+    'acos domain error',
+    'log domain error',
+    'ln domain error',
+    'sqrt domain error',
+]
+
+
+def _error_code(message):
+    return KERNEL_ERRORS.index(message) + 1
+
+
+# Runtime of evaluation kernels. Unlike RUNTIME_PRELUDE it follows the
+# engine: invalid operations record the engine's error code for the row
+# (the first one raised, in the engine's evaluation order, wins) and yield NaN, and diff/integrate use the
+# engine's central difference step and trapezoid rule
+KERNEL_PRELUDE = f"""#include <cmath>
+#include <cstddef>
+
+#ifndef M_PI
+#define M_PI 3.14159265358979323846
+#endif
+
+#ifndef M_E
+#define M_E 2.71828182845904523536
+#endif
+
+// Error code of the row being evaluated, 0 while it has none
+static thread_local unsigned char sec_error;
+
+static inline double sec_fail(unsigned char code) {{
+    if (!sec_error) sec_error = code;
+    return NAN;
+}}
+
+static inline double factorial(double n) {{
+    if (n < 0 || n != floor(n)) return sec_fail({_error_code('Factorial requires non-negative integer')});
+    if (n > 170) return sec_fail({_error_code('Factorial overflow')});
+    double result = 1.0;
+    for (int i = 2; i <= (int)n; i++) {{
+        result *= i;
+    }}
+    return result;
+}}
+
+// Operands of a binary operation. Braced initializers are evaluated left to
+// right, unlike function arguments and the operands of +, so the first error
+// raised is the one the engine raises
+struct sec_pair {{
+    double a, b;
+}};
+
+static inline double sec_add(sec_pair p) {{ return p.a + p.b; }}
+static inline double sec_sub(sec_pair p) {{ return p.a - p.b; }}
+static inline double sec_mul(sec_pair p) {{ return p.a * p.b; }}
+static inline double sec_pow(sec_pair p) {{ return pow(p.a, p.b); }}
+
+static inline double sec_div(sec_pair p) {{
+    return p.b == 0.0 ? sec_fail({_error_code('Division by zero')}) : p.a / p.b;
+}}
+
+static inline double sec_mod(sec_pair p) {{
+    return p.b == 0.0 ? sec_fail({_error_code('Modulo by zero')}) : fmod(p.a, p.b);
+}}
+
+// nCr/nPr with the engine's validation order; codes first, first + 1, first + 2
+static inline double sec_combinatoric(double n, double r, bool ordered, unsigned char first) {{
+    if (n < 0 || r < 0) return sec_fail(first);
+    if (n != floor(n) || r != floor(r)) return sec_fail(first + 1);
+    if (r > n) return sec_fail(first + 2);
+    double n_fact = factorial(n);
+    if (ordered) return n_fact / factorial(n - r);
+    double r_fact = factorial(r);
+    return n_fact / (r_fact * factorial(n - r));
+}}
+
+static inline double nCr(sec_pair p) {{
+    return sec_combinatoric(p.a, p.b, false, {_error_code('nCr requires non-negative integers')});
+}}
+
+static inline double nPr(sec_pair p) {{
+    return sec_combinatoric(p.a, p.b, true, {_error_code('nPr requires non-negative integers')});
+}}
+
+static inline double sec_asin(double x) {{
+    return (x < -1.0 || x > 1.0) ? sec_fail({_error_code('asin domain error')}) : asin(x);
+}}
+
+static inline double sec_acos(double x) {{
+    return (x < -1.0 || x > 1.0) ? sec_fail({_error_code('acos domain error')}) : acos(x);
+}}
+
+static inline double sec_log(double x) {{
+    return x <= 0.0 ? sec_fail({_error_code('log domain error')}) : log10(x);
+}}
+
+static inline double sec_ln(double x) {{
+    return x <= 0.0 ? sec_fail({_error_code('ln domain error')}) : log(x);
+}}
+
+static inline double sec_sqrt(double x) {{
+    return x < 0.0 ? sec_fail({_error_code('sqrt domain error')}) : sqrt(x);
+}}
+
+// Central difference, as Calculus::differentiate
+template <typename F>
+static inline double differentiate(F f, double x) {{
+    const double h = 0.0001;
+    double f_plus = f(x + h);
+    double f_minus = f(x - h);
+    return (f_plus - f_minus) / (2.0 * h);
+}}
+
+// Trapezoid rule over 1000 steps, as Calculus::integrateTrapezoid
+template <typename F>
+static inline double integrate(F f, double a, double b) {{
+    const int n = 1000;
+    double h = (b - a) / n;
+    double sum = f(a);
+    for (int i = 1; i < n; i++) {{
+        sum += 2.0 * f(a + i * h);
+    }}
+    sum += f(b);
+    return (h / 2.0) * sum;
+}}
+"""
+
+# Path to the compiled C++ compiler, used to parse expressions into an AST
+COMPILER_PATH = os.path.join(os.path.dirname(__file__), '..', 'compiler', 'compiler.exe')
+if not os.path.exists(COMPILER_PATH):
+    COMPILER_PATH = os.path.join(os.path.dirname(__file__), '..', 'compiler', 'compiler')
+
+# Header name generated programs include when compiled against the prebuilt prelude
+RUNTIME_HEADER = 'expr_runtime.h'
+
+# Name of the exported symbol in generated evaluation kernels
+KERNEL_SYMBOL = 'sec_kernel'
+
+
+class CodegenError(ValueError):
+    """Raised when an expression cannot be translated to C++"""
+
+
+# C++ spelling of the engine's single-argument functions
+CPP_FUNCTIONS = {
+    'sin': 'sin', 'cos': 'cos', 'tan': 'tan',
+    'asin': 'asin', 'acos': 'acos', 'atan': 'atan',
+    'log': 'log10',  # log is base 10 in the engine
+    'ln': 'log',
+    'exp': 'exp', 'sqrt': 'sqrt', 'cbrt': 'cbrt', 'abs': 'fabs'
+}
+
+# Kernel spellings: domain-checked functions record the engine's error
+KERNEL_FUNCTIONS = dict(CPP_FUNCTIONS, asin='sec_asin', acos='sec_acos', log='sec_log',
+                        ln='sec_ln', sqrt='sec_sqrt')
+
+# Kernel calls for binary operations, with operands evaluated left to right
+KERNEL_OPERATIONS = {'+': 'sec_add', '-': 'sec_sub', '*': 'sec_mul', '/': 'sec_div',
+                     '%': 'sec_mod', '^': 'sec_pow'}
+
+# Binding strength of emitted C++ forms; calls and atoms never need parentheses
+BINARY_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+UNARY_PRECEDENCE = 3
+ATOM_PRECEDENCE = 4
+
+
+def parse_expression(expression, compiler_path=None, timeout=10):
+    """Parse an expression with the C++ engine and return its flat post-order AST"""
+    try:
+        result = subprocess.run(
+            [compiler_path or COMPILER_PATH, '--ast', expression],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise CodegenError('Parsing timed out')
+    except OSError as e:
+        raise CodegenError(f'Failed to execute compiler: {str(e)}')
+
+    try:
+        output = json.loads(result.stdout if result.returncode == 0 else result.stderr)
+    except json.JSONDecodeError:
+        raise CodegenError(result.stderr or 'Invalid output from compiler')
+
+    if not output.get('success'):
+        raise CodegenError(output.get('error', 'Parsing failed'))
+
+    return output['nodes']
+
+
+def _format_number(value):
+    """Emit a double literal so integer constants never use integer arithmetic"""
+    if value is None:
+        raise CodegenError('Non-finite constant in expression')
+    return repr(float(value))
+
+
+def _precedence(node):
+    """Binding strength of the C++ emitted for a node"""
+    if node['type'] == 'BINARY_OP':
+        return BINARY_PRECEDENCE.get(node['op'], ATOM_PRECEDENCE)
+    if node['type'] == 'UNARY_OP' and node['op'] == 'neg':
+        return UNARY_PRECEDENCE
+    if node['type'] == 'NUMBER' and node['value'] is not None and node['value'] < 0:
+        return UNARY_PRECEDENCE
+    return ATOM_PRECEDENCE
+
+
+def _operand(nodes, index, needs_parens):
+    return ['(', index, ')'] if needs_parens(_precedence(nodes[index])) else [index]
+
+
+def _expand(nodes, node, checked=False):
+    """
+    Return the output fragments for one node: strings are emitted as-is,
+    integers are child node indices, tuples mark literals, variable uses
+    and the opening/closing of variable scopes. Checked output calls the
+    kernel prelude's error-recording operations and functions, with the
+    operands of two-operand nodes sequenced left to right as in the engine.
+    """
+    node_type = node['type']
+    children = node.get('children', [])
+
+    if node_type == 'NUMBER':
+        return [('number', node['value'])]
+
+    if node_type == 'VARIABLE':
+        return [('use', node['name'])]
+
+    if node_type == 'BINARY_OP':
+        left, right = children
+        op = node['op']
+        if checked:
+            return [KERNEL_OPERATIONS[op] + '({', left, ', ', right, '})']
+        if op == '^':
+            return ['pow(', left, ', ', right, ')']
+        if op == '%':
+            return ['fmod(', left, ', ', right, ')']
+        prec = BINARY_PRECEDENCE[op]
+        # Right operands of equal precedence keep the AST's grouping
+        return (_operand(nodes, left, lambda p: p < prec) + [f' {op} '] +
+                _operand(nodes, right, lambda p: p <= prec))
+
+    if node_type == 'UNARY_OP':
+        if node['op'] == 'neg':
+            # Parenthesize nested negation so it never becomes '--'
+            return ['-'] + _operand(nodes, children[0], lambda p: p <= UNARY_PRECEDENCE)
+        if node['op'] == '!':
+            return ['factorial(', children[0], ')']
+
+    if node_type == 'FACTORIAL':
+        return ['factorial(', children[0], ')']
+
+    if node_type in ('NCR', 'NPR'):
+        call = 'nCr(' if node_type == 'NCR' else 'nPr('
+        if checked:
+            return [call + '{', children[0], ', ', children[1], '})']
+        return [call, children[0], ', ', children[1], ')']
+
+    if node_type == 'FUNCTION_CALL':
+        if node['name'] not in CPP_FUNCTIONS:
+            raise CodegenError(f"Unknown function: {node['name']}")
+        spelling = (KERNEL_FUNCTIONS if checked else CPP_FUNCTIONS)[node['name']]
+        return [spelling + '(', children[0], ')']
+
+    if node_type == 'DIFF_NODE':
+        var = node['variable']
+        return [f'differentiate([=](double {var}) {{ return ', ('bind', var), children[0],
+                ('unbind', var), f'; }}, {_format_number(node["point"])})']
+
+    if node_type == 'INTEGRATE_NODE':
+        var = node['variable']
+        return [f'integrate([=](double {var}) {{ return ', ('bind', var), children[0],
+                ('unbind', var), f'; }}, {_format_number(node["lowerBound"])}, '
+                f'{_format_number(node["upperBound"])})']
+
+    raise CodegenError(f'Unsupported node in code generation: {node_type}')
+
+
+def nodes_to_cpp(nodes, free_variables=(), constants=None, checked=False):
+    """
+    Emit a single C++ expression from a flat post-order AST
+
+    Walks the tree once with an explicit stack, so generation is linear in
+    the size of the expression and not limited by Python's recursion depth.
+    Variables other than free_variables must be bound by a calculus node.
+    If a constants list is given, numeric literals are appended to it and
+    emitted as reads of c[i] instead. Checked output targets KERNEL_PRELUDE.
+    """
+    if not nodes:
+        raise CodegenError('Empty expression')
+
+    bound = dict.fromkeys(free_variables, 1)
+    output = []
+    stack = [len(nodes) - 1]
+
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            output.append(item)
+        elif isinstance(item, int):
+            stack.extend(reversed(_expand(nodes, nodes[item], checked)))
+        elif item[0] == 'use':
+            if not bound.get(item[1]):
+                raise CodegenError(f'Undefined variable: {item[1]}')
+            output.append(item[1])
+        elif item[0] == 'number':
+            if constants is None:
+                output.append(_format_number(item[1]))
+            else:
+                constants.append(_format_number(item[1]))
+                output.append(f'c[{len(constants) - 1}]')
+        elif item[0] == 'bind':
+            bound[item[1]] = bound.get(item[1], 0) + 1
+        else:
+            bound[item[1]] -= 1
+
+    return ''.join(output)
+
+
+def expression_to_cpp_expr(expression, free_variables=()):
+    """
+    Convert a mathematical expression to a single C++ expression
+    Supports: arithmetic, factorial, nCr, nPr, differentiation, integration, trig functions
+    """
+    return nodes_to_cpp(parse_expression(expression), free_variables)
+
+
+def runtime_header():
+    """Return the runtime prelude as a header for generated programs"""
+    return ("#ifndef EXPR_RUNTIME_H\n#define EXPR_RUNTIME_H\n\n#include <iostream>\n" +
+            RUNTIME_PRELUDE + "\n#endif // EXPR_RUNTIME_H\n")
+
+
+def _main_function(expression):
+    """Return a main() that prints the value of the expression"""
+    cpp_code = "int main() {\n"
+    cpp_code += "    double result = " + expression_to_cpp_expr(expression) + ";\n"
+    cpp_code += "    std::cout << result << std::endl;\n"
+    cpp_code += "    return 0;\n"
+    cpp_code += "}\n"
+
+    return cpp_code
+
+
+def expression_to_cpp(expression):
+    """
+    Convert a mathematical expression to a standalone C++ program
+    that prints the value of the expression
+    """
+    return "#include <iostream>\n" + RUNTIME_PRELUDE + "\n" + _main_function(expression)
+
+
+def expression_to_main_cpp(expression):
+    """
+    Convert a mathematical expression to a C++ program that includes the
+    runtime prelude header instead of carrying it inline
+    """
+    return f'#include "{RUNTIME_HEADER}"\n\n' + _main_function(expression)
+
+
+def expression_to_kernel_cpp(expression, variable='x'):
+    """
+    Convert a mathematical expression of one variable to a C++ translation
+    unit exporting a vectorized evaluation kernel:
+
+        extern "C" void sec_kernel(const double* x, double* out,
+                                   unsigned char* codes, size_t n)
+
+    codes[i] is 0, or the KERNEL_ERRORS code of the engine error row i
+    raised, in which case out[i] is NaN.
+    """
+    cpp_expr = nodes_to_cpp(parse_expression(expression), (variable,), checked=True)
+    cpp_code = KERNEL_PRELUDE
+    cpp_code += (f'\nextern "C" void {KERNEL_SYMBOL}(const double* xs, double* out, '
+                 'unsigned char* codes, size_t n) {\n')
+    cpp_code += "    for (size_t i = 0; i < n; i++) {\n"
+    cpp_code += f"        const double {variable} = xs[i];\n"
+    cpp_code += "        sec_error = 0;\n"
+    cpp_code += "        const double value = " + cpp_expr + ";\n"
+    cpp_code += "        out[i] = sec_error ? NAN : value;\n"
+    cpp_code += "        codes[i] = sec_error;\n"
+    cpp_code += "    }\n"
+    cpp_code += "}\n"
+
+    return cpp_code
+
+
+def expression_to_benchmark_cpp(expression):
+    """
+    Convert a mathematical expression to a timing harness that includes the
+    runtime prelude header
+
+    Every numeric literal is loaded from a volatile array on each evaluation
+    so the compiler cannot constant-fold the expression away. The harness
+    takes a target time per repetition in milliseconds and a repetition
+    count, calibrates its iteration count during warm-up, and prints the
+    nanoseconds per evaluation of each repetition as a JSON object.
+    """
+    constants = []
+    cpp_expr = nodes_to_cpp(parse_expression(expression), constants=constants)
+    count = max(len(constants), 1)
+
+    cpp_code = f'#include "{RUNTIME_HEADER}"\n#include <chrono>\n#include <cstdlib>\n\n'
+    cpp_code += f"volatile double sec_inputs[{count}] = {{{', '.join(constants) or '0.0'}}};\n"
+    cpp_code += "volatile double sec_sink;\n\n"
+    cpp_code += "static double sec_evaluate() {\n"
+    cpp_code += f"    double c[{count}];\n"
+    cpp_code += f"    for (int i = 0; i < {count}; i++) c[i] = sec_inputs[i];\n"
+    cpp_code += f"    return {cpp_expr};\n"
+    cpp_code += "}\n\n"
+    cpp_code += """static double sec_time(long long iterations) {
+    auto start = std::chrono::steady_clock::now();
+    for (long long i = 0; i < iterations; i++) sec_sink = sec_evaluate();
+    auto end = std::chrono::steady_clock::now();
+    return std::chrono::duration<double, std::nano>(end - start).count();
+}
+
+int main(int argc, char* argv[]) {
+    double target_ns = (argc > 1 ? std::atof(argv[1]) : 10.0) * 1e6;
+    int repetitions = argc > 2 ? std::atoi(argv[2]) : 20;
+
+    // Warm up while doubling the iteration count until one batch fills the target
+    long long iterations = 1;
+    while (sec_time(iterations) < target_ns && iterations < (1LL << 40)) iterations *= 2;
+
+    std::cout << "{\\"iterations\\":" << iterations << ",\\"samples\\":[";
+    for (int rep = 0; rep < repetitions; rep++) {
+        if (rep > 0) std::cout << ",";
+        std::cout << sec_time(iterations) / iterations;
+    }
+    std::cout << "]}" << std::endl;
+    return 0;
+}
+"""
+
+    return cpp_code
@@ -0,0 +1,376 @@
+"""
+Expression Optimization Analysis Module
+Compiles the generated C++ for a single expression at different optimization
+levels and compares the resulting executables and machine code
+"""
+
+import hashlib
+import json
+import math
+import os
+import statistics
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from asm_parser import extract_gas_function, objdump_instructions, summarize_instructions
+from cpp_codegen import (expression_to_cpp, expression_to_main_cpp, expression_to_benchmark_cpp,
+                         runtime_header, RUNTIME_HEADER)
+
+
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+]
+
+
+def _t_critical(degrees_of_freedom: int) -> float:
+    if degrees_of_freedom < 1:
+        return 0.0
+    if degrees_of_freedom <= len(T_CRITICAL_95):
+        return T_CRITICAL_95[degrees_of_freedom - 1]
+    return 1.96
+
+
+class ExpressionAnalyzer:
+    """Builds expression programs against a prelude precompiled once per optimization level"""
+
+    BASE_FLAGS = ['-std=c++11']
+    OPTIMIZATION_FLAGS = {
+        'O0': ['-O0'],
+        'O1': ['-O1'],
+        'O2': ['-O2'],
+        'O3': ['-O3'],
+        'Os': ['-Os'],
+        'O2-native': ['-O2', '-march=native']
+    }
+    COMPARED_LEVELS = ('O0', 'O2')
+
+    # Limits applied to benchmark harness processes
+    BENCHMARK_CPU_SECONDS = 20
+    BENCHMARK_MEMORY_BYTES = 512 * 1024 * 1024
+
+    def __init__(self, cache_dir: Optional[str] = None, timeout: float = 10):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'sec_prelude_cache')
+        self.timeout = timeout
+        self._prelude_dirs = {}
+        self._lock = threading.Lock()
+        self._level_locks = {level: threading.Lock() for level in self.OPTIMIZATION_FLAGS}
+        self._toolchain_version = None
+
+    def _run_command(self, cmd: List[str]) -> tuple[str, str, int]:
+        """Safely execute command and capture output"""
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout
+            )
+            return result.stdout, result.stderr, result.returncode
+        except subprocess.TimeoutExpired:
+            return "", "Command timed out", -1
+        except Exception as e:
+            return "", str(e), -1
+
+    def _compile_flags(self, opt_level: str) -> List[str]:
+        return self.BASE_FLAGS + self.OPTIMIZATION_FLAGS[opt_level]
+
+    def _get_toolchain_version(self) -> str:
+        """g++ version string; part of the prelude cache key"""
+        if self._toolchain_version is None:
+            stdout, _, _ = self._run_command(['g++', '--version'])
+            self._toolchain_version = stdout.split('\n')[0]
+        return self._toolchain_version
+
+    def prepare_prelude(self, opt_level: str) -> str:
+        """
+        Return an include directory holding the runtime header and, when the
+        toolchain supports it, its precompiled form for this optimization level.
+        The header is precompiled once and shared by every later request.
+        """
+        with self._lock:
+            if opt_level in self._prelude_dirs:
+                return self._prelude_dirs[opt_level]
+
+        with self._level_locks[opt_level]:
+            if opt_level in self._prelude_dirs:
+                return self._prelude_dirs[opt_level]
+
+            header = runtime_header()
+            flags = self._compile_flags(opt_level)
+            key = hashlib.sha256('\0'.join(
+                [header, self._get_toolchain_version()] + flags).encode()).hexdigest()[:16]
+
+            include_dir = os.path.join(self.cache_dir, key, opt_level)
+            header_path = os.path.join(include_dir, RUNTIME_HEADER)
+            pch_path = header_path + '.gch'
+
+            if not os.path.exists(pch_path):
+                os.makedirs(include_dir, exist_ok=True)
+                with open(header_path, 'w') as f:
+                    f.write(header)
+
+                # g++ picks up <header>.gch automatically when flags match;
+                # if precompilation fails the plain header is still used
+                temp_pch = f'{pch_path}.{os.getpid()}.tmp'
+                stdout, stderr, returncode = self._run_command(
+                    ['g++'] + flags + ['-x', 'c++-header', header_path, '-o', temp_pch])
+                if returncode == 0:
+                    os.replace(temp_pch, pch_path)
+                elif os.path.exists(temp_pch):
+                    os.remove(temp_pch)
+
+            with self._lock:
+                self._prelude_dirs[opt_level] = include_dir
+            return include_dir
+
+    def _compile_programs(self, cpp_file: str, temp_dir: str, assembly_only: bool = True,
+                          levels=COMPARED_LEVELS) -> Dict[str, Dict[str, Any]]:
+        """
+        Compile the program at each optimization level concurrently, either
+        to assembly for the translation unit only (-S) or to full executables
+        """
+        name = os.path.splitext(os.path.basename(cpp_file))[0]
+        processes = {}
+        for opt_level in levels:
+            include_dir = self.prepare_prelude(opt_level)
+            if assembly_only:
+                output = os.path.join(temp_dir, f'{name}_{opt_level}.s')
+                mode_flags = ['-S']
+            else:
+                output = os.path.join(temp_dir, f'{name}_{opt_level}.exe')
+                mode_flags = []
+            processes[opt_level] = (output, subprocess.Popen(
+                ['g++'] + self._compile_flags(opt_level) + mode_flags +
+                ['-I', include_dir, '-o', output, cpp_file],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            ))
+
+        results = {}
+        try:
+            for opt_level, (output, process) in processes.items():
+                stdout, stderr = process.communicate(timeout=self.timeout)
+                results[opt_level] = {
+                    'output': output,
+                    'stdout': stdout,
+                    'stderr': stderr,
+                    'returncode': process.returncode
+                }
+        finally:
+            for _, process in processes.values():
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+        return results
+
+    def _assembly_metrics(self, build: Dict[str, Any]) -> Dict[str, Any]:
+        """Instruction metrics for main() from the compiler's own assembly"""
+        with open(build['output']) as f:
+            asm = f.read()
+
+        function = extract_gas_function(asm) or {'listing': '', 'instructions': []}
+        summary = summarize_instructions(function['instructions'])
+        return {
+            'size': None,
+            'assembly_lines': summary['total'],
+            'instruction_classes': summary['classes'],
+            'assembly': function['listing'],
+            'full_assembly': asm
+        }
+
+    def _executable_metrics(self, build: Dict[str, Any]) -> Dict[str, Any]:
+        """Size and instruction metrics for main() from the linked executable"""
+        asm, _, _ = self._run_command(['objdump', '-d', build['output']])
+        main_asm = self.extract_main_function(asm)
+        summary = summarize_instructions(objdump_instructions(main_asm))
+        return {
+            'size': os.path.getsize(build['output']),
+            'assembly_lines': summary['total'],
+            'instruction_classes': summary['classes'],
+            'assembly': main_asm,
+            'full_assembly': asm
+        }
+
+    def _limited_command(self, command: List[str]) -> List[str]:
+        """
+        Wrap a command so it execs under CPU time and memory caps
+
+        The limits are set by a shell before exec, not by a preexec_fn, which
+        is unsafe to run in the forked child of a threaded server
+        """
+        if resource is None:
+            return command
+        limits = f'ulimit -t {self.BENCHMARK_CPU_SECONDS} && ulimit -v {self.BENCHMARK_MEMORY_BYTES // 1024}'
+        return ['/bin/sh', '-c', f'{limits} && exec "$@"', 'sh'] + command
+
+    def _run_harness(self, exe: str, temp_dir: str, target_ms: float, repetitions: int) -> Dict[str, Any]:
+        """Run one benchmark harness in a resource-limited subprocess"""
+        try:
+            result = subprocess.run(
+                self._limited_command([exe, str(target_ms), str(repetitions)]),
+                capture_output=True,
+                text=True,
+                cwd=temp_dir,
+                env={},
+                timeout=self.BENCHMARK_CPU_SECONDS
+            )
+        except subprocess.TimeoutExpired:
+            return {'error': 'Benchmark timed out'}
+
+        if result.returncode != 0:
+            return {'error': f'Benchmark exited with status {result.returncode}', 'details': result.stderr}
+
+        try:
+            output = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return {'error': 'Invalid benchmark output', 'details': result.stdout}
+
+        samples = output['samples']
+        mean = statistics.mean(samples)
+        stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+        margin = _t_critical(len(samples) - 1) * stdev / math.sqrt(len(samples))
+
+        return {
+            'ns_per_eval': round(mean, 4),
+            'stdev_ns': round(stdev, 4),
+            'ci95_ns': [round(mean - margin, 4), round(mean + margin, 4)],
+            'median_ns': round(statistics.median(samples), 4),
+            'iterations': output['iterations'],
+            'repetitions': len(samples)
+        }
+
+    def benchmark(self, expression: str, levels=COMPARED_LEVELS, target_ms: float = 10.0,
+                  repetitions: int = 20) -> Dict[str, Any]:
+        """
+        Measure how fast the generated code for an expression runs at each
+        optimization level, in nanoseconds per evaluation with 95% confidence
+        intervals. Levels run one after another so they do not compete for the CPU.
+        """
+        cpp_code = expression_to_benchmark_cpp(expression)
+        temp_dir = tempfile.mkdtemp(prefix='expr_bench_')
+
+        try:
+            cpp_file = os.path.join(temp_dir, 'bench.cpp')
+            with open(cpp_file, 'w') as f:
+                f.write(cpp_code)
+
+            try:
+                builds = self._compile_programs(cpp_file, temp_dir, assembly_only=False, levels=levels)
+            except subprocess.TimeoutExpired:
+                return {'status': 'timeout', 'error': 'Benchmark compilation timeout'}
+
+            for opt_level, build in builds.items():
+                if build['returncode'] != 0:
+                    return {
+                        'status': 'error',
+                        'error': f'Benchmark compilation failed ({opt_level})',
+                        'details': build['stderr']
+                    }
+
+            results = {opt_level: self._run_harness(build['output'], temp_dir, target_ms, repetitions)
+                       for opt_level, build in builds.items()}
+
+            # Speedup of every level relative to the first one measured
+            baseline = results[levels[0]].get('ns_per_eval')
+            for result in results.values():
+                if baseline and result.get('ns_per_eval'):
+                    result['speedup'] = round(baseline / result['ns_per_eval'], 2)
+
+            return {'status': 'success', 'levels': results}
+
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def extract_main_function(asm_text: str) -> str:
+        """Extract the main function from objdump output"""
+        lines = asm_text.split('\n')
+        main_lines = []
+        in_main = False
+
+        for line in lines:
+            if '<main>:' in line or '<_main>:' in line:
+                in_main = True
+                main_lines.append(line)
+            elif in_main:
+                if line.strip() and not line.startswith(' '):
+                    # New function started
+                    break
+                main_lines.append(line)
+
+        return '\n'.join(main_lines)
+
+    def analyze(self, expression: str, include_size: bool = False) -> Dict[str, Any]:
+        """
+        Compile an expression at -O0 and -O2 and compare main() in each build
+
+        By default only assembly for the translation unit is generated;
+        linking, executable size and disassembly happen only with include_size.
+        """
+        cpp_code = expression_to_cpp(expression)
+        temp_dir = tempfile.mkdtemp(prefix='expr_analyze_')
+
+        try:
+            cpp_file = os.path.join(temp_dir, 'expr.cpp')
+            with open(cpp_file, 'w') as f:
+                f.write(expression_to_main_cpp(expression))
+
+            try:
+                builds = self._compile_programs(cpp_file, temp_dir, assembly_only=not include_size)
+            except subprocess.TimeoutExpired:
+                return {'status': 'timeout', 'error': 'Compilation timeout', 'cpp_code': cpp_code}
+
+            for opt_level, build in builds.items():
+                if build['returncode'] != 0:
+                    return {
+                        'status': 'error',
+                        'error': f'Compilation failed ({opt_level})',
+                        'details': build['stderr'],
+                        'stdout': build['stdout'],
+                        'cpp_code': cpp_code
+                    }
+
+            metrics = self._executable_metrics if include_size else self._assembly_metrics
+            levels = {opt_level: metrics(build) for opt_level, build in builds.items()}
+            o0, o2 = levels['O0'], levels['O2']
+
+            # Calculate improvements
+            instr_reduction = ((o0['assembly_lines'] - o2['assembly_lines']) / o0['assembly_lines'] * 100) \
+                if o0['assembly_lines'] > 0 else 0
+            improvement = {
+                'size_reduction_bytes': None,
+                'size_reduction_percent': None,
+                'instruction_reduction': o2['assembly_lines'] - o0['assembly_lines'],
+                'instruction_reduction_percent': round(instr_reduction, 2)
+            }
+            if include_size:
+                size_reduction = ((o0['size'] - o2['size']) / o0['size'] * 100) if o0['size'] > 0 else 0
+                improvement['size_reduction_bytes'] = o0['size'] - o2['size']
+                improvement['size_reduction_percent'] = round(size_reduction, 2)
+
+            return {
+                'status': 'success',
+                'mode': 'executable' if include_size else 'assembly',
+                'expression': expression,
+                'cpp_code': cpp_code,
+                'O0': o0,
+                'O2': o2,
+                'improvement': improvement
+            }
+
+        finally:
+            # Cleanup temporary directory
+            shutil.rmtree(temp_dir, ignore_errors=True)
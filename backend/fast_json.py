@@ -0,0 +1,59 @@
+"""
+Fast JSON Module
+JSON encoding and decoding through orjson when it is installed, falling
+back to the standard library, plus a check for forwarding engine output as is
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library is 2-5x slower
+    orjson = None
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON text or UTF-8 bytes; raises ValueError when malformed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON
+
+    NaN and infinity are encoded as null, matching the engine's output.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass  # Integers beyond 64 bits (large factorials); use the standard encoder
+    return json.dumps(_finite(value), separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def _finite(value: Any) -> Any:
+    """Replace non-finite floats with None (the standard encoder writes NaN)"""
+    if isinstance(value, float):
+        return value if value - value == 0 else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+# A successful engine document opens with "success" and is closed last;
+# a run that fails part way exits non-zero instead
+ENGINE_SUCCESS = '{"success":true,'
+
+
+def is_engine_success(raw: str) -> bool:
+    """
+    Whether engine stdout is a complete success document, checked without
+    decoding it so the text can be forwarded as is
+    """
+    text = raw.rstrip()
+    return text.startswith(ENGINE_SUCCESS) and text.endswith('}')
@@ -0,0 +1,246 @@
+"""
+Native JIT Evaluation Module
+Compiles expressions into shared libraries exporting a vectorized kernel
+and evaluates NumPy arrays through ctypes without spawning a process per call
+"""
+
+import ctypes
+import hashlib
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from cpp_codegen import expression_to_kernel_cpp, CodegenError, KERNEL_SYMBOL
+
+
+class ExpressionJIT:
+    """Builds, caches and loads native evaluation kernels for expressions"""
+
+    COMPILE_FLAGS = ['-std=c++11', '-O3', '-march=native', '-shared', '-fPIC']
+
+    def __init__(self, cache_dir: Optional[str] = None, max_loaded: int = 64,
+                 max_cached_files: int = 256, compile_budget: float = 10.0):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'sec_jit_cache')
+        self.max_loaded = max_loaded
+        self.max_cached_files = max_cached_files
+        self.compile_budget = compile_budget
+
+        # source hash -> loaded kernel function, least recently used first
+        self._kernels = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        # (expression, variable) -> source hash, so lookups can skip codegen
+        self._expression_keys = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _source_hash(self, source: str) -> str:
+        """Hash generated source together with the flags used to build it"""
+        digest = hashlib.sha256()
+        digest.update(' '.join(self.COMPILE_FLAGS).encode())
+        digest.update(b'\0')
+        digest.update(source.encode())
+        return digest.hexdigest()[:32]
+
+    def _load(self, library_path: str):
+        """Load a shared library and bind its kernel symbol"""
+        library = ctypes.CDLL(library_path)
+        kernel = getattr(library, KERNEL_SYMBOL)
+        kernel.argtypes = [
+            ctypes.POINTER(ctypes.c_double),
+            ctypes.POINTER(ctypes.c_double),
+            ctypes.POINTER(ctypes.c_uint8),
+            ctypes.c_size_t
+        ]
+        kernel.restype = None
+        # Keep the library alive for as long as the kernel is referenced
+        kernel._library = library
+        return kernel
+
+    def _evict_files(self):
+        """Remove least recently used libraries beyond the on-disk limit"""
+        libraries = []
+        for file in os.listdir(self.cache_dir):
+            if file.endswith('.so'):
+                path = os.path.join(self.cache_dir, file)
+                try:
+                    libraries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+
+        libraries.sort()
+        for _, path in libraries[:max(0, len(libraries) - self.max_cached_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Ignore cleanup errors
+
+    def _compile(self, source: str, library_path: str) -> Dict[str, Any]:
+        """Compile kernel source into a shared library within the latency budget"""
+        fd, source_path = tempfile.mkstemp(suffix='.cpp', dir=self.cache_dir)
+        temp_library = source_path[:-len('.cpp')] + '.so.tmp'
+
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(source)
+
+            start = time.perf_counter()
+            try:
+                result = subprocess.run(
+                    ['g++'] + self.COMPILE_FLAGS + ['-o', temp_library, source_path],
+                    capture_output=True,
+                    text=True,
+                    timeout=self.compile_budget
+                )
+            except subprocess.TimeoutExpired:
+                return {
+                    'status': 'timeout',
+                    'error': f'Kernel compilation exceeded the {self.compile_budget}s budget'
+                }
+            compile_time = time.perf_counter() - start
+
+            if result.returncode != 0:
+                return {'status': 'error', 'error': 'Kernel compilation failed', 'details': result.stderr}
+
+            # Atomic rename so concurrent processes never load a partial library
+            os.replace(temp_library, library_path)
+            return {'status': 'success', 'compile_time_ms': round(compile_time * 1000, 3)}
+
+        finally:
+            for path in (source_path, temp_library):
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def get_kernel(self, expression: str, variable: str = 'x') -> Dict[str, Any]:
+        """Return the native kernel for an expression, compiling it on first use"""
+        if not re.fullmatch(r'[A-Za-z_]\w*', variable):
+            return {'status': 'error', 'error': f'Invalid variable name: {variable}'}
+
+        # A loaded kernel is found without generating code (which runs the
+        # compiler process to parse the expression)
+        with self._lock:
+            key = self._expression_keys.get((expression, variable))
+            kernel = self._kernels.get(key) if key is not None else None
+            if kernel is not None:
+                self._kernels.move_to_end(key)
+                return {'status': 'success', 'kernel': kernel, 'key': key, 'cached': 'memory'}
+
+        try:
+            source = expression_to_kernel_cpp(expression, variable)
+        except CodegenError as e:
+            return {'status': 'error', 'error': str(e)}
+        key = self._source_hash(source)
+
+        with self._lock:
+            if len(self._expression_keys) >= 16 * self.max_loaded:
+                self._expression_keys.clear()
+            self._expression_keys[(expression, variable)] = key
+            kernel = self._kernels.get(key)
+            if kernel is not None:
+                self._kernels.move_to_end(key)
+                return {'status': 'success', 'kernel': kernel, 'key': key, 'cached': 'memory'}
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Only one thread builds a given kernel; the others wait and reuse it
+        with build_lock:
+            with self._lock:
+                kernel = self._kernels.get(key)
+            if kernel is not None:
+                return {'status': 'success', 'kernel': kernel, 'key': key, 'cached': 'memory'}
+
+            library_path = os.path.join(self.cache_dir, f'kernel_{key}.so')
+            info = {'status': 'success', 'key': key, 'cached': 'disk'}
+
+            if os.path.exists(library_path):
+                os.utime(library_path)
+            else:
+                info = self._compile(source, library_path)
+                if info['status'] != 'success':
+                    info['cpp_code'] = source
+                    return info
+                info.update({'key': key, 'cached': None})
+                self._evict_files()
+
+            kernel = self._load(library_path)
+
+            with self._lock:
+                self._kernels[key] = kernel
+                while len(self._kernels) > self.max_loaded:
+                    self._kernels.popitem(last=False)
+                self._build_locks.pop(key, None)
+
+        info['kernel'] = kernel
+        return info
+
+    def has_kernel(self, expression: str, variable: str = 'x') -> bool:
+        """Whether the kernel for an expression is loaded, without generating code"""
+        with self._lock:
+            return self._expression_keys.get((expression, variable)) in self._kernels
+
+    @staticmethod
+    def _call(kernel, xs: np.ndarray, out: np.ndarray, codes: np.ndarray):
+        """Run a kernel over xs; out and codes must hold at least xs.size values"""
+        # ctypes releases the GIL for the duration of the foreign call
+        kernel(
+            xs.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+            out.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+            codes.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
+            xs.size
+        )
+
+    def evaluate(self, expression: str, values, variable: str = 'x', out=None, codes=None) -> Dict[str, Any]:
+        """
+        Evaluate an expression over an array of values of one variable
+
+        Contiguous float64 input (including read-only buffers and memory
+        maps) is passed to the kernel without copying; results and per-row
+        error codes (see cpp_codegen.KERNEL_ERRORS) are written to out and
+        codes when given.
+        """
+        info = self.get_kernel(expression, variable)
+        if info['status'] != 'success':
+            return info
+
+        xs = np.ascontiguousarray(values, dtype=np.float64).ravel()
+        if out is None:
+            out = np.empty_like(xs)
+        if codes is None:
+            codes = np.empty(xs.size, dtype=np.uint8)
+
+        start = time.perf_counter()
+        self._call(info.pop('kernel'), xs, out, codes)
+        info['eval_time_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        info['results'] = out
+        info['codes'] = codes
+        return info
+
+    def evaluate_blocks(self, expression: str, values: np.ndarray, variable: str = 'x',
+                        block_rows: int = 1 << 20):
+        """
+        Evaluate values block by block, yielding each block's results and codes
+
+        The kernel is looked up once; the yielded arrays are reused for the
+        next block, so memory stays bounded by block_rows. Check get_kernel
+        first to report build errors.
+        """
+        info = self.get_kernel(expression, variable)
+        if info['status'] != 'success':
+            raise RuntimeError(info['error'])
+        kernel = info['kernel']
+
+        out = np.empty(min(len(values), block_rows))
+        codes = np.empty(len(out), dtype=np.uint8)
+        for start in range(0, len(values), block_rows):
+            xs = np.ascontiguousarray(values[start:start + block_rows], dtype=np.float64)
+            self._call(kernel, xs, out, codes)
+            yield out[:len(xs)], codes[:len(xs)]
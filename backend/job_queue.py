@@ -0,0 +1,131 @@
+"""
+Background Job Module
+Runs toolchain builds and analyses off the request path with a bounded
+number of workers, deduplicating identical in-flight jobs
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+
+class JobQueue:
+    """Local job queue; identical submissions attach to the same job"""
+
+    def __init__(self, max_workers: int = 1, max_finished: int = 100):
+        self.max_finished = max_finished
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sec-job')
+        self._condition = threading.Condition()
+        # job id -> job record, oldest first
+        self._jobs = OrderedDict()
+        # dedup key -> job id, for queued and running jobs only
+        self._in_flight = {}
+
+    def _snapshot(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job record"""
+        snapshot = {k: v for k, v in job.items() if k != 'key'}
+        snapshot['progress'] = list(job['progress'])
+        return snapshot
+
+    def _update(self, job: Dict[str, Any], **fields):
+        """Apply changes to a job and wake up anyone waiting on it"""
+        with self._condition:
+            job.update(fields)
+            job['version'] += 1
+            self._condition.notify_all()
+
+    def _run(self, job: Dict[str, Any], func: Callable, args, kwargs):
+        """Execute a job function and record its outcome"""
+        self._update(job, status='running', started_at=time.time())
+
+        def progress(message: str, **details):
+            with self._condition:
+                job['progress'].append(dict(details, message=message, time=time.time()))
+                job['version'] += 1
+                self._condition.notify_all()
+
+        try:
+            result = func(*args, progress=progress, **kwargs)
+            fields = {'status': 'success', 'result': result}
+        except Exception as e:
+            fields = {'status': 'error', 'error': str(e)}
+
+        with self._condition:
+            self._in_flight.pop(job['key'], None)
+            self._update(job, finished_at=time.time(), **fields)
+            self._prune()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] in ('success', 'error')]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, key: Hashable, func: Callable, *args, **kwargs) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue func(*args, progress=callback, **kwargs) unless an identical job is in flight
+
+        Returns the job snapshot and whether a new job was created.
+        """
+        key = (kind, key)
+        with self._condition:
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                job = self._jobs[job_id]
+                job['attached'] += 1
+                return self._snapshot(job), False
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'kind': kind,
+                'key': key,
+                'status': 'queued',
+                'progress': [],
+                'result': None,
+                'error': None,
+                'attached': 1,
+                'version': 0,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self._jobs[job['id']] = job
+            self._in_flight[key] = job['id']
+            snapshot = self._snapshot(job)
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return snapshot, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the current state of a job, or None if it is unknown"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def wait(self, job_id: str, version: int = -1, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job changes past the given version or finishes
+
+        With the default version this waits for the job to finish. Returns
+        the job state at that point (possibly unchanged on timeout).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job['status'] in ('success', 'error'):
+                    return self._snapshot(job)
+                if version >= 0 and job['version'] > version:
+                    return self._snapshot(job)
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return self._snapshot(job)
+                self._condition.wait(remaining)
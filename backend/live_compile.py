@@ -0,0 +1,176 @@
+"""
+Live Compile Module
+Keeps at most one in-flight compile per live-preview session: newer input
+supersedes and cancels older work, and sessions waiting on the same
+expression share a single run
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple
+
+
+class LiveCompiler:
+    """
+    Coalescing, cancellable compiles for live-typing clients
+
+    run(expression, on_process) returns (status, JSON document) like
+    NativeEngine.compile; when it starts a child process it passes it to
+    on_process so the run can be killed once nobody waits for it.
+    """
+
+    def __init__(self, run: Callable[[str, Callable], Tuple[int, str]], max_workers: int = 2,
+                 max_sessions: int = 1024, session_ttl: float = 300.0,
+                 on_result: Optional[Callable[[str, int, str], None]] = None):
+        self.run = run
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.on_result = on_result
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sec-live')
+        self._condition = threading.Condition()
+        # session id -> session, least recently seen first
+        self._sessions = OrderedDict()
+        # expression -> computation, for queued and running compiles only
+        self._computations = {}
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        """Get or create a session, forgetting idle ones (caller holds the lock)"""
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = {'seq': -1, 'computation': None, 'event': None, 'version': 0, 'seen': now}
+            self._sessions[session_id] = session
+        session['seen'] = now
+        self._sessions.move_to_end(session_id)
+
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - oldest['seen'] <= self.session_ttl:
+                break
+            self._detach(oldest_id, oldest)
+            del self._sessions[oldest_id]
+        return session
+
+    def _detach(self, session_id: str, session: Dict[str, Any]):
+        """Stop waiting on the session's compile; cancel it if nobody else waits"""
+        computation = session['computation']
+        session['computation'] = None
+        if computation is None:
+            return
+
+        computation['waiters'].discard(session_id)
+        if not computation['waiters']:
+            computation['cancelled'] = True
+            self.cancelled += 1
+            if self._computations.get(computation['expression']) is computation:
+                del self._computations[computation['expression']]
+            if computation['process'] is not None:
+                computation['process'].kill()
+
+    def _publish(self, session: Dict[str, Any], expression: str, document: str):
+        """Make a result the session's latest event (caller holds the lock)"""
+        session['event'] = '{"seq":%d,"expression":%s,"output":%s}' % (
+            session['seq'], json.dumps(expression), document.strip()
+        )
+        session['version'] += 1
+        self._condition.notify_all()
+
+    def submit(self, session_id: str, seq: int, expression: str,
+               cached: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Record a session's newest input and compile it
+
+        seq orders a session's inputs; stale ones are ignored (returns None).
+        A cached document is published at once. Returns whether the input
+        was answered from the cache or joined another session's compile.
+        """
+        with self._condition:
+            session = self._session(session_id)
+            if seq <= session['seq']:
+                return None
+            session['seq'] = seq
+            self._detach(session_id, session)
+
+            if cached is not None:
+                self._publish(session, expression, cached)
+                return {'cached': True, 'coalesced': False}
+
+            computation = self._computations.get(expression)
+            coalesced = computation is not None
+            if coalesced:
+                self.coalesced += 1
+            else:
+                computation = {'expression': expression, 'waiters': set(),
+                               'process': None, 'cancelled': False}
+                self._computations[expression] = computation
+            computation['waiters'].add(session_id)
+            session['computation'] = computation
+
+        if not coalesced:
+            self._executor.submit(self._compute, computation)
+        return {'cached': False, 'coalesced': coalesced}
+
+    def _attach_process(self, computation: Dict[str, Any], process):
+        """Remember a compile's child process, killing it if already cancelled"""
+        with self._condition:
+            computation['process'] = process
+            if computation['cancelled']:
+                process.kill()
+
+    def _compute(self, computation: Dict[str, Any]):
+        """Run one compile and deliver it to every session still waiting"""
+        expression = computation['expression']
+        if computation['cancelled']:
+            return
+
+        try:
+            status, document = self.run(expression, lambda process: self._attach_process(computation, process))
+        except Exception as e:
+            status, document = 1, json.dumps({'success': False, 'error': str(e)})
+
+        with self._condition:
+            if self._computations.get(expression) is computation:
+                del self._computations[expression]
+            if computation['cancelled']:
+                return
+            for session_id in computation['waiters']:
+                session = self._sessions.get(session_id)
+                if session is not None and session['computation'] is computation:
+                    session['computation'] = None
+                    self._publish(session, expression, document)
+
+        if self.on_result is not None:
+            self.on_result(expression, status, document)
+
+    def wait(self, session_id: str, version: int, timeout: float) -> Tuple[Optional[str], int]:
+        """
+        Block until the session has a result newer than version
+
+        Returns (event JSON or None on timeout, current version).
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                session = self._session(session_id)
+                if session['version'] > version:
+                    return session['event'], session['version']
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, session['version']
+                self._condition.wait(remaining)
+
+    def stats(self) -> Dict[str, Any]:
+        """Open sessions, compiles in flight and work saved"""
+        with self._condition:
+            return {
+                'sessions': len(self._sessions),
+                'in_flight': len(self._computations),
+                'coalesced': self.coalesced,
+                'cancelled': self.cancelled
+            }
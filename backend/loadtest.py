@@ -0,0 +1,285 @@
+"""
+Load Test Module
+Replays a weighted mix of API requests against a local server at rising
+concurrency and reports the saturation curve and its knee
+
+Usage:
+    python loadtest.py --url http://localhost:5000 --levels 1,2,4,8,16,32 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def _expression(rng: random.Random, repeat: float) -> str:
+    if rng.random() < repeat:
+        return rng.choice(['2 + 3 * 4', 'sin(pi/4) + cos(pi/4)', 'sqrt(144) + 2^10',
+                           'diff(x^3, x, 2)', 'integrate(x^2, x, 0, 10)'])
+    a, b, c = rng.randint(1, 999), rng.randint(1, 999), rng.randint(1, 99)
+    return rng.choice([f'{a} * {b} + sin({c})', f'sqrt({a}) / ({b} + 1) - ln({c})',
+                       f'diff(x^3 + {a}*x, x, {c})', f'integrate(x^2 + {c}, x, 0, {a % 20 + 1})'])
+
+def _probability(rng: random.Random, repeat: float) -> str:
+    if rng.random() < repeat:
+        return rng.choice(['nCr(10,3)', 'nCr(5,2)/nCr(10,2)', 'nCr(4,2)*nCr(48,3)/nCr(52,5)'])
+    n = rng.randint(10, 60)
+    r = rng.randint(1, min(n, 8))
+    return rng.choice([f'nCr({n},{r})', f'nPr({n},{r})', f'nCr({n // 2},{r})/nCr({n},{r})'])
+
+# (name, weight, method, path, body factory); bodies take a random.Random
+# and a repeat probability, so a share of requests hits the result caches
+DEFAULT_MIX = [
+    ('compile', 50, 'POST', '/api/compile',
+     lambda rng, repeat: {'expression': _expression(rng, repeat)}),
+    ('pnc', 25, 'POST', '/api/analyze/pnc',
+     lambda rng, repeat: {'expression': _probability(rng, repeat)}),
+    ('analyze-expression', 2, 'POST', '/api/object/analyze-expression',
+     lambda rng, repeat: {'expression': _expression(rng, repeat)}),
+    ('object', 8, 'GET', '/api/analyze/object?level=O0', None),
+    ('optimization', 8, 'GET', '/api/analyze/optimization', None),
+    ('disassembly', 7, 'GET', '/api/analyze/disassembly?level=O2', None),
+]
+
+
+# Throughput within this fraction of the peak counts as saturated
+KNEE_SHORTFALL = 0.10
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reopened when the server closes it"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, int]:
+        """Send one request; returns (status, body size)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        head = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                'Accept-Encoding: identity', 'Connection: keep-alive']
+        if body is not None:
+            head += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        self.writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by the server')
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            size = 0
+            while True:
+                chunk = int((await self.reader.readline()).split(b';')[0], 16)
+                if not chunk:
+                    await self.reader.readline()
+                    break
+                size += len(await self.reader.readexactly(chunk + 2)) - 2
+        elif 'content-length' in headers:
+            size = len(await self.reader.readexactly(int(headers['content-length'])))
+        else:
+            size = len(await self.reader.read())
+            await self.close()
+
+        if (version == b'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive') \
+                or headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(status), size
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Tuple[str, int, float]], seconds: float) -> Dict[str, Any]:
+    """Throughput, outcome rates and latency percentiles of (endpoint, status, latency) samples"""
+    latencies = sorted(latency for _, status, latency in samples if 200 <= status < 400)
+    rejected = sum(1 for _, status, _ in samples if status == 429)
+    errors = sum(1 for _, status, _ in samples if status != 429 and not 200 <= status < 400)
+    total = len(samples)
+    return {
+        'requests': total,
+        'throughput': round(len(latencies) / seconds, 2) if seconds else 0.0,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'reject_rate': round(rejected / total, 4) if total else 0.0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            'p50': _ms(percentile(latencies, 0.50)),
+            'p90': _ms(percentile(latencies, 0.90)),
+            'p99': _ms(percentile(latencies, 0.99)),
+            'max': _ms(latencies[-1] if latencies else None)
+        }
+    }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def find_knee(steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The lowest concurrency that reaches within KNEE_SHORTFALL of the peak
+    throughput
+
+    Beyond it, requests mostly queue: latency grows with concurrency while
+    throughput stays flat. None if only the highest level gets there, i.e.
+    the server may not have saturated yet.
+    """
+    if not steps:
+        return None
+    peak = max(step['throughput'] for step in steps)
+    knee = next(step for step in steps if step['throughput'] >= peak * (1 - KNEE_SHORTFALL))
+    return None if knee is steps[-1] else knee
+
+
+async def run_step(url: str, mix: List[Tuple], concurrency: int, duration: float, warmup: float,
+                   timeout: float, repeat: float, seed: int) -> Dict[str, Any]:
+    """Keep concurrency requests in flight for warmup + duration seconds"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    prefix = parts.path.rstrip('/')
+    weights = [entry[1] for entry in mix]
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    samples = []
+    by_endpoint = {}
+
+    async def worker(index: int):
+        rng = random.Random(seed * 100003 + index)
+        connection = Connection(host, port)
+        try:
+            while loop.time() < stop_at:
+                name, _, method, path, body = rng.choices(mix, weights)[0]
+                payload = None if body is None else json.dumps(body(rng, repeat)).encode()
+                sent = loop.time()
+                try:
+                    status, _ = await asyncio.wait_for(
+                        connection.request(method, prefix + path, payload), timeout
+                    )
+                except (asyncio.TimeoutError, ConnectionError, OSError, ValueError,
+                        asyncio.IncompleteReadError):
+                    await connection.close()
+                    status = 0
+                finished = loop.time()
+                if sent >= measure_from and finished <= stop_at:
+                    samples.append((name, status, finished - sent))
+                    by_endpoint.setdefault(name, []).append((name, status, finished - sent))
+        finally:
+            await connection.close()
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    step = {'concurrency': concurrency}
+    step.update(summarize(samples, duration))
+    step['endpoints'] = {name: summarize(values, duration) for name, values in sorted(by_endpoint.items())}
+    return step
+
+
+def render(steps: List[Dict[str, Any]], knee: Optional[Dict[str, Any]]) -> str:
+    """The saturation curve as a text table with throughput bars"""
+    peak = max((step['throughput'] for step in steps), default=0) or 1
+    lines = [f'{"conc":>5} {"req/s":>9} {"err%":>6} {"429%":>6} {"p50 ms":>9} {"p90 ms":>9} '
+             f'{"p99 ms":>9}  throughput']
+    for step in steps:
+        latency = step['latency_ms']
+        cells = [f'{latency[key]:>9.1f}' if latency[key] is not None else f'{"-":>9}'
+                 for key in ('p50', 'p90', 'p99')]
+        bar = '#' * int(round(30 * step['throughput'] / peak))
+        marker = '  <- knee' if step is knee else ''
+        lines.append(f'{step["concurrency"]:>5} {step["throughput"]:>9.1f} '
+                     f'{step["error_rate"] * 100:>6.1f} {step["reject_rate"] * 100:>6.1f} '
+                     f'{" ".join(cells)}  {bar}{marker}')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Step up concurrency against a local server and '
+                                                 'report the saturation curve')
+    parser.add_argument('--url', default='http://localhost:5000', help='server base URL')
+    parser.add_argument('--levels', default='1,2,4,8,16,32,64',
+                        help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per level')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds per level')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--repeat', type=float, default=0.5,
+                        help='share of requests reusing a fixed expression (cache hits)')
+    parser.add_argument('--mix', default=None,
+                        help='endpoint weights overriding the defaults, e.g. compile=80,pnc=20')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='write the curve as JSON to this file')
+    args = parser.parse_args(argv)
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        weights = {}
+        for item in args.mix.split(','):
+            name, _, weight = item.partition('=')
+            weights[name.strip()] = float(weight)
+        unknown = set(weights) - {entry[0] for entry in DEFAULT_MIX}
+        if unknown:
+            parser.error(f'Unknown endpoints in --mix: {", ".join(sorted(unknown))}')
+        mix = [(name, weights[name], *rest) for name, _, *rest in DEFAULT_MIX if weights.get(name, 0) > 0]
+
+    levels = [int(level) for level in args.levels.split(',')]
+    steps = []
+    for concurrency in levels:
+        step = asyncio.run(run_step(args.url, mix, concurrency, args.duration, args.warmup,
+                                    args.timeout, args.repeat, args.seed))
+        steps.append(step)
+        print(f'concurrency {concurrency}: {step["throughput"]:.1f} req/s, '
+              f'p99 {step["latency_ms"]["p99"]} ms', file=sys.stderr)
+
+    knee = find_knee(steps)
+    print(render(steps, knee))
+    if knee is None:
+        print('\nNo knee: only the highest level reached peak throughput; add higher levels')
+    else:
+        print(f'\nKnee at concurrency {knee["concurrency"]}: {knee["throughput"]:.1f} req/s, '
+              f'p99 {knee["latency_ms"]["p99"]} ms; peak {max(s["throughput"] for s in steps):.1f} req/s')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'url': args.url,
+                'duration': args.duration,
+                'mix': {entry[0]: entry[1] for entry in mix},
+                'steps': steps,
+                'knee': None if knee is None else knee['concurrency']
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Monte Carlo Verification Module
+Recognizes urn and selection models in nCr/nPr probability expressions and
+estimates them empirically with NumPy-batched draws across a process pool
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+
+# Trials per NumPy batch, bounding memory per worker
+BATCH_TRIALS = 1 << 21
+
+# Fewer trials than this per worker are not worth a process
+MIN_TRIALS_PER_WORKER = 1 << 22
+
+# NumPy's hypergeometric sampler needs smaller populations
+MAX_POPULATION = 10 ** 9 - 1
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+class ModelError(ValueError):
+    """Raised when an expression is not a recognized urn or selection model"""
+    pass
+
+
+def _constant(node: Dict[str, Any]) -> Optional[float]:
+    """Value of a constant integer-arithmetic subtree, or None"""
+    node_type = node.get('type')
+    if node_type == 'NUMBER':
+        return node['value']
+    if node_type == 'UNARY_OP' and node['op'] == 'neg':
+        value = _constant(node['operand'])
+        return None if value is None else -value
+    if node_type == 'BINARY_OP' and node['op'] in ('+', '-', '*'):
+        left, right = _constant(node['left']), _constant(node['right'])
+        if left is None or right is None:
+            return None
+        return {'+': left + right, '-': left - right, '*': left * right}[node['op']]
+    return None
+
+
+def _arguments(node: Dict[str, Any]) -> Tuple[int, int]:
+    """(n, r) of an nCr/nPr node with constant non-negative integer arguments"""
+    values = [_constant(node['n']), _constant(node['r'])]
+    if any(value is None or value < 0 or value != int(value) for value in values):
+        raise ModelError(f'{node["type"]} arguments must be constant non-negative integers')
+    n, r = (int(value) for value in values)
+    if r > n:
+        raise ModelError(f'{node["type"]} requires n >= r')
+    return n, r
+
+
+def _factors(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Operands of a product, flattened"""
+    if node.get('type') == 'BINARY_OP' and node['op'] == '*':
+        return _factors(node['left']) + _factors(node['right'])
+    return [node]
+
+
+def is_ratio(ast: Dict[str, Any]) -> bool:
+    """Whether an engine AST is a ratio, favorable / total, at its root"""
+    return ast.get('type') == 'BINARY_OP' and ast.get('op') == '/'
+
+
+def recognize(ast: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Match an engine AST against the supported models
+
+    - prod nCr(K_i, k_i) / nCr(N, n): k_i of n unordered draws without
+      replacement come from group i of sizes K_i (the remaining
+      N - sum K_i items may take no draws); 1 / nCr(N, n) is one given subset
+    - nPr(K, n) / nPr(N, n): all n ordered draws come from a group of K
+    - 1 / nPr(N, n): n ordered draws produce one given sequence
+    """
+    if not is_ratio(ast):
+        raise ModelError('Expected a ratio of counts, favorable / total')
+
+    denominator = _factors(ast['right'])
+    if len(denominator) != 1 or denominator[0].get('type') not in ('NCR', 'NPR'):
+        raise ModelError('The denominator must be a single nCr(N, n) or nPr(N, n)')
+    kind = denominator[0]['type']
+    population, draws = _arguments(denominator[0])
+    if population > MAX_POPULATION:
+        raise ModelError(f'Populations above {MAX_POPULATION} are not supported')
+
+    groups, counts = [], []
+    for factor in _factors(ast['left']):
+        if factor.get('type') == 'NUMBER' and factor['value'] == 1:
+            continue
+        if factor.get('type') != kind:
+            raise ModelError(f'Every numerator factor must be {kind.replace("NCR", "nCr").replace("NPR", "nPr")}(K, k)')
+        size, count = _arguments(factor)
+        groups.append(size)
+        counts.append(count)
+
+    if kind == 'NPR':
+        if not groups:
+            return {'model': 'sequence', 'population': population, 'draws': draws}
+        if len(groups) != 1 or counts[0] != draws:
+            raise ModelError('An nPr ratio must be nPr(K, n) / nPr(N, n)')
+    elif not groups:
+        groups, counts = [draws], [draws]
+
+    if sum(groups) > population:
+        raise ModelError('The groups hold more items than the population')
+    if sum(counts) != draws:
+        raise ModelError('The numerator must account for every draw')
+
+    return {'model': 'hypergeometric', 'population': population, 'draws': draws,
+            'groups': groups, 'counts': counts}
+
+
+def exact_probability(model: Dict[str, Any]) -> float:
+    """The model's probability in exact integer arithmetic"""
+    if model['model'] == 'sequence':
+        return 1 / math.perm(model['population'], model['draws'])
+    favorable = 1
+    for size, count in zip(model['groups'], model['counts']):
+        favorable *= math.comb(size, count)
+    return favorable / math.comb(model['population'], model['draws'])
+
+
+def _successes(model: Dict[str, Any], trials: int, seed: np.random.SeedSequence,
+               deadline: Optional[float] = None) -> int:
+    """
+    Run trials with one independent stream; returns the number of successes
+
+    deadline is a time.time() value checked before each batch, so a worker
+    stops on its own once the caller has given up; past it, TimeoutError
+    is raised.
+    """
+    rng = np.random.default_rng(seed)
+    population, draws = model['population'], model['draws']
+    successes = 0
+
+    for start in range(0, trials, BATCH_TRIALS):
+        if deadline is not None and time.time() > deadline:
+            raise TimeoutError('Simulation timeout')
+        alive = min(BATCH_TRIALS, trials - start)
+
+        if model['model'] == 'sequence':
+            # Draw i must pick the given item among the N - i left; only
+            # trials that matched so far draw again
+            for i in range(draws):
+                alive = int(np.count_nonzero(rng.integers(0, population - i, size=alive) == 0))
+                if not alive:
+                    break
+            successes += alive
+            continue
+
+        # Count each group's share of the draws in turn, from what is left,
+        # keeping only trials that matched every group so far
+        remaining = population
+        left = np.full(alive, draws, dtype=np.int64)
+        for size, count in zip(model['groups'], model['counts']):
+            if size == remaining:
+                # Every item left belongs to this group, so it takes all draws
+                break
+            drawn = rng.hypergeometric(size, remaining - size, left)
+            matched = drawn == count
+            left = left[matched] - count
+            remaining -= size
+            if not len(left):
+                break
+        successes += len(left)
+
+    return successes
+
+
+def wilson_interval(successes: int, trials: int, z: float = Z_95) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion"""
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class MonteCarlo:
+    """Runs simulations on a shared, lazily started process pool"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Workers come from a fork server rather than forking the
+                # threaded server process, whose locks may be held mid-request
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('forkserver'))
+            return self._executor
+
+    def simulate(self, model: Dict[str, Any], trials: int, seed: Optional[int] = None,
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Estimate a model's probability from independent trials
+
+        Trials are split across workers, each with its own stream spawned
+        from one SeedSequence, so a seed reproduces the run exactly for the
+        same worker count. Past timeout seconds, TimeoutError is raised and
+        every chunk stops within a batch.
+        """
+        root = np.random.SeedSequence(seed)
+        workers = max(1, min(self.max_workers, trials // MIN_TRIALS_PER_WORKER))
+        shares = [trials // workers + (1 if i < trials % workers else 0) for i in range(workers)]
+        streams = root.spawn(workers)
+
+        start = time.perf_counter()
+        # Wall-clock, as workers in other processes compare against it
+        deadline = None if timeout is None else time.time() + timeout
+        if trials < MIN_TRIALS_PER_WORKER:
+            successes = _successes(model, trials, streams[0], deadline)
+        else:
+            # Large runs go to the pool even with one worker, so the caller's
+            # timeout applies
+            pool = self._pool()
+            futures = [pool.submit(_successes, model, share, stream, deadline)
+                       for share, stream in zip(shares, streams)]
+            try:
+                successes = sum(
+                    future.result(timeout=None if deadline is None else max(0, deadline - time.time()))
+                    for future in futures
+                )
+            finally:
+                # Queued chunks are dropped here; running ones stop at their
+                # next batch on the deadline
+                for future in futures:
+                    future.cancel()
+        seconds = time.perf_counter() - start
+
+        exact = exact_probability(model)
+        estimate = successes / trials
+        low, high = wilson_interval(successes, trials)
+        spread = math.sqrt(exact * (1 - exact) / trials)
+        return {
+            'model': model,
+            'trials': trials,
+            'successes': successes,
+            'estimate': estimate,
+            'exact': exact,
+            'confidenceInterval': [low, high],
+            'confidenceLevel': 0.95,
+            'consistent': low <= exact <= high,
+            'zScore': (estimate - exact) / spread if spread > 0 else 0.0,
+            'seconds': round(seconds, 4),
+            'trialsPerSecond': round(trials / seconds) if seconds > 0 else None,
+            'workers': workers,
+            'seed': root.entropy
+        }
@@ -0,0 +1,97 @@
+"""
+Native Engine Module
+Calls the compiler engine in-process through its shared library C ABI
+(compiler/engine.h) instead of spawning the compiler per request
+"""
+
+import ctypes
+import os
+import sys
+from typing import Optional, Tuple
+
+
+ABI_VERSION = 1
+
+# Flags of sec_compile
+AST_ONLY = 1
+
+LIBRARY_NAME = 'secengine.dll' if sys.platform == 'win32' else 'libsecengine.so'
+
+# Recursion the in-process engine may reach. The parser, evaluator and JSON
+# writer recurse once per level; depth 999 already overflows a 1 MB thread
+# stack (the Windows default) with an -O2 build
+MAX_DEPTH = 200
+
+
+def nesting_depth(expression: str) -> int:
+    """
+    Upper bound on the engine's recursion depth for an expression
+
+    Every operator, function call and opening parenthesis can add a level:
+    unary operators and function calls nest, and a chain of binary
+    operators builds an AST as deep as the chain is long. Counted in one
+    pass over the characters, without tokenizing.
+    """
+    depth = 0
+    previous = ''
+    for char in expression:
+        if char in '+-*/%^!(,':
+            depth += 1
+        elif char.isalpha() and not (previous.isalnum() or previous == '_'):
+            # The start of a name: a function call or a variable
+            depth += 1
+        if not char.isspace():
+            previous = char
+    return depth
+
+
+class NativeEngine:
+    """
+    ctypes binding of sec_compile; safe to call from many threads
+
+    Calls run on the caller's thread stack, so only expressions within
+    MAX_DEPTH (see nesting_depth) are safe to pass; deeper ones belong in
+    the compiler process, where a stack overflow cannot take the server down.
+    """
+
+    def __init__(self, library_path: str):
+        self.library_path = library_path
+
+        library = ctypes.CDLL(library_path)
+        if library.sec_abi_version() != ABI_VERSION:
+            raise OSError(f'{library_path} has an incompatible engine ABI')
+
+        self._compile = library.sec_compile
+        self._compile.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.POINTER(ctypes.c_void_p)]
+        self._compile.restype = ctypes.c_int
+        self._free = library.sec_free
+        self._free.argtypes = [ctypes.c_void_p]
+        self._free.restype = None
+
+    @classmethod
+    def load(cls, compiler_dir: str) -> Optional['NativeEngine']:
+        """Load the library built by `make` in compiler_dir, or None if it is missing"""
+        path = os.path.join(compiler_dir, LIBRARY_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, AttributeError):
+            return None
+
+    def compile(self, expression: str, ast_only: bool = False) -> Tuple[int, str]:
+        """
+        Compile an expression; returns (status, JSON text)
+
+        Status 0 carries the result document and 1 the error document,
+        exactly as the compiler writes them to stdout and stderr.
+        """
+        document = ctypes.c_void_p()
+        # ctypes releases the GIL for the duration of the foreign call
+        status = self._compile(expression.encode(), AST_ONLY if ast_only else 0, ctypes.byref(document))
+        if status < 0:
+            raise MemoryError('The engine ran out of memory')
+        try:
+            return status, ctypes.string_at(document.value).decode()
+        finally:
+            self._free(document)
@@ -8,107 +8,346 @@ import subprocess
 import re
 import json
 import os
+import hashlib
+import shutil
+import tempfile
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 
+from result_store import file_fingerprint
+
+
+def _run_command(cmd: List[str]) -> tuple[str, str, int]:
+    """Safely execute command and capture output"""
+    try:
+        result = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        return result.stdout, result.stderr, result.returncode
+    except subprocess.TimeoutExpired:
+        return "", "Command timed out", -1
+    except Exception as e:
+        return "", str(e), -1
+
+
+def _build_profile(compiler_dir: str, opt_level: str, flags: List[str],
+                   cpp_files: List[str], output_file: str) -> Dict[str, Any]:
+    """
+    Build one optimization profile into a single relocatable object file.
+    Runs in a worker process; intermediate .o files go to a private
+    directory so concurrent profiles never overwrite each other.
+    """
+    build_dir = tempfile.mkdtemp(prefix=f'sec_build_{opt_level}_')
+
+    try:
+        # Step 1: Compile each .cpp file to .o
+        object_files = []
+        for cpp_file in cpp_files:
+            obj_file = os.path.join(build_dir, cpp_file.replace('.cpp', '.o'))
+            object_files.append(obj_file)
+
+            cmd = ['g++', '-std=c++17', '-Wall', '-Wextra'] + flags + \
+                  ['-c', os.path.join(compiler_dir, cpp_file), '-o', obj_file]
+
+            stdout, stderr, returncode = _run_command(cmd)
+
+            if returncode != 0:
+                return {'level': opt_level, 'error': f'Compilation failed for {cpp_file}: {stderr}'}
+
+        # Step 2: Combine .o files into single relocatable object file using ld
+        temp_output = os.path.join(build_dir, os.path.basename(output_file))
+        stdout, stderr, returncode = _run_command(['ld', '-r', '-o', temp_output] + object_files)
+
+        if returncode != 0 or not os.path.exists(temp_output):
+            return {'level': opt_level, 'error': f'Linking failed for {opt_level}: {stderr}'}
+
+        shutil.move(temp_output, output_file)
+        return {'level': opt_level, 'file': output_file, 'size': os.path.getsize(output_file)}
+
+    finally:
+        # Step 3: Clean up individual .o files
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+@functools.lru_cache(maxsize=None)
+def binutils_version() -> str:
+    """First line of objdump --version; reports change with binutils releases"""
+    stdout, _, _ = _run_command(['objdump', '--version'])
+    return stdout.split('\n', 1)[0]
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_version() -> str:
+    """Full g++ --version output; a toolchain upgrade invalidates built profiles"""
+    stdout, _, _ = _run_command(['g++', '--version'])
+    return stdout
+
+
+def read_symbol_table(obj_file: str) -> Dict[str, Any]:
+    """Symbols of an object file by category, using nm"""
+    # Get symbols with demangling
+    cmd = ['nm', '-C', '--size-sort', obj_file]
+    stdout, stderr, returncode = _run_command(cmd)
+    
+    if returncode != 0:
+        return {'error': stderr}
+    
+    symbols = {
+        'global': [],
+        'local': [],
+        'undefined': [],
+        'weak': []
+    }
+    
+    for line in stdout.split('\n'):
+        if not line.strip():
+            continue
+        
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        
+        symbol_type = parts[-2] if len(parts) >= 2 else 'U'
+        symbol_name = parts[-1]
+        
+        symbol_info = {
+            'name': symbol_name,
+            'type': symbol_type,
+            'address': parts[0] if len(parts) >= 3 else '0'
+        }
+        
+        # Categorize symbols
+        if symbol_type in ['T', 'D', 'R', 'B']:
+            symbols['global'].append(symbol_info)
+        elif symbol_type in ['t', 'd', 'r', 'b']:
+            symbols['local'].append(symbol_info)
+        elif symbol_type == 'U':
+            symbols['undefined'].append(symbol_info)
+        elif symbol_type in ['W', 'w', 'V', 'v']:
+            symbols['weak'].append(symbol_info)
+    
+    return {
+        'symbols': symbols,
+        'total_symbols': sum(len(v) for v in symbols.values())
+    }
+
+
+def read_elf_sections(obj_file: str) -> Dict[str, Any]:
+    """ELF section headers of an object file, using readelf"""
+    # Get section headers
+    cmd = ['readelf', '-S', obj_file]
+    stdout, stderr, returncode = _run_command(cmd)
+    
+    if returncode != 0:
+        return {'error': stderr}
+    
+    sections = []
+    for line in stdout.split('\n'):
+        # Parse section header lines
+        # Format: [ 1] .text             PROGBITS         0000000000000000  00000040
+        match = re.match(r'\s*\[\s*\d+\]\s+(\S+)\s+(\S+)\s+([0-9a-f]+)\s+([0-9a-f]+)\s+([0-9a-f]+)', line)
+        if match:
+            sections.append({
+                'name': match.group(1),
+                'type': match.group(2),
+                'address': match.group(3),
+                'offset': match.group(4),
+                'size': int(match.group(5), 16)
+            })
+    
+    return {
+        'sections': sections,
+        'total_sections': len(sections)
+    }
+
+
+def read_size_metrics(obj_file: str) -> Dict[str, Any]:
+    """Section sizes of an object file, using size"""
+    # Get size information
+    cmd = ['size', '-A', obj_file]
+    stdout, stderr, returncode = _run_command(cmd)
+    
+    if returncode != 0:
+        # Try BSD format as fallback
+        cmd = ['size', obj_file]
+        stdout, stderr, returncode = _run_command(cmd)
+        if returncode != 0:
+            return {'error': stderr}
+    
+    metrics = {
+        'text': 0,
+        'data': 0,
+        'bss': 0,
+        'rodata': 0,
+        'total': 0
+    }
+    
+    # Parse output; -ffunction-sections style names (.text._Z..., .rodata.str1.1)
+    # are summed into their base section
+    for line in stdout.split('\n'):
+        parts = line.split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            continue
+        for section in ('text', 'data', 'bss', 'rodata'):
+            if parts[0] == f'.{section}' or parts[0].startswith(f'.{section}.'):
+                metrics[section] += int(parts[1])
+                break
+    
+    metrics['total'] = metrics['text'] + metrics['data'] + metrics['bss'] + metrics['rodata']
+    
+    return {
+        'metrics': metrics
+    }
+
+
+def _with_level(opt_level: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Label a report with the profile it describes"""
+    return result if 'error' in result else {'optimization': opt_level, **result}
+
+
+def _stored(report: str):
+    """Serve an analysis method through the analyzer's result store, if it has one"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, opt_level: str = 'O0') -> Dict[str, Any]:
+            obj_file = self.object_files.get(opt_level)
+            if self.store is None or not obj_file or not os.path.exists(obj_file):
+                return method(self, opt_level)
+
+            def compute():
+                result = method(self, opt_level)
+                return result, 'error' not in result
+
+            result, _ = self.store.cached(
+                f'object:{report}',
+                f'{file_fingerprint(obj_file)}:{binutils_version()}',
+                opt_level,
+                compute
+            )
+            return result
+        return wrapper
+    return decorator
+
 
 class ObjectFileAnalyzer:
     """Analyzes object files using objdump, nm, readelf, and size utilities"""
     
-    def __init__(self, compiler_dir: str = "../compiler"):
+    # Optimization profiles that can be built and compared
+    OPTIMIZATION_PROFILES = {
+        'O0': ['-O0'],
+        'O1': ['-O1'],
+        'O2': ['-O2'],
+        'O3': ['-O3'],
+        'Os': ['-Os'],
+        'O2-native': ['-O2', '-march=native']
+    }
+    DEFAULT_PROFILES = ('O0', 'O2')
+    
+    def __init__(self, compiler_dir: str = "../compiler", store=None):
         self.compiler_dir = compiler_dir
+        # Optional ResultStore; reports are keyed by the object file's content hash
+        self.store = store
         self.object_files = {
-            'O0': os.path.join(compiler_dir, 'compiler_O0.o'),
-            'O2': os.path.join(compiler_dir, 'compiler_O2.o')
+            level: os.path.join(compiler_dir, f'compiler_{level}.o')
+            for level in self.OPTIMIZATION_PROFILES
         }
     
     def _run_command(self, cmd: List[str]) -> tuple[str, str, int]:
         """Safely execute command and capture output"""
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            return result.stdout, result.stderr, result.returncode
-        except subprocess.TimeoutExpired:
-            return "", "Command timed out", -1
-        except Exception as e:
-            return "", str(e), -1
+        return _run_command(cmd)
+    
+    def _source_files(self) -> List[str]:
+        """Engine sources that make up the analyzed object file"""
+        return sorted(file for file in os.listdir(self.compiler_dir)
+                      if file.endswith('.cpp') and file != 'main.cpp')
+    
+    def _profile_key(self, opt_level: str) -> str:
+        """Hash of sources, headers, flags and toolchain for one profile"""
+        digest = hashlib.sha256()
+        for file in sorted(os.listdir(self.compiler_dir)):
+            if file.endswith(('.cpp', '.h')) and file != 'main.cpp':
+                fingerprint = file_fingerprint(os.path.join(self.compiler_dir, file))
+                digest.update(file.encode() + b'\0' + fingerprint.encode())
+        digest.update(compiler_version().encode())
+        digest.update(' '.join(self.OPTIMIZATION_PROFILES[opt_level]).encode())
+        return digest.hexdigest()
+    
+    def _stamp_file(self, opt_level: str) -> str:
+        return self.object_files[opt_level] + '.stamp'
+    
+    def is_current(self, opt_level: str, key: Optional[str] = None) -> bool:
+        """Check whether a profile's object file was built from the current sources"""
+        stamp = self._stamp_file(opt_level)
+        if not os.path.exists(self.object_files[opt_level]) or not os.path.exists(stamp):
+            return False
+        with open(stamp) as f:
+            return f.read().strip() == (key or self._profile_key(opt_level))
     
-    def build_object_files(self) -> Dict[str, Any]:
-        """Compile source files to object files with different optimization levels"""
+    def build_object_files(self, levels=DEFAULT_PROFILES, force: bool = False,
+                           max_workers: Optional[int] = None, progress=None) -> Dict[str, Any]:
+        """
+        Compile source files to object files for each optimization profile.
+        Profiles are built concurrently in a process pool of at most max_workers
+        lower-priority processes; a profile whose sources, flags and toolchain
+        are unchanged is reused from its last build. progress, if given, is
+        called with a message after each profile.
+        """
         results = {'status': 'success', 'built': []}
         
         # Get all .cpp files
-        cpp_files = []
-        for file in os.listdir(self.compiler_dir):
-            if file.endswith('.cpp') and file != 'main.cpp':
-                cpp_files.append(file)  # Store just filename, not full path
+        cpp_files = self._source_files()
         
         if not cpp_files:
             return {'status': 'error', 'message': 'No source files found'}
         
-        # Build with -O0 and -O2
-        for opt_level, opt_flag in [('O0', '-O0'), ('O2', '-O2')]:
-            output_file = self.object_files[opt_level]
-            
-            # Step 1: Compile each .cpp file to .o (in compiler directory)
-            object_files = []
-            compile_failed = False
-            
-            for cpp_file in cpp_files:
-                obj_file = cpp_file.replace('.cpp', '.o')
-                object_files.append(obj_file)
-                
-                # Compile with full path
-                cmd = ['g++', '-std=c++17', '-Wall', '-Wextra', opt_flag, '-c', 
-                       os.path.join(self.compiler_dir, cpp_file),
-                       '-o', os.path.join(self.compiler_dir, obj_file)]
-                
-                stdout, stderr, returncode = self._run_command(cmd)
-                
-                if returncode != 0:
-                    results['status'] = 'error'
-                    results['error'] = f'Compilation failed for {cpp_file}: {stderr}'
-                    compile_failed = True
-                    break
-            
-            if compile_failed:
-                # Clean up any created .o files
-                for obj_file in object_files:
-                    obj_path = os.path.join(self.compiler_dir, obj_file)
-                    if os.path.exists(obj_path):
-                        os.remove(obj_path)
-                continue
-            
-            # Step 2: Combine .o files into single relocatable object file using ld
-            ld_cmd = ['ld', '-r', '-o', output_file] + \
-                     [os.path.join(self.compiler_dir, obj) for obj in object_files]
-            
-            stdout, stderr, returncode = self._run_command(ld_cmd)
-            
-            if returncode == 0 and os.path.exists(output_file):
+        keys = {level: self._profile_key(level) for level in levels}
+        pending = []
+        for level in levels:
+            if not force and self.is_current(level, keys[level]):
                 results['built'].append({
-                    'level': opt_level,
-                    'file': output_file,
-                    'size': os.path.getsize(output_file)
+                    'level': level,
+                    'file': self.object_files[level],
+                    'size': os.path.getsize(self.object_files[level]),
+                    'cached': True
                 })
             else:
-                results['status'] = 'partial'
-                results['error'] = f'Linking failed for {opt_level}: {stderr}'
+                pending.append(level)
+        
+        if pending:
+            workers = min(len(pending), max_workers or os.cpu_count() or 1)
+            # Niceness is inherited by g++, keeping builds behind request handling.
+            # Workers come from a fork server, not a fork of the threaded server
+            with ProcessPoolExecutor(max_workers=workers, initializer=os.nice, initargs=(10,),
+                                     mp_context=multiprocessing.get_context('forkserver')) as pool:
+                futures = [
+                    pool.submit(_build_profile, self.compiler_dir, level, self.OPTIMIZATION_PROFILES[level],
+                                cpp_files, self.object_files[level])
+                    for level in pending
+                ]
+                for completed, future in enumerate(futures, 1):
+                    built = future.result()
+                    if progress:
+                        progress(f"{'Failed' if 'error' in built else 'Built'} {built['level']}",
+                                 completed=completed, total=len(pending))
+                    if 'error' in built:
+                        results['error'] = built['error']
+                        continue
+                    with open(self._stamp_file(built['level']), 'w') as f:
+                        f.write(keys[built['level']])
+                    built['cached'] = False
+                    results['built'].append(built)
             
-            # Step 3: Clean up individual .o files
-            for obj_file in object_files:
-                obj_path = os.path.join(self.compiler_dir, obj_file)
-                if os.path.exists(obj_path):
-                    try:
-                        os.remove(obj_path)
-                    except:
-                        pass  # Ignore cleanup errors
+            if 'error' in results:
+                results['status'] = 'partial' if results['built'] else 'error'
         
         return results
     
+    @_stored('disassembly')
     def get_disassembly(self, opt_level: str = 'O0') -> Dict[str, Any]:
         """Extract disassembly using objdump"""
         obj_file = self.object_files.get(opt_level)
@@ -166,142 +405,32 @@ class ObjectFileAnalyzer:
             'instruction_frequency': instruction_freq
         }
     
+    @_stored('symbols')
     def get_symbol_table(self, opt_level: str = 'O0') -> Dict[str, Any]:
         """Extract symbol table using nm"""
         obj_file = self.object_files.get(opt_level)
         if not obj_file or not os.path.exists(obj_file):
             return {'error': f'Object file not found: {obj_file}'}
         
-        # Get symbols with demangling
-        cmd = ['nm', '-C', '--size-sort', obj_file]
-        stdout, stderr, returncode = self._run_command(cmd)
-        
-        if returncode != 0:
-            return {'error': stderr}
-        
-        symbols = {
-            'global': [],
-            'local': [],
-            'undefined': [],
-            'weak': []
-        }
-        
-        for line in stdout.split('\n'):
-            if not line.strip():
-                continue
-            
-            parts = line.split()
-            if len(parts) < 2:
-                continue
-            
-            symbol_type = parts[-2] if len(parts) >= 2 else 'U'
-            symbol_name = parts[-1]
-            
-            symbol_info = {
-                'name': symbol_name,
-                'type': symbol_type,
-                'address': parts[0] if len(parts) >= 3 else '0'
-            }
-            
-            # Categorize symbols
-            if symbol_type in ['T', 'D', 'R', 'B']:
-                symbols['global'].append(symbol_info)
-            elif symbol_type in ['t', 'd', 'r', 'b']:
-                symbols['local'].append(symbol_info)
-            elif symbol_type == 'U':
-                symbols['undefined'].append(symbol_info)
-            elif symbol_type in ['W', 'w', 'V', 'v']:
-                symbols['weak'].append(symbol_info)
-        
-        return {
-            'optimization': opt_level,
-            'symbols': symbols,
-            'total_symbols': sum(len(v) for v in symbols.values())
-        }
+        return _with_level(opt_level, read_symbol_table(obj_file))
     
+    @_stored('sections')
     def get_elf_sections(self, opt_level: str = 'O0') -> Dict[str, Any]:
         """Extract ELF section information using readelf"""
         obj_file = self.object_files.get(opt_level)
         if not obj_file or not os.path.exists(obj_file):
             return {'error': f'Object file not found: {obj_file}'}
         
-        # Get section headers
-        cmd = ['readelf', '-S', obj_file]
-        stdout, stderr, returncode = self._run_command(cmd)
-        
-        if returncode != 0:
-            return {'error': stderr}
-        
-        sections = []
-        for line in stdout.split('\n'):
-            # Parse section header lines
-            # Format: [ 1] .text             PROGBITS         0000000000000000  00000040
-            match = re.match(r'\s*\[\s*\d+\]\s+(\S+)\s+(\S+)\s+([0-9a-f]+)\s+([0-9a-f]+)\s+([0-9a-f]+)', line)
-            if match:
-                sections.append({
-                    'name': match.group(1),
-                    'type': match.group(2),
-                    'address': match.group(3),
-                    'offset': match.group(4),
-                    'size': int(match.group(5), 16)
-                })
-        
-        return {
-            'optimization': opt_level,
-            'sections': sections,
-            'total_sections': len(sections)
-        }
+        return _with_level(opt_level, read_elf_sections(obj_file))
     
+    @_stored('size')
     def get_size_metrics(self, opt_level: str = 'O0') -> Dict[str, Any]:
         """Extract size metrics using size utility"""
         obj_file = self.object_files.get(opt_level)
         if not obj_file or not os.path.exists(obj_file):
             return {'error': f'Object file not found: {obj_file}'}
         
-        # Get size information
-        cmd = ['size', '-A', obj_file]
-        stdout, stderr, returncode = self._run_command(cmd)
-        
-        if returncode != 0:
-            # Try BSD format as fallback
-            cmd = ['size', obj_file]
-            stdout, stderr, returncode = self._run_command(cmd)
-            if returncode != 0:
-                return {'error': stderr}
-        
-        metrics = {
-            'text': 0,
-            'data': 0,
-            'bss': 0,
-            'rodata': 0,
-            'total': 0
-        }
-        
-        # Parse output
-        for line in stdout.split('\n'):
-            if '.text' in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    metrics['text'] = int(parts[1]) if parts[1].isdigit() else 0
-            elif '.data' in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    metrics['data'] = int(parts[1]) if parts[1].isdigit() else 0
-            elif '.bss' in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    metrics['bss'] = int(parts[1]) if parts[1].isdigit() else 0
-            elif '.rodata' in line:
-                parts = line.split()
-                if len(parts) >= 2:
-                    metrics['rodata'] = int(parts[1]) if parts[1].isdigit() else 0
-        
-        metrics['total'] = metrics['text'] + metrics['data'] + metrics['bss'] + metrics['rodata']
-        
-        return {
-            'optimization': opt_level,
-            'metrics': metrics
-        }
+        return _with_level(opt_level, read_size_metrics(obj_file))
     
     def compare_optimizations(self) -> Dict[str, Any]:
         """Compare -O0 vs -O2 optimizations"""
@@ -355,6 +484,54 @@ class ObjectFileAnalyzer:
         
         return comparison
     
+    def _profile_summary(self, opt_level: str) -> Dict[str, Any]:
+        """Instruction, section size and symbol counts for one profile"""
+        disasm = self.get_disassembly(opt_level)
+        size = self.get_size_metrics(opt_level)
+        symbols = self.get_symbol_table(opt_level)
+        
+        for result in (disasm, size, symbols):
+            if 'error' in result:
+                return {'error': result['error']}
+        
+        return {
+            'flags': ' '.join(self.OPTIMIZATION_PROFILES[opt_level]),
+            'instructions': disasm['total_instructions'],
+            'functions': disasm['total_functions'],
+            'size': size['metrics'],
+            'symbols': symbols['total_symbols']
+        }
+    
+    def compare_profiles(self, levels=None) -> Dict[str, Any]:
+        """
+        Compare instruction counts, section sizes and symbol counts across
+        optimization profiles, relative to the first profile given
+        """
+        levels = list(levels or self.OPTIMIZATION_PROFILES)
+        
+        # Each profile is analyzed by separate toolchain processes
+        with ThreadPoolExecutor(max_workers=len(levels)) as pool:
+            summaries = dict(zip(levels, pool.map(self._profile_summary, levels)))
+        
+        baseline = summaries[levels[0]]
+        if 'error' not in baseline:
+            for summary in summaries.values():
+                if 'error' in summary:
+                    continue
+                summary['instruction_reduction_percent'] = round(
+                    ((baseline['instructions'] - summary['instructions']) /
+                     baseline['instructions'] * 100) if baseline['instructions'] > 0 else 0, 2
+                )
+                summary['size_reduction_percent'] = round(
+                    ((baseline['size']['total'] - summary['size']['total']) /
+                     baseline['size']['total'] * 100) if baseline['size']['total'] > 0 else 0, 2
+                )
+        
+        return {
+            'baseline': levels[0],
+            'profiles': summaries
+        }
+    
     def analyze_complete(self, opt_level: str = 'O0') -> Dict[str, Any]:
         """Perform complete analysis of object file"""
         return {
@@ -0,0 +1,512 @@
+"""
+Object Catalog Module
+Content-addressed store of uploaded object files and binaries, each indexed
+once into a per-function catalog that later queries read without the toolchain
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Any, BinaryIO, Iterable, Optional, Tuple
+
+from object_analyzer import (binutils_version, read_symbol_table, read_elf_sections,
+                             read_size_metrics)
+
+
+DIGEST = re.compile(r'^[0-9a-f]{64}$')
+ELF_MAGIC = b'\x7fELF'
+
+# Bumped when the index layout or its parsing changes; older indexes are rebuilt
+INDEX_VERSION = 1
+
+# objdump over a large binary may take minutes; the index is built only once
+INDEX_TIMEOUT = 600
+
+# Rows written per executemany; also the c++filt batch size
+BATCH_ROWS = 1000
+
+FUNCTION_HEADER = re.compile(r'^([0-9a-f]+) <(.+)>:$')
+SECTION_HEADER = re.compile(r'^Disassembly of section (\S+):$')
+
+# readelf -SW: [Nr] Name Type Address Off Size ...
+SECTION_ROW = re.compile(r'^\s*\[\s*(\d+)\]\s+(\S+)\s+\S+\s+([0-9a-f]+)\s+[0-9a-f]+\s+([0-9a-f]+)')
+# readelf -sW: Num: Value Size Type Bind Vis Ndx Name; defined functions only
+FUNCTION_SYMBOL = re.compile(r'^\s*\d+:\s+([0-9a-f]+)\s+(\S+)\s+FUNC\s+(\S+)\s+\S+\s+(\d+)\s+(.+)$')
+
+# Operand parts that move with the layout of the file: branch target
+# addresses before <symbol+offset>, and %rip displacements
+TARGET_ADDRESS = re.compile(r'\b[0-9a-f]+ (<[^>]+>)')
+RIP_DISPLACEMENT = re.compile(r'-?0x[0-9a-f]+(\(%rip\))')
+
+SORT_COLUMNS = {'size': 'size DESC, ordinal', 'instructions': 'instructions DESC, ordinal',
+                'address': 'ordinal'}
+
+
+class CatalogError(ValueError):
+    """Raised for uploads the catalog cannot store or index"""
+    pass
+
+
+def normalize(code: str) -> str:
+    """Instructions without the addresses that differ between two builds of the same code"""
+    return RIP_DISPLACEMENT.sub(r'\1', TARGET_ADDRESS.sub(r'\1', code))
+
+
+def _demangle(symbols: List[str]) -> List[str]:
+    """Demangled names via one c++filt process; the symbols themselves if it is missing"""
+    try:
+        result = subprocess.run(['c++filt'], input='\n'.join(symbols), capture_output=True,
+                                text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return list(symbols)
+    names = result.stdout.split('\n')
+    return names[:len(symbols)] if result.returncode == 0 and len(names) >= len(symbols) else list(symbols)
+
+
+def _layout(path: str) -> Tuple[Dict[str, Tuple[int, int]], Dict[Tuple[str, int, str], Tuple[int, str]]]:
+    """
+    Section extents name -> (address, size) and function symbols
+    (section, address, symbol) -> (size, binding), from readelf
+    """
+    result = subprocess.run(['readelf', '-W', '-S', '-s', path], capture_output=True, text=True,
+                            timeout=INDEX_TIMEOUT)
+    if result.returncode != 0:
+        raise CatalogError(f'readelf failed: {result.stderr.strip()}')
+
+    sections, names, functions = {}, {}, {}
+    for line in result.stdout.split('\n'):
+        match = SECTION_ROW.match(line)
+        if match:
+            names[match.group(1)] = match.group(2)
+            sections.setdefault(match.group(2), (int(match.group(3), 16), int(match.group(4), 16)))
+            continue
+        match = FUNCTION_SYMBOL.match(line)
+        if match and match.group(4) in names:
+            key = (names[match.group(4)], int(match.group(1), 16), match.group(5))
+            functions[key] = (int(match.group(2), 0), match.group(3))
+    return sections, functions
+
+
+class ObjectCatalog:
+    """
+    Uploaded objects stored by SHA-256 with a SQLite function index
+
+    Indexing runs objdump and readelf over the file once, recording every
+    function's symbol, address, size, instruction mnemonic histogram and
+    disassembly. Listings, per-function disassembly and diffs between two
+    uploads are then answered from the index.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS objects (
+            digest TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            bytes INTEGER NOT NULL,
+            toolchain TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS functions (
+            digest TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            name TEXT NOT NULL,
+            section TEXT NOT NULL,
+            address INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            binding TEXT,
+            instructions INTEGER NOT NULL,
+            mnemonics TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            disassembly BLOB NOT NULL,
+            PRIMARY KEY (digest, ordinal)
+        );
+        CREATE INDEX IF NOT EXISTS functions_size ON functions (digest, size DESC, ordinal);
+        CREATE INDEX IF NOT EXISTS functions_instructions ON functions (digest, instructions DESC, ordinal);
+        CREATE INDEX IF NOT EXISTS functions_symbol ON functions (digest, symbol);
+        CREATE INDEX IF NOT EXISTS functions_name ON functions (digest, name);
+    '''
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'sec_objects')
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self.path = os.path.join(self.root, 'catalog.sqlite3')
+        self._local = threading.local()
+        # Indexing holds the database's write lock; one build at a time per process
+        self._index_lock = threading.Lock()
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + '.o')
+
+    def _toolchain(self) -> str:
+        return f'{binutils_version()}:{INDEX_VERSION}'
+
+    def add(self, stream: BinaryIO, name: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store an uploaded file and index it unless an identical file already is
+
+        Returns (summary, created). The body is hashed while it is written to
+        disk, so it is never held in memory whole.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=self.root, suffix='.upload')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                while True:
+                    chunk = stream.read(1 << 20)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise CatalogError(f'Object file exceeds {self.max_bytes} bytes')
+                    digest.update(chunk)
+                    f.write(chunk)
+            with open(temp_path, 'rb') as f:
+                if f.read(len(ELF_MAGIC)) != ELF_MAGIC:
+                    raise CatalogError('Not an ELF object file')
+
+            digest = digest.hexdigest()
+            summary = self.summary(digest)
+            if summary is not None and summary['toolchain'] == self._toolchain():
+                return summary, False
+
+            # Index the upload where it is and keep it only once indexed, so
+            # a file that fails to index leaves nothing behind
+            path = self.object_path(digest)
+            with self._index_lock:
+                self._index(digest, name, temp_path, size)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return self.summary(digest), summary is None
+
+    def _index(self, digest: str, name: str, path: str, size: int):
+        """Build the function index and summary of one stored file in a single transaction"""
+        start = time.perf_counter()
+        sections, symbols = _layout(path)
+        reports = {'symbols': read_symbol_table(path), 'sections': read_elf_sections(path),
+                   'size': read_size_metrics(path)}
+        for report in reports.values():
+            if 'error' in report:
+                raise CatalogError(report['error'].replace(path, name))
+
+        mnemonics = Counter()
+        totals = {'functions': 0, 'instructions': 0, 'bytes': 0}
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('DELETE FROM functions WHERE digest = ?', (digest,))
+            batch = []
+            for function in self._disassemble(path, sections, symbols):
+                batch.append(function)
+                mnemonics.update(function['mnemonics'])
+                totals['functions'] += 1
+                totals['instructions'] += function['instructions']
+                totals['bytes'] += function['size']
+                if len(batch) >= BATCH_ROWS:
+                    self._insert(connection, digest, batch, totals['functions'] - len(batch))
+                    batch = []
+            self._insert(connection, digest, batch, totals['functions'] - len(batch))
+
+            summary = {
+                'format': 'ELF',
+                'sections': reports['sections']['sections'],
+                'size': reports['size']['metrics'],
+                'symbols': {kind: len(entries) for kind, entries in reports['symbols']['symbols'].items()},
+                'functions': totals['functions'],
+                'instructions': totals['instructions'],
+                'function_bytes': totals['bytes'],
+                'instruction_frequency': dict(mnemonics.most_common()),
+                'index_seconds': round(time.perf_counter() - start, 3)
+            }
+            connection.execute(
+                'INSERT OR REPLACE INTO objects (digest, name, bytes, toolchain, summary, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (digest, name, size, self._toolchain(), json.dumps(summary), time.time())
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _disassemble(self, path: str, sections: Dict[str, Tuple[int, int]],
+                     symbols: Dict[Tuple[str, int, str], Tuple[int, str]]) -> Iterable[Dict[str, Any]]:
+        """
+        Functions of a file in objdump order, parsed while objdump streams
+
+        A function's size is its symbol's; a label without a function symbol
+        extends to the next label or the end of its section.
+        """
+        # stderr goes to a file so a flood of warnings cannot block objdump
+        errors = tempfile.TemporaryFile(mode='w+')
+        process = subprocess.Popen(['objdump', '-d', '--no-show-raw-insn', path],
+                                   stdout=subprocess.PIPE, stderr=errors, text=True)
+        timer = threading.Timer(INDEX_TIMEOUT, process.kill)
+        timer.start()
+        section, current = None, None
+
+        def finish(function, end):
+            if function is None:
+                return None
+            size, binding = symbols.get((function['section'], function['address'], function['symbol']),
+                                        (None, None))
+            if size is None:
+                base, length = sections.get(function['section'], (function['address'], 0))
+                size = (end if end is not None else base + length) - function['address']
+            addresses, code = function.pop('addresses'), function.pop('code')
+            function.update({
+                'size': max(size, 0),
+                'binding': binding,
+                'instructions': len(code),
+                'mnemonics': dict(Counter(instruction.split(None, 1)[0] for instruction in code)),
+                'fingerprint': hashlib.sha256(normalize('\n'.join(code)).encode()).hexdigest()[:16],
+                'disassembly': zlib.compress('\n'.join(map('\t'.join, zip(addresses, code))).encode())
+            })
+            return function
+
+        try:
+            for line in process.stdout:
+                if line.startswith(' '):
+                    # Instruction lines, by far the most common: "    4004:\tmov ..."
+                    address, tab, code = line.partition(':\t')
+                    code = code.strip()
+                    if tab and code and current is not None:
+                        current['addresses'].append(address.strip())
+                        current['code'].append(code)
+                    continue
+                line = line.rstrip('\n')
+                match = FUNCTION_HEADER.match(line)
+                if match:
+                    address = int(match.group(1), 16)
+                    done = finish(current, address)
+                    if done is not None:
+                        yield done
+                    current = {'symbol': match.group(2), 'section': section, 'address': address,
+                               'addresses': [], 'code': []}
+                    continue
+                match = SECTION_HEADER.match(line)
+                if match:
+                    done = finish(current, None)
+                    if done is not None:
+                        yield done
+                    section, current = match.group(1), None
+            done = finish(current, None)
+            if done is not None:
+                yield done
+
+            process.wait()
+            if process.returncode != 0:
+                errors.seek(0)
+                raise CatalogError(f'objdump failed: {errors.read().strip() or "timed out"}')
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            errors.close()
+
+    def _insert(self, connection: sqlite3.Connection, digest: str, batch: List[Dict[str, Any]], first: int):
+        """Write a batch of functions numbered from first, with demangled names"""
+        if not batch:
+            return
+        names = _demangle([function['symbol'] for function in batch])
+        connection.executemany(
+            'INSERT INTO functions (digest, ordinal, symbol, name, section, address, size, binding, '
+            'instructions, mnemonics, fingerprint, disassembly) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(digest, first + i, function['symbol'], name, function['section'], function['address'],
+              function['size'], function['binding'], function['instructions'],
+              json.dumps(function['mnemonics']), function['fingerprint'], function['disassembly'])
+             for i, (function, name) in enumerate(zip(batch, names))]
+        )
+
+    def summary(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Stored file summary: sections, sizes, symbol counts and totals of the index"""
+        row = self._connection().execute(
+            'SELECT digest, name, bytes, toolchain, summary, created_at FROM objects WHERE digest = ?',
+            (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        summary = {'digest': row[0], 'name': row[1], 'bytes': row[2], 'toolchain': row[3],
+                   'created_at': row[5]}
+        summary.update(json.loads(row[4]))
+        return summary
+
+    def objects(self) -> List[Dict[str, Any]]:
+        """Stored files, newest first"""
+        rows = self._connection().execute(
+            'SELECT digest, name, bytes, created_at, summary FROM objects ORDER BY created_at DESC'
+        ).fetchall()
+        result = []
+        for digest, name, size, created_at, summary in rows:
+            summary = json.loads(summary)
+            result.append({'digest': digest, 'name': name, 'bytes': size, 'created_at': created_at,
+                           'functions': summary['functions'], 'instructions': summary['instructions']})
+        return result
+
+    @staticmethod
+    def _row(row: tuple) -> Dict[str, Any]:
+        symbol, name, section, address, size, binding, instructions, mnemonics = row
+        return {'symbol': symbol, 'name': name, 'section': section, 'address': format(address, 'x'),
+                'size': size, 'binding': binding, 'instructions': instructions,
+                'mnemonics': json.loads(mnemonics)}
+
+    def functions(self, digest: str, sort: str = 'size', limit: int = 20, offset: int = 0,
+                  match: Optional[str] = None) -> Dict[str, Any]:
+        """A page of the function index, largest first unless sorted otherwise"""
+        if sort not in SORT_COLUMNS:
+            raise CatalogError('Invalid sort. Use: ' + ', '.join(SORT_COLUMNS))
+        where, params = 'digest = ?', [digest]
+        if match:
+            where += " AND name LIKE ? ESCAPE '\\'"
+            params.append('%' + re.sub(r'([%_\\])', r'\\\1', match) + '%')
+
+        connection = self._connection()
+        total = connection.execute(f'SELECT COUNT(*) FROM functions WHERE {where}', params).fetchone()[0]
+        rows = connection.execute(
+            'SELECT symbol, name, section, address, size, binding, instructions, mnemonics '
+            f'FROM functions WHERE {where} ORDER BY {SORT_COLUMNS[sort]} LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        return {'digest': digest, 'total': total, 'sort': sort, 'offset': offset,
+                'functions': [self._row(row) for row in rows]}
+
+    def function(self, digest: str, symbol: str) -> List[Dict[str, Any]]:
+        """Every function with this symbol or demangled name, with its disassembly"""
+        rows = self._connection().execute(
+            'SELECT symbol, name, section, address, size, binding, instructions, mnemonics, disassembly '
+            'FROM functions WHERE digest = ? AND (symbol = ? OR name = ?) ORDER BY ordinal',
+            (digest, symbol, symbol)
+        ).fetchall()
+        result = []
+        for row in rows:
+            function = self._row(row[:-1])
+            function['disassembly'] = [
+                dict(zip(('address', 'code'), line.split('\t', 1)))
+                for line in zlib.decompress(row[-1]).decode().split('\n') if line
+            ]
+            result.append(function)
+        return result
+
+    def _index_of(self, digest: str) -> Dict[Tuple[str, int], tuple]:
+        """(symbol, occurrence) -> (name, size, instructions, mnemonics, fingerprint)"""
+        seen = Counter()
+        index = {}
+        for symbol, name, size, instructions, mnemonics, fingerprint in self._connection().execute(
+                'SELECT symbol, name, size, instructions, mnemonics, fingerprint FROM functions '
+                'WHERE digest = ? ORDER BY ordinal', (digest,)):
+            index[(symbol, seen[symbol])] = (name, size, instructions, mnemonics, fingerprint)
+            seen[symbol] += 1
+        return index
+
+    def diff(self, base: str, other: str, limit: int = 50) -> Dict[str, Any]:
+        """
+        Functions added, removed and changed from one upload to another
+
+        Functions are matched by symbol; a match is changed when its
+        instructions differ once addresses that move with the layout are
+        ignored. Lists are ordered by the size of the change.
+        """
+        before, after = self._index_of(base), self._index_of(other)
+        added, removed, changed = [], [], []
+        mnemonics = Counter()
+
+        for key, (name, size, instructions, histogram, fingerprint) in after.items():
+            if key not in before:
+                added.append({'symbol': key[0], 'name': name, 'size': size, 'instructions': instructions})
+                mnemonics.update(json.loads(histogram))
+                continue
+            old_name, old_size, old_instructions, old_histogram, old_fingerprint = before[key]
+            if fingerprint == old_fingerprint:
+                continue
+            delta = Counter(json.loads(histogram))
+            delta.subtract(json.loads(old_histogram))
+            delta = {mnemonic: count for mnemonic, count in delta.items() if count}
+            mnemonics.update(delta)
+            changed.append({'symbol': key[0], 'name': name, 'size': [old_size, size],
+                            'size_delta': size - old_size,
+                            'instructions': [old_instructions, instructions],
+                            'instruction_delta': instructions - old_instructions,
+                            'mnemonics_delta': delta})
+        for key, (name, size, instructions, histogram, _) in before.items():
+            if key not in after:
+                removed.append({'symbol': key[0], 'name': name, 'size': size, 'instructions': instructions})
+                mnemonics.subtract(json.loads(histogram))
+
+        added.sort(key=lambda entry: -entry['size'])
+        removed.sort(key=lambda entry: -entry['size'])
+        changed.sort(key=lambda entry: (-abs(entry['size_delta']), -abs(entry['instruction_delta'])))
+
+        def total(index, column):
+            return sum(entry[column] for entry in index.values())
+
+        return {
+            'base': base,
+            'other': other,
+            'totals': {
+                'functions': [len(before), len(after)],
+                'bytes': [total(before, 1), total(after, 1)],
+                'instructions': [total(before, 2), total(after, 2)],
+                'added': len(added),
+                'removed': len(removed),
+                'changed': len(changed),
+                'unchanged': len(after) - len(added) - len(changed),
+                'mnemonics_delta': {mnemonic: count for mnemonic, count in mnemonics.most_common() if count}
+            },
+            'added': added[:limit],
+            'removed': removed[:limit],
+            'changed': changed[:limit]
+        }
+
+    def diff_function(self, base: str, other: str, symbol: str) -> Optional[Dict[str, Any]]:
+        """Unified diff of one function's instructions between two uploads, addresses ignored"""
+        listings = []
+        for digest in (base, other):
+            row = self._connection().execute(
+                'SELECT disassembly FROM functions WHERE digest = ? AND (symbol = ? OR name = ?) '
+                'ORDER BY ordinal LIMIT 1', (digest, symbol, symbol)
+            ).fetchone()
+            listings.append([] if row is None else [
+                normalize(line.split('\t', 1)[1])
+                for line in zlib.decompress(row[0]).decode().split('\n') if line
+            ])
+        if not any(listings):
+            return None
+        return {
+            'base': base,
+            'other': other,
+            'symbol': symbol,
+            'diff': list(difflib.unified_diff(listings[0], listings[1], base[:12], other[:12], lineterm=''))
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._connection()
+        objects, stored = connection.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM objects').fetchone()
+        functions = connection.execute('SELECT COUNT(*) FROM functions').fetchone()[0]
+        return {'objects': objects, 'bytes': stored, 'functions': functions}
@@ -0,0 +1,167 @@
+"""
+Adaptive Plotting Module
+Samples a one-variable expression for display, refining where the curve
+bends, jumps or leaves its domain, within a point budget and a pixel tolerance
+"""
+
+import math
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from prepared import PreparedExpression
+
+
+# Uniform samples taken before refining
+INITIAL_INTERVALS = 64
+
+# Intervals are not split below 1/SUBPIXEL of a horizontal pixel
+SUBPIXEL = 16
+
+# The automatic y range spans the samples between these quantiles, extended
+# to the extremes unless those lie more than Y_OUTLIER spans beyond (poles)
+Y_QUANTILES = (0.05, 0.95)
+Y_OUTLIER = 2.0
+Y_MARGIN = 0.05
+
+
+def _visible_range(ys: np.ndarray) -> Tuple[float, float]:
+    """A y range covering the curve, ignoring the tails near poles"""
+    finite = ys[np.isfinite(ys)]
+    if not len(finite):
+        return -1.0, 1.0
+    low, high = np.quantile(finite, Y_QUANTILES)
+    spread = high - low
+    if finite.min() >= low - Y_OUTLIER * spread:
+        low = finite.min()
+    if finite.max() <= high + Y_OUTLIER * spread:
+        high = finite.max()
+    if high - low < 1e-12:
+        return float(low) - 1.0, float(high) + 1.0
+    margin = (high - low) * Y_MARGIN
+    return float(low - margin), float(high + margin)
+
+
+def adaptive_sample(prepared: PreparedExpression, variable: str, x_min: float, x_max: float,
+                    width: int = 800, height: int = 400, y_range: Optional[Tuple[float, float]] = None,
+                    tolerance: float = 0.5, max_points: int = 2000) -> Dict[str, Any]:
+    """
+    Sample prepared over [x_min, x_max] for a width x height pixel plot
+
+    An interval is split while its midpoint is more than tolerance pixels
+    off the chord between its ends, or while exactly one of its points
+    failed to evaluate (to locate domain edges), down to 1/16 of a pixel.
+    Each round evaluates all new midpoints in one vectorized call; when the
+    budget runs short, the intervals with the largest error go first.
+
+    Returns the curve as segments of [x, y] points, split at evaluation
+    errors and at jumps that stay taller than the plot at full resolution,
+    plus the y range the tolerance was measured against.
+    """
+    def evaluate(xs: np.ndarray) -> np.ndarray:
+        columns = {variable: xs} if variable in prepared.variables else {}
+        ys, errors = prepared.evaluate(columns)
+        ys = np.array(np.broadcast_to(ys, xs.shape), dtype=np.float64)
+        if errors is not None:
+            failed = errors if isinstance(errors, list) else [errors] * len(xs)
+            ys[np.array([error is not None for error in failed])] = np.nan
+        ys[~np.isfinite(ys)] = np.nan
+        return ys
+
+    # The initial grid is part of the budget (max_points >= 2)
+    intervals = min(INITIAL_INTERVALS, max_points - 1)
+    xs = np.linspace(x_min, x_max, intervals + 1)
+    ys = evaluate(xs)
+    evaluations = len(xs)
+
+    y_low, y_high = y_range if y_range is not None else _visible_range(ys)
+    x_scale = width / (x_max - x_min)
+    y_scale = height / (y_high - y_low)
+    min_dx = 1.0 / (x_scale * SUBPIXEL)
+
+    def pixel_y(values: np.ndarray) -> np.ndarray:
+        # Off-screen values count as just off-screen, so poles do not
+        # dominate the error
+        return np.clip((values - y_low) * y_scale, -height, 2 * height)
+
+    # Intervals still to be judged: left end index into (xs, ys) and priority
+    lefts = np.arange(intervals)
+    priority = np.full(intervals, np.inf)
+    unresolved = []  # (x_a, x_b) of intervals left with a large chord error
+
+    while len(lefts) and evaluations < max_points:
+        budget = max_points - evaluations
+        if len(lefts) > budget:
+            keep = np.sort(np.argsort(-priority, kind='stable')[:budget])
+            lefts, priority = lefts[keep], priority[keep]
+
+        a_x, b_x = xs[lefts], xs[lefts + 1]
+        a_y, b_y = ys[lefts], ys[lefts + 1]
+        m_x = (a_x + b_x) / 2
+        m_y = evaluate(m_x)
+        evaluations += len(m_x)
+
+        valid = np.isfinite(np.stack([a_y, m_y, b_y]))
+        all_valid = valid.all(axis=0)
+        error = np.where(
+            all_valid,
+            np.abs(pixel_y(m_y) - (pixel_y(a_y) + pixel_y(b_y)) / 2),
+            0.0
+        )
+        mixed = valid.any(axis=0) & ~all_valid
+        splittable = (b_x - a_x) / 2 > min_dx
+
+        refine = ((error > tolerance) | mixed) & splittable
+        stuck = all_valid & (error > tolerance) & ~splittable
+        unresolved.extend(zip(a_x[stuck].tolist(), b_x[stuck].tolist()))
+
+        # Insert the midpoints and re-index the intervals that are split
+        order = np.argsort(np.concatenate([xs, m_x]), kind='stable')
+        xs = np.concatenate([xs, m_x])[order]
+        ys = np.concatenate([ys, m_y])[order]
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        mids = position[len(order) - len(m_x):]
+
+        split = mids[refine]
+        lefts = np.concatenate([split - 1, split])
+        child_priority = np.where(mixed, np.inf, error)[refine]
+        priority = np.concatenate([child_priority, child_priority])
+        order = np.argsort(lefts, kind='stable')
+        lefts, priority = lefts[order], priority[order]
+
+    # A jump still taller than the plot at full resolution is a discontinuity
+    breaks = []
+    jump_starts = set()
+    for a, b in unresolved:
+        i = int(np.searchsorted(xs, a))
+        j = int(np.searchsorted(xs, b))
+        steps = np.abs(np.diff(pixel_y(ys[i:j + 1])))
+        k = int(np.argmax(steps))
+        if steps[k] > height:
+            jump_starts.add(i + k)
+            breaks.append(float((xs[i + k] + xs[i + k + 1]) / 2))
+
+    segments = []
+    current = []
+    for index, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        if math.isnan(y):
+            if current:
+                segments.append(current)
+            current = []
+            continue
+        current.append([x, y])
+        if index in jump_starts:
+            segments.append(current)
+            current = []
+    if current:
+        segments.append(current)
+
+    return {
+        'segments': segments,
+        'breaks': sorted(breaks),
+        'yRange': [y_low, y_high],
+        'evaluations': evaluations,
+        'complete': not len(lefts)
+    }
+
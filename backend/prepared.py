@@ -0,0 +1,366 @@
+"""
+Prepared Expression Module
+Parses an expression once with the C++ engine and evaluates it many times
+over variable bindings, vectorized with NumPy and following the engine's
+evaluation rules and error messages
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from cpp_codegen import CodegenError
+
+
+# Same step sizes as the engine's Calculus (central difference, trapezoid rule)
+DIFF_STEP = 0.0001
+INTEGRATION_STEPS = 1000
+
+# Upper bound on intermediate array elements per evaluated block of rows
+CHUNK_ELEMENTS = 1 << 20
+
+
+def _factorial_table() -> np.ndarray:
+    """n! for n = 0..170, accumulated exactly like Evaluator::factorial"""
+    table = np.ones(171)
+    for n in range(2, 171):
+        result = 1.0
+        for i in range(2, n + 1):
+            result *= i
+        table[n] = result
+    return table
+
+
+FACTORIALS = _factorial_table()
+
+# Unchecked math functions; domain-checked ones are handled separately
+FUNCTIONS = {
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'atan': np.arctan,
+    'exp': np.exp,
+    'cbrt': np.cbrt,
+    'abs': np.abs,
+}
+
+# Domain-checked functions: (implementation, invalid-argument test, error)
+CHECKED_FUNCTIONS = {
+    'asin': (np.arcsin, lambda x: (x < -1.0) | (x > 1.0), 'asin domain error'),
+    'acos': (np.arccos, lambda x: (x < -1.0) | (x > 1.0), 'acos domain error'),
+    'log': (np.log10, lambda x: x <= 0.0, 'log domain error'),
+    'ln': (np.log, lambda x: x <= 0.0, 'ln domain error'),
+    'sqrt': (np.sqrt, lambda x: x < 0.0, 'sqrt domain error'),
+}
+
+
+class BindingError(ValueError):
+    """Raised when variable bindings are missing or malformed"""
+    pass
+
+
+def _column(name: str, value) -> np.ndarray:
+    """A binding as a float64 scalar or 1-D array; None, booleans and non-numbers are rejected"""
+    invalid = BindingError(f'Binding for {name} must be a number or a list of numbers')
+    if not isinstance(value, np.ndarray):
+        if isinstance(value, list) and any(type(item) is bool for item in value):
+            raise invalid
+        try:
+            value = np.asarray(value)
+        except (TypeError, ValueError):
+            raise invalid
+    # Booleans ('b'), None and mixed lists ('O') and strings are not numbers
+    if value.dtype.kind not in 'iuf' or value.ndim > 1:
+        raise invalid
+    return value.astype(np.float64, copy=False)
+
+
+def _check(errors: list, mask, message: str):
+    """Record the rows where an engine runtime error would be thrown"""
+    if np.any(mask):
+        errors.append((np.asarray(mask), message))
+
+
+def _factorial(n, errors: list):
+    """Vectorized Evaluator::factorial"""
+    _check(errors, (n < 0) | (n != np.floor(n)), 'Factorial requires non-negative integer')
+    _check(errors, n > 170, 'Factorial overflow')
+    index = np.clip(np.nan_to_num(n), 0, 170).astype(np.int64)
+    return FACTORIALS[index]
+
+
+def _combinatoric(name: str, n, r, errors: list):
+    """Vectorized nCr/nPr with the engine's validation order"""
+    _check(errors, (n < 0) | (r < 0), f'{name} requires non-negative integers')
+    _check(errors, (n != np.floor(n)) | (r != np.floor(r)), f'{name} requires integer arguments')
+    _check(errors, r > n, f'{name} requires n >= r')
+    n_fact = _factorial(n, errors)
+    if name == 'nCr':
+        r_fact = _factorial(r, errors)
+        return n_fact / (r_fact * _factorial(n - r, errors))
+    return n_fact / _factorial(n - r, errors)
+
+
+class PreparedExpression:
+    """An expression parsed once into the engine's flat post-order AST"""
+
+    def __init__(self, expression: str, nodes: List[Dict[str, Any]]):
+        self.expression = expression
+        self.nodes = nodes
+
+        # In post-order every subtree occupies a contiguous index range
+        # [start[i], i]; calculus subtrees are evaluated separately, so keep
+        # the calculus roots by the index their subtree starts at
+        self._start = []
+        self._calculus_at = {}
+        integral_depth = []
+        for index, node in enumerate(nodes):
+            if node['type'] == 'NUMBER' and node['value'] is None:
+                raise CodegenError('Non-finite constant in expression')
+            children = node.get('children', [])
+            self._start.append(self._start[children[0]] if children else index)
+            if node['type'] in ('DIFF_NODE', 'INTEGRATE_NODE'):
+                self._calculus_at.setdefault(self._start[index], []).append(index)
+            integral_depth.append(max((integral_depth[child] for child in children), default=0)
+                                  + (node['type'] == 'INTEGRATE_NODE'))
+
+        # Each nested integral multiplies the work per row by its grid size
+        self._integral_depth = integral_depth
+        per_row = (INTEGRATION_STEPS + 1) ** integral_depth[-1] if nodes else 1
+        self._chunk_rows = max(1, CHUNK_ELEMENTS // per_row)
+
+        self.variables = self._free_variables()
+
+    def _free_variables(self) -> List[str]:
+        """Variables not bound by an enclosing diff/integrate, in order of appearance"""
+        bound_by = [set() for _ in self.nodes]
+        for index in range(len(self.nodes) - 1, -1, -1):
+            node = self.nodes[index]
+            scope = bound_by[index]
+            if node['type'] in ('DIFF_NODE', 'INTEGRATE_NODE'):
+                scope = scope | {node['variable']}
+            for child in node.get('children', []):
+                bound_by[child] = scope
+
+        variables = []
+        for index, node in enumerate(self.nodes):
+            if node['type'] == 'VARIABLE' and node['name'] not in bound_by[index] \
+                    and node['name'] not in variables:
+                variables.append(node['name'])
+        return variables
+
+    def _run(self, root: int, env: Dict[str, Any], errors: list):
+        """Evaluate the subtree rooted at root and return its (broadcast) value"""
+        values = {}
+        index = self._start[root]
+        while index <= root:
+            # Calculus nodes evaluate their bodies under their own bindings
+            nested = [r for r in self._calculus_at.get(index, ()) if r <= root]
+            if nested:
+                outer = max(nested)
+                values[outer] = self._calculus(outer, env, errors)
+                index = outer + 1
+                continue
+
+            node = self.nodes[index]
+            args = [values[child] for child in node.get('children', [])]
+            values[index] = self._apply(node, args, env, errors)
+            index += 1
+
+        return values[root]
+
+    def _apply(self, node: Dict[str, Any], args: list, env: Dict[str, Any], errors: list):
+        """Evaluate one non-calculus node from its argument values"""
+        node_type = node['type']
+
+        if node_type == 'NUMBER':
+            return np.float64(node['value'])
+
+        if node_type == 'VARIABLE':
+            if node['name'] not in env:
+                raise BindingError(f"Undefined variable: {node['name']}")
+            return env[node['name']]
+
+        if node_type == 'BINARY_OP':
+            left, right = args
+            op = node['op']
+            if op == '+':
+                return left + right
+            if op == '-':
+                return left - right
+            if op == '*':
+                return left * right
+            if op == '/':
+                _check(errors, right == 0.0, 'Division by zero')
+                return left / right
+            if op == '%':
+                _check(errors, right == 0.0, 'Modulo by zero')
+                return np.fmod(left, right)
+            if op == '^':
+                return np.power(left, right)
+            raise CodegenError(f'Unknown binary operator: {op}')
+
+        if node_type == 'UNARY_OP':
+            if node['op'] == 'neg':
+                return -args[0]
+            if node['op'] == '!':
+                return _factorial(args[0], errors)
+            raise CodegenError(f"Unknown unary operator: {node['op']}")
+
+        if node_type == 'FUNCTION_CALL':
+            name = node['name']
+            if name in FUNCTIONS:
+                return FUNCTIONS[name](args[0])
+            if name in CHECKED_FUNCTIONS:
+                function, invalid, message = CHECKED_FUNCTIONS[name]
+                _check(errors, invalid(args[0]), message)
+                return function(args[0])
+            raise CodegenError(f'Unknown function: {name}')
+
+        if node_type == 'FACTORIAL':
+            return _factorial(args[0], errors)
+
+        if node_type == 'NCR':
+            return _combinatoric('nCr', args[0], args[1], errors)
+
+        if node_type == 'NPR':
+            return _combinatoric('nPr', args[0], args[1], errors)
+
+        raise CodegenError(f'Unknown node type: {node_type}')
+
+    def _calculus(self, index: int, env: Dict[str, Any], errors: list):
+        """Evaluate diff/integrate nodes with the bound variable swept locally"""
+        node = self.nodes[index]
+        body = node['children'][0]
+        variable = node['variable']
+
+        if node['type'] == 'DIFF_NODE':
+            point = node['point']
+            f_plus = self._run(body, dict(env, **{variable: np.float64(point + DIFF_STEP)}), errors)
+            f_minus = self._run(body, dict(env, **{variable: np.float64(point - DIFF_STEP)}), errors)
+            return (f_plus - f_minus) / (2.0 * DIFF_STEP)
+
+        # Trapezoid rule: the grid runs along a new trailing axis
+        lower, upper = node['lowerBound'], node['upperBound']
+        h = (upper - lower) / INTEGRATION_STEPS
+        grid = lower + np.arange(INTEGRATION_STEPS + 1) * h
+        grid[0], grid[-1] = lower, upper
+        weights = np.full(INTEGRATION_STEPS + 1, 2.0)
+        weights[0] = weights[-1] = 1.0
+
+        # A row's grid expansion that would not fit in a chunk (from three
+        # nested integrals) is evaluated one grid point at a time instead
+        rows = np.broadcast_shapes(*(np.shape(value) for value in env.values()))
+        if int(np.prod(rows)) * (INTEGRATION_STEPS + 1) ** self._integral_depth[index] > CHUNK_ELEMENTS:
+            return self._integrate_pointwise(body, variable, grid, weights, env, rows, errors) * (h / 2.0)
+
+        inner_env = {name: np.asarray(value)[..., np.newaxis] for name, value in env.items()}
+        inner_env[variable] = grid
+        inner_errors = []
+        samples = self._run(body, inner_env, inner_errors)
+        if inner_errors:
+            # The engine stops at the first failing grid point, and reports
+            # the first error thrown there
+            shape = np.broadcast_shapes(grid.shape, *(mask.shape for mask, _ in inner_errors))
+            codes = np.zeros(shape, dtype=np.int64)
+            for code, (mask, _) in enumerate(inner_errors, 1):
+                codes[(codes == 0) & np.broadcast_to(mask, shape)] = code
+            first = np.argmax(codes != 0, axis=-1)[..., np.newaxis]
+            first_codes = np.take_along_axis(codes, first, axis=-1)[..., 0]
+            for code, (_, message) in enumerate(inner_errors, 1):
+                _check(errors, first_codes == code, message)
+        return (h / 2.0) * np.sum(samples * weights, axis=-1)
+
+    def _integrate_pointwise(self, body: int, variable: str, grid: np.ndarray, weights: np.ndarray,
+                             env: Dict[str, Any], rows: tuple, errors: list):
+        """Weighted sum of the body over the grid, binding one grid point at a time"""
+        total = np.zeros(rows)
+        reported = np.zeros(rows, dtype=bool)
+        for x, weight in zip(grid, weights):
+            point_errors = []
+            total += weight * self._run(body, dict(env, **{variable: np.float64(x)}), point_errors)
+            # As in the engine: the first failing point, then the first error there
+            for mask, message in point_errors:
+                new = np.broadcast_to(mask, rows) & ~reported
+                if new.any():
+                    errors.append((new, message))
+                    reported |= new
+        return total
+
+    def evaluate(self, columns: Dict[str, Any]) -> Tuple[np.ndarray, Optional[List[Optional[str]]]]:
+        """
+        Evaluate over columns of variable values that broadcast together
+
+        Returns the results and, if any evaluation failed, the engine's error
+        message per row (None for rows that succeeded).
+        """
+        missing = [name for name in self.variables if name not in columns]
+        if missing:
+            raise BindingError(f'Undefined variable: {missing[0]}')
+
+        env = {name: _column(name, columns[name]) for name in self.variables}
+
+        try:
+            shape = np.broadcast_shapes(*(value.shape for value in env.values()))
+        except ValueError:
+            raise BindingError('Bound value lists must all have the same length')
+
+        if not shape or shape[0] <= self._chunk_rows:
+            return self._evaluate_rows(env, shape)
+
+        # Integrals expand every row over their grid; bound peak memory
+        results = np.empty(shape)
+        messages = None
+        for begin in range(0, shape[0], self._chunk_rows):
+            rows = slice(begin, min(begin + self._chunk_rows, shape[0]))
+            chunk_env = {name: value[rows] if value.shape else value for name, value in env.items()}
+            chunk_results, chunk_messages = self._evaluate_rows(chunk_env, (rows.stop - rows.start,))
+            results[rows] = chunk_results
+            if chunk_messages is not None:
+                messages = messages or [None] * shape[0]
+                messages[rows] = chunk_messages
+        return results, messages
+
+    def _evaluate_rows(self, env: Dict[str, np.ndarray], shape: tuple):
+        """Evaluate one block of rows and attribute errors per row"""
+        errors = []
+        with np.errstate(all='ignore'):
+            results = np.broadcast_to(self._run(len(self.nodes) - 1, env, errors), shape)
+
+        if not errors:
+            return results, None
+
+        # The first error thrown in evaluation order wins, as in the engine
+        messages = np.full(shape, None, dtype=object)
+        for mask, message in errors:
+            pending = np.broadcast_to(mask, shape) & np.equal(messages, None)
+            messages[pending] = message
+        return results, messages.tolist()
+
+
+class PreparedRegistry:
+    """Bounded map of handles to prepared expressions with LRU eviction"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, handle: str, prepared: PreparedExpression):
+        with self._lock:
+            self._entries[handle] = prepared
+            self._entries.move_to_end(handle)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, handle: str) -> Optional[PreparedExpression]:
+        with self._lock:
+            prepared = self._entries.get(handle)
+            if prepared is not None:
+                self._entries.move_to_end(handle)
+            return prepared
+
+    def __len__(self):
+        return len(self._entries)
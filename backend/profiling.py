@@ -0,0 +1,155 @@
+"""
+Request Profiling Module
+Opt-in cProfile capture of request handlers, with child process wall and
+CPU time, summarized as compact top-N hotspot reports
+"""
+
+import cProfile
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# subprocess functions whose cumulative time is spent spawning children
+# and waiting for them
+SPAWN_FUNCTIONS = {'_execute_child'}
+WAIT_FUNCTIONS = {'communicate', 'wait', '_wait', '_communicate'}
+
+# One profiling session per process: from Python 3.12 a profiler hooks the
+# whole interpreter, and enabling a second one raises ValueError
+_session_lock = threading.Lock()
+
+
+def _children_cpu() -> Optional[tuple]:
+    """User and system CPU seconds of all terminated child processes"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime, usage.ru_stime
+
+
+def _function_label(function: tuple) -> str:
+    """file:line(name) with the path shortened to its last two components"""
+    filename, line, name = function
+    if filename == '~':
+        return name  # Built-in
+    parts = filename.replace('\\', '/').split('/')
+    return f"{'/'.join(parts[-2:])}:{line}({name})"
+
+
+class RequestProfiler:
+    """Profiles selected requests and keeps their most recent reports"""
+
+    def __init__(self, sample_rate: float = 0.0, top_n: int = 20, max_reports: int = 50):
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self.max_reports = max_reports
+
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def wanted(self, explicit: bool) -> bool:
+        """Profile on explicit request, or for a random sample of requests"""
+        return explicit or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self) -> Optional[Dict[str, Any]]:
+        """
+        Begin profiling the calling thread
+
+        Returns None, without profiling, while another session is active
+        here or another profiling tool holds the interpreter
+        """
+        if not _session_lock.acquire(blocking=False):
+            return None
+        session = {
+            'profile': cProfile.Profile(),
+            'wall_start': time.perf_counter(),
+            'children_start': _children_cpu()
+        }
+        try:
+            session['profile'].enable()
+        except ValueError:  # Another profiling tool is already active
+            _session_lock.release()
+            return None
+        return session
+
+    def _end(self, session: Dict[str, Any]):
+        session['profile'].disable()
+        _session_lock.release()
+
+    def stop(self, session: Dict[str, Any]):
+        """Stop profiling without producing a report"""
+        self._end(session)
+
+    def finish(self, session: Dict[str, Any], label: str, status: int) -> Dict[str, Any]:
+        """Stop profiling, summarize the hotspots and store the report"""
+        self._end(session)
+        wall = time.perf_counter() - session['wall_start']
+        stats = pstats.Stats(session['profile']).stats
+
+        hotspots = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        spawn = sum(entry[3] for function, entry in stats.items()
+                    if function[0].endswith('subprocess.py') and function[2] in SPAWN_FUNCTIONS)
+        waits = [entry[3] for function, entry in stats.items()
+                 if function[0].endswith('subprocess.py') and function[2] in WAIT_FUNCTIONS]
+
+        children = None
+        end = _children_cpu()
+        if end is not None and session['children_start'] is not None:
+            # Process-wide: includes children of concurrently running requests
+            children = {
+                'user_ms': round((end[0] - session['children_start'][0]) * 1000, 3),
+                'system_ms': round((end[1] - session['children_start'][1]) * 1000, 3)
+            }
+
+        report = {
+            'id': uuid.uuid4().hex[:16],
+            'request': label,
+            'status': status,
+            'time': time.time(),
+            'wall_ms': round(wall * 1000, 3),
+            'subprocess': {
+                'spawn_ms': round(spawn * 1000, 3),
+                # Nested wait helpers overlap; the outermost call is the largest
+                'wait_ms': round(max(waits, default=0.0) * 1000, 3),
+                'cpu': children
+            },
+            'hotspots': [
+                {
+                    'function': _function_label(function),
+                    'calls': entry[1],
+                    'self_ms': round(entry[2] * 1000, 3),
+                    'cumulative_ms': round(entry[3] * 1000, 3)
+                }
+                for function, entry in hotspots[:self.top_n]
+            ]
+        }
+
+        with self._lock:
+            self._reports[report['id']] = report
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+        return report
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored report, or None"""
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of stored reports, newest first"""
+        with self._lock:
+            reports = list(self._reports.values())
+        return [
+            {key: report[key] for key in ('id', 'request', 'status', 'time', 'wall_ms')}
+            for report in reversed(reports)
+        ]
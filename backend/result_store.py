@@ -0,0 +1,258 @@
+"""
+Persistent Result Store Module
+SQLite (WAL) cache of compile, PnC and object analysis results shared by
+every server process and kept across restarts
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+
+
+class ResultStore:
+    """Read-through result cache keyed by input hash and toolchain version"""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            namespace TEXT NOT NULL,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at);
+        CREATE INDEX IF NOT EXISTS results_hits ON results (hits);
+    '''
+
+    # Part of every key. Bump it when the backend changes what it stores for
+    # the same engine output, e.g. the Python-generated PnC steps or the
+    # parsed object reports; the toolchain version does not cover those
+    FORMAT_VERSION = 2
+
+    # Check the total size after this many writes
+    EVICTION_INTERVAL = 32
+    # Write back memory hit counts once this many keys have pending hits
+    HIT_FLUSH_INTERVAL = 64
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024,
+                 max_memory_entries: int = 512):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'sec_results.sqlite3')
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max_memory_entries
+
+        self._local = threading.local()
+        # key -> JSON text of the hottest entries, least recently used first
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_hits = {}
+        self._writes = 0
+
+        connection = self._connection()
+        connection.executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection; sqlite3 connections must not cross threads"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @classmethod
+    def make_key(cls, namespace: str, version: str, payload: Any) -> str:
+        """Hash the store format, a namespace, toolchain version and JSON-serializable input"""
+        digest = hashlib.sha256()
+        for part in (str(cls.FORMAT_VERSION), namespace, version, json.dumps(payload, sort_keys=True)):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _remember(self, key: str, text: str):
+        """Keep an entry in the in-process hot set"""
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_text(self, key: str) -> Optional[str]:
+        """Return the stored JSON text for a key, or None"""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                # Hits served from memory are recorded in batches
+                self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+                flush = len(self._pending_hits) >= self.HIT_FLUSH_INTERVAL
+        if text is not None:
+            if flush:
+                self.flush_hits()
+            return text
+
+        try:
+            connection = self._connection()
+            row = connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE results SET hits = hits + 1, accessed_at = ? WHERE key = ?',
+                (time.time(), key)
+            )
+        except sqlite3.OperationalError:
+            # A busy database degrades to a cache miss, never to a failed request
+            return None
+
+        self._remember(key, row[0])
+        return row[0]
+
+    def flush_hits(self):
+        """Write batched in-memory hit counts back to the database"""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+        if not pending:
+            return
+        now = time.time()
+        try:
+            self._connection().executemany(
+                'UPDATE results SET hits = hits + ?, accessed_at = ? WHERE key = ?',
+                [(hits, now, key) for key, hits in pending.items()]
+            )
+        except sqlite3.OperationalError:
+            pass
+
+    def put_text(self, key: str, namespace: str, text: str):
+        """Store JSON text under a key, evicting old entries when over budget"""
+        now = time.time()
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO results (key, namespace, value, size, hits, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, 0, ?, ?)',
+                (key, namespace, text, len(text), now, now)
+            )
+        except sqlite3.OperationalError:
+            return
+        self._remember(key, text)
+
+        with self._lock:
+            self._writes += 1
+            check = self._writes % self.EVICTION_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value for a key, or None"""
+        text = self.get_text(key)
+        return None if text is None else json.loads(text)
+
+    def put(self, key: str, namespace: str, value: Any):
+        """Store a JSON-serializable value under a key"""
+        self.put_text(key, namespace, json.dumps(value))
+
+    def cached(self, namespace: str, version: str, payload: Any,
+               compute: Callable[[], Tuple[Any, bool]]) -> Tuple[Any, bool]:
+        """
+        Read-through lookup
+
+        compute returns (value, cacheable); only cacheable values are stored.
+        Returns (value, hit).
+        """
+        key = self.make_key(namespace, version, payload)
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        value, cacheable = compute()
+        if cacheable:
+            self.put(key, namespace, value)
+        return value, False
+
+    def evict(self):
+        """Delete least recently used entries until the store fits its budget"""
+        connection = self._connection()
+        try:
+            total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Free down to 90% so eviction does not run on every write
+            excess = total - int(self.max_bytes * 0.9)
+            freed = 0
+            victims = []
+            for key, size in connection.execute('SELECT key, size FROM results ORDER BY accessed_at'):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            connection.executemany('DELETE FROM results WHERE key = ?', victims)
+        except sqlite3.OperationalError:
+            return
+
+        with self._lock:
+            for (key,) in victims:
+                self._memory.pop(key, None)
+
+    def warm_up(self, limit: Optional[int] = None) -> int:
+        """Preload the most frequently hit entries into memory; returns the count"""
+        limit = limit or self.max_memory_entries
+        self.flush_hits()
+        try:
+            rows = self._connection().execute(
+                'SELECT key, value FROM results ORDER BY hits DESC, accessed_at DESC LIMIT ?', (limit,)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return 0
+
+        # Insert coldest first so the hottest end up most recently used
+        for key, text in reversed(rows):
+            self._remember(key, text)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts and sizes per namespace"""
+        self.flush_hits()
+        rows = self._connection().execute(
+            'SELECT namespace, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) '
+            'FROM results GROUP BY namespace'
+        ).fetchall()
+        return {
+            'path': self.path,
+            'max_bytes': self.max_bytes,
+            'memory_entries': len(self._memory),
+            'namespaces': {
+                namespace: {'entries': entries, 'bytes': size, 'hits': hits}
+                for namespace, entries, size, hits in rows
+            }
+        }
+
+
+_fingerprints = {}
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Content hash of a file, e.g. the compiler binary or an object file
+
+    Hashes are reused until the file's size or modification time changes.
+    """
+    stat = os.stat(path)
+    identity = (stat.st_size, stat.st_mtime_ns)
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == identity:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    fingerprint = digest.hexdigest()[:32]
+    _fingerprints[path] = (identity, fingerprint)
+    return fingerprint
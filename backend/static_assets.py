@@ -0,0 +1,121 @@
+"""
+Static Assets Module
+Fingerprints and gzips the frontend once at startup, and serves it with
+ETags and long-lived caching for fingerprinted URLs
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Any, Optional
+
+from flask import Request, Response
+
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Fingerprinted URLs never change content
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Everything else may be cached but must be revalidated
+REVALIDATE = 'no-cache'
+
+# Local script and stylesheet references in HTML
+REFERENCE = re.compile(r'''((?:src|href)\s*=\s*["'])(/(?:js|css)/[^"'?#]+)(["'])''')
+
+
+class StaticAssets:
+    """In-memory copies of the frontend files, plain and gzipped"""
+
+    def __init__(self, root: str, html_files=('index.html',)):
+        self.root = root
+        # URL path -> asset
+        self.assets = {}
+        # Plain URL path -> fingerprinted URL path
+        self.fingerprinted = {}
+
+        html = []
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                url = '/' + os.path.relpath(path, root).replace(os.sep, '/')
+                if url.lstrip('/') in html_files:
+                    html.append((url, path))
+                    continue
+                with open(path, 'rb') as f:
+                    content = f.read()
+                asset = self._asset(url, content)
+                stem, extension = os.path.splitext(url)
+                fingerprinted = f'{stem}.{asset["hash"][:12]}{extension}'
+                self.assets[url] = asset
+                self.assets[fingerprinted] = dict(asset, immutable=True)
+                self.fingerprinted[url] = fingerprinted
+
+        # Pages are not fingerprinted (their URLs are bookmarked) but point
+        # at the fingerprinted assets
+        for url, path in html:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            text = REFERENCE.sub(
+                lambda match: match.group(1) + self.fingerprinted.get(match.group(2), match.group(2)) + match.group(3),
+                text
+            )
+            self.assets[url] = self._asset(url, text.encode('utf-8'))
+
+    @staticmethod
+    def _asset(url: str, content: bytes) -> Dict[str, Any]:
+        mimetype = mimetypes.guess_type(url)[0] or 'application/octet-stream'
+        digest = hashlib.sha256(content).hexdigest()
+        asset = {
+            'content': content,
+            'gzip': None,
+            'mimetype': mimetype,
+            'hash': digest,
+            'etag': digest[:32],
+            'immutable': False
+        }
+        if len(content) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+            # mtime=0 keeps the compressed bytes (and so their ETag) stable
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                asset['gzip'] = compressed
+        return asset
+
+    def response(self, url: str, request: Request) -> Optional[Response]:
+        """
+        Serve an asset, or None if there is none at url
+
+        Picks the gzip copy when the client accepts it and answers 304 when
+        If-None-Match names the copy the client already has.
+        """
+        asset = self.assets.get(url)
+        if asset is None:
+            return None
+
+        compressed = asset['gzip'] is not None and request.accept_encodings['gzip'] > 0
+        content = asset['gzip'] if compressed else asset['content']
+        # Each encoding is a different representation, with its own ETag
+        etag = asset['etag'] + ('-gzip' if compressed else '')
+
+        response = Response(content, mimetype=asset['mimetype'])
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE if asset['immutable'] else REVALIDATE
+        if asset['gzip'] is not None:
+            response.headers['Vary'] = 'Accept-Encoding'
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response.make_conditional(request)
+
+    def stats(self) -> Dict[str, Any]:
+        """Files served and bytes saved by compression"""
+        files = [asset for url, asset in self.assets.items() if not asset['immutable']]
+        return {
+            'files': len(files),
+            'bytes': sum(len(asset['content']) for asset in files),
+            'gzip_bytes': sum(len(asset['gzip'] or asset['content']) for asset in files)
+        }
@@ -0,0 +1,155 @@
+"""
+Streaming Evaluation Module
+Evaluates a prepared expression over CSV or NDJSON rows read incrementally
+from a request body, yielding encoded results block by block
+"""
+
+import csv
+import json
+import math
+from typing import Dict, List, Any, Iterator, Optional
+
+import numpy as np
+
+from prepared import PreparedExpression
+
+
+# Bytes read from the request body per step; each step's complete rows are
+# evaluated and answered before reading on
+READ_BLOCK = 64 * 1024
+
+
+def iter_line_blocks(stream, block_size: int = READ_BLOCK) -> Iterator[List[str]]:
+    """Yield the complete, non-empty lines that arrive with each read"""
+    pending = b''
+    while True:
+        data = stream.read(block_size)
+        if not data:
+            break
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop()
+        block = [line.decode('utf-8', 'replace').rstrip('\r') for line in lines if line.strip()]
+        if block:
+            yield block
+
+    if pending.strip():
+        yield [pending.decode('utf-8', 'replace').rstrip('\r')]
+
+
+def _format_result(value: float) -> Optional[str]:
+    """Shortest round-trip text of a result, or None if it is not finite"""
+    return repr(value) if math.isfinite(value) else None
+
+
+def _evaluate_block(prepared: PreparedExpression, columns: Dict[str, list],
+                    row_errors: List[Optional[str]]):
+    """Evaluate one block of rows; rows that failed to parse keep their error"""
+    count = len(row_errors)
+    results, errors = prepared.evaluate(columns)
+    results = np.broadcast_to(results, (count,)).tolist()
+    if errors is None:
+        errors = [None] * count
+    elif not isinstance(errors, list):
+        errors = [errors] * count
+
+    for row, error in enumerate(row_errors):
+        if error is not None:
+            errors[row] = error
+    return results, errors
+
+
+def _parse_column(name: str, values: List[Any], row_errors: List[Optional[str]]) -> np.ndarray:
+    """Convert one column to float64, marking rows whose value is not a number"""
+    # NumPy would silently read null as NaN and true as 1.0
+    if not any(value is None or type(value) is bool for value in values):
+        try:
+            return np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            pass
+
+    column = np.empty(len(values))
+    for row, value in enumerate(values):
+        try:
+            if type(value) is bool:
+                raise TypeError
+            column[row] = float(value)
+        except (TypeError, ValueError):
+            column[row] = math.nan
+            if row_errors[row] is None:
+                row_errors[row] = f'Invalid number for {name}'
+    return column
+
+
+def stream_csv(prepared: PreparedExpression, blocks: Iterator[List[str]]) -> Iterator[str]:
+    """
+    Evaluate CSV rows; the header names the columns
+
+    Every free variable must have a column; other columns are ignored.
+    Yields a result,error CSV.
+    """
+    header = None
+    indices = {}
+    yield 'result,error\n'
+
+    for lines in blocks:
+        rows = list(csv.reader(lines))
+        if header is None:
+            header = [name.strip() for name in rows.pop(0)]
+            missing = [name for name in prepared.variables if name not in header]
+            if missing:
+                yield f',"Undefined variable: {missing[0]}"\n'
+                return
+            indices = {name: header.index(name) for name in prepared.variables}
+            if not rows:
+                continue
+
+        row_errors = [None if len(row) == len(header) else 'Wrong number of columns' for row in rows]
+        columns = {
+            name: _parse_column(name, [row[index] if index < len(row) else None for row in rows], row_errors)
+            for name, index in indices.items()
+        }
+        results, errors = _evaluate_block(prepared, columns, row_errors)
+
+        out = []
+        for value, error in zip(results, errors):
+            if error is None:
+                out.append(f'{_format_result(value) or ""},\n')
+            else:
+                out.append(f',"{error}"\n')
+        yield ''.join(out)
+
+
+def stream_ndjson(prepared: PreparedExpression, blocks: Iterator[List[str]]) -> Iterator[str]:
+    """
+    Evaluate NDJSON rows, one object of variable bindings per line
+
+    Yields one {"result": ...} object per input line, with "error" set
+    when the row could not be evaluated.
+    """
+    for lines in blocks:
+        row_errors = []
+        values = {name: [] for name in prepared.variables}
+        for line in lines:
+            try:
+                binding = json.loads(line)
+                if not isinstance(binding, dict):
+                    raise ValueError
+            except ValueError:
+                binding = {}
+                row_errors.append('Invalid JSON object')
+            else:
+                missing = [name for name in prepared.variables if name not in binding]
+                row_errors.append(f'Undefined variable: {missing[0]}' if missing else None)
+            for name in prepared.variables:
+                values[name].append(binding.get(name, 0.0))
+
+        columns = {name: _parse_column(name, column, row_errors) for name, column in values.items()}
+        results, errors = _evaluate_block(prepared, columns, row_errors)
+
+        out = []
+        for value, error in zip(results, errors):
+            if error is None:
+                out.append(f'{{"result":{_format_result(value) or "null"}}}\n')
+            else:
+                out.append(f'{{"result":null,"error":{json.dumps(error)}}}\n')
+        yield ''.join(out)
@@ -0,0 +1,24 @@
+"""
+Test Configuration
+Makes the backend modules importable and provides the engine-backed fixtures
+the tests share
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from cpp_codegen import COMPILER_PATH, parse_expression  # noqa: E402
+from prepared import PreparedExpression  # noqa: E402
+
+
+@pytest.fixture
+def prepare():
+    """Parse an expression with the built engine into a PreparedExpression"""
+    if not os.path.exists(COMPILER_PATH):
+        pytest.skip('compiler not built (run make in compiler/)')
+    return lambda expression: PreparedExpression(expression, parse_expression(expression))
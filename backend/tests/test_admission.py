@@ -0,0 +1,107 @@
+"""
+Admission Control Tests
+Cost estimates, lane routing and the bounded slow-lane queue
+"""
+
+import threading
+import time
+
+import pytest
+
+from admission import (Lane, LaneFull, Scheduler, expression_cost, nodes_cost,
+                       INTEGRAL_SAMPLES, FAST_LANE_MAX_COST)
+
+
+def lane(max_concurrent=1, max_queue=1, max_wait=5.0):
+    return Lane('slow', max_concurrent=max_concurrent, max_queue=max_queue, timeout=10.0, max_wait=max_wait)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.001)
+
+
+def test_integrals_and_factorials_dominate_cost():
+    assert expression_cost('1 + 2') == 3
+    assert expression_cost('integrate(x, x, 0, 1)') > INTEGRAL_SAMPLES
+    assert expression_cost('integrate(integrate(x*y, x, 0, 1), y, 0, 1)') > INTEGRAL_SAMPLES ** 2
+    assert expression_cost('5!') < expression_cost('x!')
+
+
+def test_nodes_cost_weights_calculus_bodies():
+    nodes = [
+        {'type': 'VARIABLE', 'name': 'x'},
+        {'type': 'NUMBER', 'value': 0.0},
+        {'type': 'NUMBER', 'value': 1.0},
+        {'type': 'INTEGRATE_NODE', 'variable': 'x', 'children': [0, 1, 2]},
+    ]
+    assert nodes_cost(nodes) == 1 + INTEGRAL_SAMPLES * 3
+    assert nodes_cost([{'type': 'NUMBER', 'value': None}, {'type': 'FACTORIAL', 'children': [0]}]) > 170
+
+
+def test_scheduler_routes_by_cost():
+    scheduler = Scheduler(fast=lane(), slow=lane())
+
+    assert scheduler.lane_for(1) is scheduler.fast
+    assert scheduler.lane_for(FAST_LANE_MAX_COST) is scheduler.fast
+    assert scheduler.lane_for(FAST_LANE_MAX_COST + 1) is scheduler.slow
+    assert scheduler.lane_for(None) is scheduler.slow
+
+
+def test_full_queue_is_rejected_with_retry_hint():
+    slow = lane(max_concurrent=1, max_queue=1)
+    slow.acquire()
+    waiter = threading.Thread(target=slow.acquire)
+    waiter.start()
+    wait_for(lambda: slow.waiting == 1)
+
+    with pytest.raises(LaneFull) as rejected:
+        slow.acquire()
+    assert rejected.value.lane == 'slow'
+    assert rejected.value.retry_after >= 1
+    assert slow.rejected == 1
+
+    slow.release(0.1)
+    waiter.join(5)
+    assert (slow.active, slow.waiting) == (1, 0)
+    slow.release(0.1)
+
+
+def test_queued_request_gives_up_after_max_wait():
+    slow = lane(max_concurrent=1, max_queue=1, max_wait=0.05)
+    slow.acquire()
+
+    with pytest.raises(LaneFull):
+        slow.acquire()
+    assert slow.waiting == 0
+    slow.release(0.1)
+
+
+def test_release_admits_queued_requests_in_turn():
+    slow = lane(max_concurrent=2, max_queue=4)
+    admitted = []
+
+    def request(index):
+        slow.acquire()
+        admitted.append(index)
+
+    slow.acquire()
+    slow.acquire()
+    threads = [threading.Thread(target=request, args=(index,)) for index in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: slow.waiting == 3)
+
+    slow.release(0.5)
+    wait_for(lambda: len(admitted) == 1)
+    assert slow.stats()['active'] == 2 and slow.waiting == 2
+
+    slow.release(0.5)
+    slow.release(0.5)
+    for thread in threads:
+        thread.join(5)
+    assert sorted(admitted) == [0, 1, 2]
+    assert slow.active == 2
+    assert slow.mean_seconds < 1.0
@@ -0,0 +1,69 @@
+"""
+Binary I/O Tests
+Block-wise evaluation and the streamed response layout
+"""
+
+import numpy as np
+import pytest
+
+import binary_io
+from cpp_codegen import KERNEL_ERRORS
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(binary_io, 'BLOCK_ROWS', 3)
+
+
+def encode(prepared, matrix, variables):
+    blocks = binary_io.evaluate_blocks(prepared, matrix, variables, KERNEL_ERRORS)
+    return b''.join(binary_io.iter_response(len(matrix), blocks, KERNEL_ERRORS))
+
+
+def test_read_matrix_checks_row_size():
+    matrix = binary_io.read_matrix(np.arange(6.0).tobytes(), 2)
+    assert matrix.tolist() == [[0.0, 1.0], [2.0, 3.0], [4.0, 5.0]]
+
+    with pytest.raises(binary_io.BinaryFormatError):
+        binary_io.read_matrix(np.arange(5.0).tobytes(), 2)
+
+
+def test_round_trips_blocks_with_per_row_errors(prepare, small_blocks):
+    matrix = np.array([[4, 2], [1, 0], [9, 3], [0, 0], [8, 4], [6, 1], [7, 0]], dtype='<f8')
+    body = encode(prepare('x / y'), matrix, ['x', 'y'])
+
+    results, errors = binary_io.decode(body)
+
+    assert results[[0, 2, 4, 5]].tolist() == [2.0, 3.0, 2.0, 6.0]
+    assert errors == [None, 'Division by zero', None, 'Division by zero', None, None, 'Division by zero']
+
+
+def test_blocks_are_aligned(prepare, small_blocks):
+    matrix = np.arange(7.0).reshape(-1, 1)
+    body = encode(prepare('x + 1'), matrix, ['x'])
+
+    header = len(binary_io.encode_header(7, KERNEL_ERRORS))
+    # Two full blocks of 3 rows and one of 1, each padded to 8 bytes
+    assert len(body) == header + 2 * (3 * 8 + 8) + (8 + 8)
+    assert binary_io.decode(body) == (pytest.approx(np.arange(1.0, 8.0)), None)
+
+
+def test_evaluation_is_lazy(prepare, small_blocks):
+    calls = []
+    prepared = prepare('x * 2')
+    evaluate = prepared.evaluate
+    prepared.evaluate = lambda columns: calls.append(1) or evaluate(columns)
+
+    chunks = binary_io.iter_response(6, binary_io.evaluate_blocks(
+        prepared, np.arange(6.0).reshape(-1, 1), ['x'], KERNEL_ERRORS), KERNEL_ERRORS)
+    next(chunks)
+    assert calls == []
+    next(chunks)
+    assert calls == [1]
+
+
+def test_constant_expression_fills_every_row(prepare):
+    body = encode(prepare('nCr(2, 5)'), np.zeros((4, 1)), ['x'])
+
+    _, errors = binary_io.decode(body)
+    assert errors == ['nCr requires n >= r'] * 4
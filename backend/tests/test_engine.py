@@ -0,0 +1,24 @@
+"""
+Engine Evaluation Tests
+The compiled node array against the tree-walking evaluator, via the
+compiler's check target
+"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+COMPILER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            'compiler')
+
+
+def test_compiled_evaluation_matches_tree_walker():
+    if not (shutil.which('make') and shutil.which('g++')):
+        pytest.skip('make and g++ are required')
+
+    run = subprocess.run(['make', '-s', 'check'], cwd=COMPILER_DIR, capture_output=True, text=True, timeout=600)
+
+    assert run.returncode == 0, run.stdout + run.stderr
+    assert ' 0 mismatches' in run.stdout
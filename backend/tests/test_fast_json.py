@@ -0,0 +1,30 @@
+"""
+Fast JSON Tests
+Encoding of non-finite and big-integer values and the framing check on
+forwarded engine output
+"""
+
+import json
+import os
+import subprocess
+
+import pytest
+
+import fast_json
+from cpp_codegen import COMPILER_PATH
+
+
+def test_dumps_matches_engine_conventions():
+    assert json.loads(fast_json.dumps({'a': [float('nan'), float('inf'), 1.5]})) == {'a': [None, None, 1.5]}
+    assert json.loads(fast_json.dumps({'big': 2 ** 80})) == {'big': 2 ** 80}
+
+
+def test_engine_success_framing():
+    if not os.path.exists(COMPILER_PATH):
+        pytest.skip('compiler not built')
+    text = subprocess.run([COMPILER_PATH, 'integrate(x^2, x, 0, 1)'], capture_output=True, text=True).stdout
+
+    assert fast_json.is_engine_success(text)
+    assert not fast_json.is_engine_success(text[:len(text) // 2])
+    assert not fast_json.is_engine_success('{"success":false,"error":"Division by zero"}')
+    assert not fast_json.is_engine_success('')
@@ -0,0 +1,94 @@
+"""
+JIT Kernel Tests
+Kernel results and error codes against the engine, and kernel reuse
+without spawning a process
+"""
+
+import json
+import math
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from cpp_codegen import COMPILER_PATH, KERNEL_ERRORS
+from jit_compiler import ExpressionJIT
+
+
+XS = [-1.0, 0.0, 0.5, 1.0, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0]
+
+EXPRESSIONS = [
+    'sin(x) * x^2 + 1',
+    'nCr(x, 2) + 1 / (x - 4)',
+    'nPr(x, 3) - x!',
+    'nCr(sqrt(x), ln(x))',
+    'ln(x) + sqrt(x - 3)',
+    'sqrt(x - 3) * ln(x - 5)',
+    'x % (x - 2) + log(x)',
+    'acos(x - 1) / asin(x - 5)',
+    'integrate(t / (x - 2), t, 0, 1) + x * diff(t^3, t, 2)',
+]
+
+
+@pytest.fixture
+def jit(prepare, tmp_path):
+    if shutil.which('g++') is None:
+        pytest.skip('g++ not available')
+    return ExpressionJIT(cache_dir=str(tmp_path))
+
+
+def engine(expression, x):
+    """Value or error message of the command-line engine with x substituted"""
+    run = subprocess.run([COMPILER_PATH, expression.replace('x', f'({x!r})')], capture_output=True, text=True)
+    output = json.loads(run.stdout or run.stderr)
+    return output['result'] if output['success'] else output['error']
+
+
+@pytest.mark.parametrize('expression', EXPRESSIONS)
+def test_kernel_matches_engine(jit, prepare, expression):
+    result = jit.evaluate(expression, XS)
+    assert result['status'] == 'success'
+    kernel = [KERNEL_ERRORS[code - 1] if code else value
+              for value, code in zip(result['results'].tolist(), result['codes'].tolist())]
+
+    results, errors = prepare(expression).evaluate({'x': XS})
+    prepared = [error or value for value, error in zip(results.tolist(), errors or [None] * len(XS))]
+
+    for x, got, expected in zip(XS, kernel, prepared):
+        if isinstance(expected, str):
+            assert got == expected, x
+        elif math.isfinite(expected):
+            assert got == pytest.approx(expected, rel=1e-9, abs=1e-9), x
+
+
+@pytest.mark.parametrize('expression', ['nCr(sqrt(x), ln(x))', 'ln(x) + sqrt(x - 3)', 'sqrt(x - 3) * ln(x - 5)'])
+def test_first_error_follows_engine_order(jit, expression):
+    result = jit.evaluate(expression, [-1.0])
+
+    assert KERNEL_ERRORS[result['codes'][0] - 1] == engine(expression, -1.0)
+    assert math.isnan(result['results'][0])
+
+
+def test_cached_kernel_spawns_no_process(jit, monkeypatch):
+    assert jit.evaluate('x * 2 + 1', [1.0])['cached'] is None
+
+    calls = []
+    run = subprocess.run
+    monkeypatch.setattr(subprocess, 'run', lambda *args, **kwargs: calls.append(args) or run(*args, **kwargs))
+
+    for _ in range(3):
+        result = jit.evaluate('x * 2 + 1', [1.0, 2.0])
+        assert result['cached'] == 'memory'
+        assert result['results'].tolist() == [3.0, 5.0]
+    # Blocks share the kernel's buffers, so copy each one as it is yielded
+    blocks = [out.tolist() for out, _ in jit.evaluate_blocks('x * 2 + 1', np.arange(5.0), block_rows=2)]
+
+    assert blocks == [[1.0, 3.0], [5.0, 7.0], [9.0]]
+    assert calls == []
+
+
+def test_build_errors_are_reported(jit):
+    assert jit.evaluate('x +', [1.0])['status'] == 'error'
+    assert jit.evaluate('y * 2', [1.0])['error'] == 'Undefined variable: y'
+    assert jit.get_kernel('x', variable='1x')['status'] == 'error'
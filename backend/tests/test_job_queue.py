@@ -0,0 +1,103 @@
+"""
+Job Queue Tests
+Deduplication of in-flight jobs, progress, failures and retention
+"""
+
+import threading
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(max_workers=2, max_finished=2)
+
+
+def blocking_job(release: threading.Event, calls: list):
+    def run(value, progress):
+        calls.append(value)
+        progress('started', value=value)
+        release.wait(5)
+        return value * 2
+    return run
+
+
+def test_identical_jobs_attach_while_in_flight(queue):
+    release, calls = threading.Event(), []
+    run = blocking_job(release, calls)
+
+    first, created = queue.submit('build', ('O2',), run, 21)
+    second, attached_created = queue.submit('build', ('O2',), run, 21)
+    release.set()
+
+    assert created and not attached_created
+    assert second['id'] == first['id']
+    assert second['attached'] == 2
+
+    job = queue.wait(first['id'], timeout=5)
+    assert job['status'] == 'success'
+    assert job['result'] == 42
+    assert calls == [21]
+
+
+def test_keys_are_scoped_by_kind(queue):
+    release, calls = threading.Event(), []
+    run = blocking_job(release, calls)
+
+    build, _ = queue.submit('build', 'x', run, 1)
+    analyze, created = queue.submit('analyze', 'x', run, 2)
+    release.set()
+
+    assert created and analyze['id'] != build['id']
+    queue.wait(build['id'], timeout=5)
+    queue.wait(analyze['id'], timeout=5)
+    assert sorted(calls) == [1, 2]
+
+
+def test_finished_job_is_not_reused(queue):
+    first, _ = queue.submit('build', 'x', lambda progress: 1)
+    queue.wait(first['id'], timeout=5)
+
+    second, created = queue.submit('build', 'x', lambda progress: 2)
+
+    assert created and second['id'] != first['id']
+    assert queue.wait(second['id'], timeout=5)['result'] == 2
+
+
+def test_wait_returns_on_progress(queue):
+    release, calls = threading.Event(), []
+    job, _ = queue.submit('build', 'x', blocking_job(release, calls), 3)
+
+    update = queue.wait(job['id'], version=0, timeout=5)
+    while not update['progress']:
+        update = queue.wait(job['id'], version=update['version'], timeout=5)
+    release.set()
+
+    assert update['progress'][0]['message'] == 'started'
+    assert update['progress'][0]['value'] == 3
+    assert queue.wait(job['id'], timeout=5)['status'] == 'success'
+
+
+def test_failure_is_recorded_and_releases_the_key(queue):
+    def fail(progress):
+        raise RuntimeError('linker failed')
+
+    job, _ = queue.submit('build', 'x', fail)
+    job = queue.wait(job['id'], timeout=5)
+
+    assert job['status'] == 'error'
+    assert job['error'] == 'linker failed'
+    assert queue.submit('build', 'x', lambda progress: 1)[1]
+
+
+def test_old_finished_jobs_are_pruned(queue):
+    ids = []
+    for value in range(4):
+        job, _ = queue.submit('build', value, lambda progress: None)
+        queue.wait(job['id'], timeout=5)
+        ids.append(job['id'])
+
+    assert [queue.get(job_id) is not None for job_id in ids] == [False, False, True, True]
+    assert queue.get('unknown') is None
@@ -0,0 +1,149 @@
+"""
+Live Compile Tests
+Superseded inputs, cancellation of abandoned compiles and coalescing of
+identical expressions across sessions
+"""
+
+import json
+import threading
+
+import pytest
+
+from live_compile import LiveCompiler
+
+
+class FakeProcess:
+    def __init__(self):
+        self.killed = threading.Event()
+
+    def kill(self):
+        self.killed.set()
+
+
+class BlockingRun:
+    """A compile that starts a process and waits until released or killed"""
+
+    def __init__(self):
+        self.started = {}
+        self.release = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, expression, on_process):
+        process = FakeProcess()
+        with self.lock:
+            self.started.setdefault(expression, []).append(process)
+            release = self.release.setdefault(expression, threading.Event())
+        on_process(process)
+        while not (release.wait(0.001) or process.killed.is_set()):
+            pass
+        if process.killed.is_set():
+            return -9, json.dumps({'success': False, 'error': 'killed'})
+        return 0, json.dumps({'success': True, 'result': expression})
+
+    def wait_started(self, expression, count=1):
+        for _ in range(5000):
+            with self.lock:
+                if len(self.started.get(expression, [])) >= count:
+                    return self.started[expression][count - 1]
+            threading.Event().wait(0.001)
+        raise AssertionError(f'{expression} never started')
+
+    def finish(self, expression):
+        with self.lock:
+            self.release.setdefault(expression, threading.Event()).set()
+
+    def finish_all(self):
+        with self.lock:
+            for release in self.release.values():
+                release.set()
+
+
+@pytest.fixture
+def run():
+    run = BlockingRun()
+    yield run
+    # Let workers still compiling superseded inputs exit
+    run.finish_all()
+
+
+@pytest.fixture
+def results():
+    return []
+
+
+@pytest.fixture
+def live(run, results):
+    return LiveCompiler(run, max_workers=4, on_result=lambda *result: results.append(result))
+
+
+def event(live, session_id, version=0):
+    text, version = live.wait(session_id, version, timeout=5)
+    return json.loads(text), version
+
+
+def test_newer_input_cancels_the_running_compile(live, run):
+    live.submit('s', 1, '1+')
+    first = run.wait_started('1+')
+
+    live.submit('s', 2, '1+2')
+    assert first.killed.wait(5)
+
+    run.finish('1+2')
+    published, _ = event(live, 's')
+    assert published['seq'] == 2
+    assert published['output'] == {'success': True, 'result': '1+2'}
+    assert live.stats()['cancelled'] == 1
+
+
+def test_stale_input_is_ignored(live, run):
+    live.submit('s', 5, '1')
+    assert live.submit('s', 4, '2') is None
+    assert live.submit('s', 5, '3') is None
+    run.finish('1')
+    assert event(live, 's')[0]['expression'] == '1'
+
+
+def test_sessions_share_one_compile(live, run, results):
+    assert live.submit('a', 1, '2*3') == {'cached': False, 'coalesced': False}
+    run.wait_started('2*3')
+    assert live.submit('b', 1, '2*3') == {'cached': False, 'coalesced': True}
+
+    run.finish('2*3')
+    assert event(live, 'a')[0]['output']['result'] == '2*3'
+    assert event(live, 'b')[0]['output']['result'] == '2*3'
+    assert len(run.started['2*3']) == 1
+    assert results == [('2*3', 0, json.dumps({'success': True, 'result': '2*3'}))]
+
+
+def test_compile_survives_while_another_session_waits(live, run):
+    live.submit('a', 1, '4!')
+    process = run.wait_started('4!')
+    live.submit('b', 1, '4!')
+
+    live.submit('a', 2, '5!')
+    assert not process.killed.is_set()
+
+    run.finish('4!')
+    assert event(live, 'b')[0]['output']['result'] == '4!'
+    assert live.stats()['cancelled'] == 0
+
+
+def test_cached_document_is_published_at_once(live, run):
+    assert live.submit('s', 1, '1+1', cached='{"success": true, "result": 2}') == \
+        {'cached': True, 'coalesced': False}
+
+    published, version = event(live, 's')
+    assert published['output'] == {'success': True, 'result': 2}
+    assert live.wait('s', version, timeout=0.01) == (None, version)
+    assert run.started == {}
+
+
+def test_evicted_session_cancels_its_compile(run):
+    live = LiveCompiler(run, max_workers=2, max_sessions=1)
+    live.submit('old', 1, 'sin(1)')
+    process = run.wait_started('sin(1)')
+
+    live.submit('new', 1, 'cos(1)', cached='{}')
+
+    assert process.killed.wait(5)
+    assert live.stats()['sessions'] == 1
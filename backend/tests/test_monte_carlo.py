@@ -0,0 +1,79 @@
+"""
+Monte Carlo Tests
+Model recognition from engine ASTs, seeded estimates against the exact
+probability and the simulation deadline
+"""
+
+import json
+import os
+import subprocess
+import time
+
+import numpy as np
+import pytest
+
+import monte_carlo
+from cpp_codegen import COMPILER_PATH
+from monte_carlo import MonteCarlo, ModelError, exact_probability, is_ratio, recognize
+
+
+def engine_ast(expression):
+    if not os.path.exists(COMPILER_PATH):
+        pytest.skip('compiler not built')
+    run = subprocess.run([COMPILER_PATH, expression], capture_output=True, text=True)
+    return json.loads(run.stdout)['ast']
+
+
+def test_recognizes_urn_and_selection_models():
+    model = recognize(engine_ast('nCr(4,2)*nCr(48,3)/nCr(52,5)'))
+    assert model == {'model': 'hypergeometric', 'population': 52, 'draws': 5,
+                     'groups': [4, 48], 'counts': [2, 3]}
+    assert exact_probability(model) == pytest.approx(0.0399298, rel=1e-5)
+
+    assert recognize(engine_ast('1/nPr(10,3)')) == {'model': 'sequence', 'population': 10, 'draws': 3}
+    assert exact_probability(recognize(engine_ast('nPr(5,3)/nPr(10,3)'))) == pytest.approx(60 / 720)
+
+
+@pytest.mark.parametrize('expression', ['nCr(10,3)', 'nCr(4,2)/nCr(52,5)', 'nCr(4,2)/(nCr(10,2)+1)', 'nCr(60,2)/nCr(52,2)'])
+def test_rejects_other_expressions(expression):
+    with pytest.raises(ModelError):
+        recognize(engine_ast(expression))
+
+
+def test_probability_is_a_division_at_the_root():
+    assert is_ratio(engine_ast('(nCr(4,2)*nCr(6,0))/nCr(10,2)'))
+    assert not is_ratio(engine_ast('nCr(10,3)+1/2'))
+    assert not is_ratio(engine_ast('nCr(10/2,2)'))
+
+
+@pytest.mark.parametrize('expression', ['nCr(4,2)*nCr(48,3)/nCr(52,5)', 'nCr(3,1)*nCr(3,1)*nCr(4,1)/nCr(10,3)',
+                                        '1/nPr(6,2)'])
+def test_seeded_estimate_matches_exact(expression):
+    simulation = MonteCarlo(max_workers=1).simulate(recognize(engine_ast(expression)), 200000, seed=7)
+
+    assert simulation['estimate'] == pytest.approx(simulation['exact'], abs=5 * np.sqrt(0.25 / 200000))
+    assert abs(simulation['zScore']) < 5
+    assert simulation['seed'] == 7
+
+
+def test_pool_run_is_reproducible(monkeypatch):
+    monkeypatch.setattr(monte_carlo, 'MIN_TRIALS_PER_WORKER', 50000)
+    model = recognize(engine_ast('nCr(4,2)*nCr(48,3)/nCr(52,5)'))
+    simulator = MonteCarlo(max_workers=2)
+
+    first = simulator.simulate(model, 200000, seed=3, timeout=60)
+    second = simulator.simulate(model, 200000, seed=3, timeout=60)
+
+    assert first['workers'] == 2
+    assert first['successes'] == second['successes']
+    assert first['consistent'] or abs(first['zScore']) < 5
+
+
+def test_chunks_stop_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(monte_carlo, 'BATCH_TRIALS', 1000)
+    model = recognize(engine_ast('nCr(4,2)*nCr(48,3)/nCr(52,5)'))
+
+    with pytest.raises(TimeoutError):
+        monte_carlo._successes(model, 10 ** 6, np.random.SeedSequence(1), deadline=time.time() - 1)
+    with pytest.raises(TimeoutError):
+        MonteCarlo(max_workers=1).simulate(model, 10 ** 9, seed=1, timeout=0.2)
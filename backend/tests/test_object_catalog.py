@@ -0,0 +1,97 @@
+"""
+Object Catalog Tests
+Content-addressed uploads, the function index and diffs between two builds
+"""
+
+import io
+import shutil
+import subprocess
+
+import pytest
+
+from object_catalog import CatalogError, ObjectCatalog
+
+
+BASE = '''
+extern "C" int kept(int x) { return x * 3 + 1; }
+extern "C" int changed(int x) { return x + 1; }
+extern "C" int removed(int x) { return x - 7; }
+namespace sec { int scaled(int x) { return kept(x) * 2; } }
+'''
+
+# kept moves to a later address behind the larger changed(); its code does not change
+OTHER = '''
+extern "C" int changed(int x) { int total = 0; for (int i = 0; i < x; i++) total += i * i; return total; }
+extern "C" int kept(int x) { return x * 3 + 1; }
+extern "C" int added(int x) { return x << 4; }
+namespace sec { int scaled(int x) { return kept(x) * 2; } }
+'''
+
+
+@pytest.fixture
+def compile_object(tmp_path):
+    if not all(shutil.which(tool) for tool in ('g++', 'objdump', 'readelf')):
+        pytest.skip('toolchain not available')
+
+    def build(name, source):
+        path = tmp_path / f'{name}.cpp'
+        path.write_text(source)
+        subprocess.run(['g++', '-O1', '-c', str(path), '-o', str(tmp_path / f'{name}.o')], check=True)
+        return (tmp_path / f'{name}.o').read_bytes()
+    return build
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return ObjectCatalog(str(tmp_path / 'catalog'))
+
+
+def test_identical_upload_is_indexed_once(catalog, compile_object):
+    data = compile_object('base', BASE)
+
+    summary, created = catalog.add(io.BytesIO(data), 'base.o')
+    again, created_again = catalog.add(io.BytesIO(data), 'copy.o')
+
+    assert created and not created_again
+    assert again == summary
+    assert summary['name'] == 'base.o' and summary['bytes'] == len(data)
+    assert summary['functions'] == 4
+    assert catalog.stats() == {'objects': 1, 'bytes': len(data), 'functions': 4}
+
+
+def test_rejects_non_elf_and_oversized_uploads(catalog, tmp_path):
+    with pytest.raises(CatalogError):
+        catalog.add(io.BytesIO(b'not an object'), 'text.o')
+    with pytest.raises(CatalogError):
+        ObjectCatalog(str(tmp_path / 'small'), max_bytes=4).add(io.BytesIO(b'\x7fELF' * 2), 'big.o')
+    assert catalog.stats()['objects'] == 0
+    assert [path.name for path in (tmp_path / 'catalog').iterdir() if path.suffix == '.upload'] == []
+
+
+def test_functions_are_listed_with_demangled_names(catalog, compile_object):
+    digest = catalog.add(io.BytesIO(compile_object('base', BASE)), 'base.o')[0]['digest']
+
+    page = catalog.functions(digest, sort='address')
+    assert [function['name'] for function in page['functions']] == ['kept', 'changed', 'removed', 'sec::scaled(int)']
+    assert catalog.functions(digest, match='scaled')['total'] == 1
+
+    [function] = catalog.function(digest, 'sec::scaled(int)')
+    assert function['instructions'] == len(function['disassembly'])
+
+
+def test_diff_matches_functions_by_symbol(catalog, compile_object):
+    base = catalog.add(io.BytesIO(compile_object('base', BASE)), 'base.o')[0]['digest']
+    other = catalog.add(io.BytesIO(compile_object('other', OTHER)), 'other.o')[0]['digest']
+
+    diff = catalog.diff(base, other)
+
+    assert [entry['symbol'] for entry in diff['added']] == ['added']
+    assert [entry['symbol'] for entry in diff['removed']] == ['removed']
+    assert [entry['symbol'] for entry in diff['changed']] == ['changed']
+    assert diff['changed'][0]['size_delta'] > 0
+    # kept and scaled moved, but their code only differs in addresses
+    assert diff['totals']['unchanged'] == 2
+
+    assert catalog.diff_function(base, other, 'changed')['diff']
+    assert catalog.diff_function(base, other, 'kept')['diff'] == []
+    assert catalog.diff_function(base, other, 'missing') is None
@@ -0,0 +1,65 @@
+"""
+Adaptive Plotting Tests
+Point budget, refinement where the curve bends and splitting at poles,
+jumps and domain edges
+"""
+
+import numpy as np
+import pytest
+
+from plotting import INITIAL_INTERVALS, adaptive_sample
+
+
+def points(sample):
+    return [point for segment in sample['segments'] for point in segment]
+
+
+@pytest.mark.parametrize('max_points', [2, 10, 65, 300])
+def test_evaluations_stay_within_budget(prepare, max_points):
+    sample = adaptive_sample(prepare('sin(1 / x)'), 'x', 0.01, 1.0, max_points=max_points)
+
+    assert sample['evaluations'] <= max_points
+    assert len(points(sample)) == sample['evaluations']
+    assert not sample['complete']
+
+
+def test_straight_line_needs_only_the_initial_grid(prepare):
+    sample = adaptive_sample(prepare('2 * x + 1'), 'x', -1.0, 1.0)
+
+    assert sample['complete']
+    assert sample['evaluations'] == 2 * INITIAL_INTERVALS + 1
+    assert sample['breaks'] == []
+
+
+def test_refines_where_the_curve_bends(prepare):
+    sample = adaptive_sample(prepare('x^20'), 'x', 0.0, 1.0, max_points=1000)
+    xs = np.array([x for x, _ in points(sample)])
+
+    assert sample['complete']
+    # Every initial interval gets one midpoint; only the steep end is refined further
+    assert np.count_nonzero(xs < 0.2) == 2 * 13
+    assert np.count_nonzero(xs > 0.8) > 2 * 13
+
+
+def test_pole_splits_the_curve(prepare):
+    sample = adaptive_sample(prepare('1 / (x - 0.3)'), 'x', -1.0, 1.0, y_range=(-10.0, 10.0), max_points=4000)
+
+    assert len(sample['segments']) == 2
+    assert sample['breaks'] == [pytest.approx(0.3, abs=1e-3)]
+    assert sample['segments'][0][-1][0] < 0.3 < sample['segments'][1][0][0]
+
+
+def test_domain_edge_is_located(prepare):
+    sample = adaptive_sample(prepare('sqrt(x)'), 'x', -1.0, 1.0, width=100, max_points=4000)
+
+    assert len(sample['segments']) == 1
+    first = sample['segments'][0][0][0]
+    assert 0.0 <= first < 2.0 / 100
+    assert sample['breaks'] == []
+
+
+def test_constant_expression(prepare):
+    sample = adaptive_sample(prepare('3'), 'x', 0.0, 1.0)
+
+    assert [y for _, y in points(sample)] == [3.0] * sample['evaluations']
+    assert sample['yRange'] == [2.0, 4.0]
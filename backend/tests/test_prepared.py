@@ -0,0 +1,109 @@
+"""
+Prepared Expression Tests
+Binding validation, per-row engine errors and the error reported from
+inside diff/integrate
+"""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import prepared as prepared_module
+from prepared import BindingError, CHUNK_ELEMENTS
+
+
+def test_evaluates_over_broadcast_columns(prepare):
+    results, errors = prepare('x * y + 1').evaluate({'x': [1, 2, 3], 'y': 2})
+
+    assert results.tolist() == [3.0, 5.0, 7.0]
+    assert errors is None
+
+
+def test_scalar_bindings_give_a_scalar_and_message(prepare):
+    results, error = prepare('1 / x').evaluate({'x': 0})
+
+    assert results.shape == ()
+    assert error == 'Division by zero'
+
+
+def test_reports_engine_errors_per_row(prepare):
+    results, errors = prepare('nCr(x, 2) + 1 / (x - 4)').evaluate({'x': [5, 1, 2.5, 4]})
+
+    assert results[0] == pytest.approx(11.0)
+    assert errors == [None, 'nCr requires n >= r', 'nCr requires integer arguments', 'Division by zero']
+
+
+@pytest.mark.parametrize('value', [
+    None,
+    True,
+    [1, True],
+    [1.0, None],
+    ['1'],
+    [[1, 2]],
+    'abc',
+    np.array([True, False]),
+    np.array([1.0], dtype=object),
+])
+def test_rejects_non_numeric_bindings(prepare, value):
+    with pytest.raises(BindingError, match='Binding for x must be a number or a list of numbers'):
+        prepare('x + 1').evaluate({'x': value})
+
+
+def test_rejects_missing_and_mismatched_bindings(prepare):
+    with pytest.raises(BindingError, match='Undefined variable: y'):
+        prepare('x + y').evaluate({'x': 1})
+    with pytest.raises(BindingError, match='same length'):
+        prepare('x + y').evaluate({'x': [1, 2], 'y': [1, 2, 3]})
+
+
+def test_integral_reports_first_failing_grid_point(prepare):
+    # sqrt fails from x > 0.5; the division only fails at the upper bound
+    _, error = prepare('integrate(1/(x-1) + sqrt(0.5-x), x, 0, 1)').evaluate({})
+
+    assert error == 'sqrt domain error'
+
+
+def test_integral_error_order_is_per_row(prepare):
+    _, errors = prepare('integrate(1/(x-a) + sqrt(0.5-x), x, 0, 1)').evaluate({'a': [1, 0.2, 0.5]})
+
+    assert errors == ['sqrt domain error', 'Division by zero', 'Division by zero']
+
+
+def test_calculus_variable_is_bound_locally(prepare):
+    prepared = prepare('integrate(x * k, x, 0, 2) + diff(x^2, x, 3)')
+    results, errors = prepared.evaluate({'k': [1, 3]})
+
+    assert prepared.variables == ['k']
+    assert results == pytest.approx([2.0 + 6.0, 6.0 + 6.0])
+    assert errors is None
+
+
+def test_triple_integral_stays_within_a_chunk(prepare):
+    tracemalloc.start()
+    try:
+        result, error = prepare('integrate(integrate(integrate(x*y*z, x, 0, 1), y, 0, 1), z, 0, 1)').evaluate({})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert error is None
+    assert result == pytest.approx(0.125)
+    # One row expanded over all three grids would take ~7.5 GiB
+    assert peak < 20 * CHUNK_ELEMENTS * 8
+
+
+@pytest.mark.parametrize('expression, bindings', [
+    ('integrate(x * a + exp(a), x, 0, 2)', {'a': [-3, -1, 0.5]}),
+    ('integrate(1/(x-a) + sqrt(0.5-x), x, 0, 1)', {'a': [1, 0.2, 0.5, -3]}),
+])
+def test_pointwise_integration_matches_vectorized(prepare, monkeypatch, expression, bindings):
+    vectorized_results, vectorized_errors = prepare(expression).evaluate(bindings)
+
+    # Too small for any grid expansion: every integral goes point by point
+    monkeypatch.setattr(prepared_module, 'CHUNK_ELEMENTS', 1)
+    results, errors = prepare(expression).evaluate(bindings)
+
+    assert errors == vectorized_errors
+    ok = [error is None for error in errors or [None] * len(results)]
+    assert results[ok] == pytest.approx(vectorized_results[ok])
@@ -0,0 +1,87 @@
+"""
+Result Store Tests
+Key versioning, read-through caching and least recently used eviction
+"""
+
+import pytest
+
+import result_store
+from result_store import ResultStore
+
+
+class Clock:
+    """Strictly increasing time so access order is unambiguous"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(path=str(tmp_path / 'results.sqlite3'), max_bytes=1000, max_memory_entries=4)
+
+
+def test_keys_depend_on_namespace_version_input_and_format(monkeypatch):
+    key = ResultStore.make_key('pnc', 'v1', '1+2')
+
+    assert key == ResultStore.make_key('pnc', 'v1', '1+2')
+    assert key != ResultStore.make_key('compile', 'v1', '1+2')
+    assert key != ResultStore.make_key('pnc', 'v2', '1+2')
+    assert key != ResultStore.make_key('pnc', 'v1', '1+3')
+
+    monkeypatch.setattr(ResultStore, 'FORMAT_VERSION', ResultStore.FORMAT_VERSION + 1)
+    assert ResultStore.make_key('pnc', 'v1', '1+2') != key
+
+
+def test_cached_computes_once_and_skips_uncacheable(store):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': len(calls)}, True
+
+    assert store.cached('pnc', 'v1', '1+2', compute) == ({'value': 1}, False)
+    assert store.cached('pnc', 'v1', '1+2', compute) == ({'value': 1}, True)
+
+    failed = store.cached('pnc', 'v1', 'bad', lambda: ({'error': 'x'}, False))
+    assert failed == ({'error': 'x'}, False)
+    assert store.get(store.make_key('pnc', 'v1', 'bad')) is None
+
+
+def test_entries_survive_a_new_instance(store):
+    store.put('key', 'compile', {'result': 3})
+
+    reopened = ResultStore(path=store.path)
+    assert reopened.get('key') == {'result': 3}
+    assert reopened.warm_up() == 1
+
+
+def test_evicts_least_recently_used_to_ninety_percent(store, monkeypatch):
+    monkeypatch.setattr(result_store.time, 'time', Clock())
+    for index in range(5):
+        store.put_text(f'k{index}', 'compile', 'x' * 200)
+    store.get_text('k0')  # Served from memory; the hit is not yet written back
+    store.flush_hits()
+
+    store.put_text('k5', 'compile', 'x' * 200)
+    store.evict()
+
+    remaining = [f'k{index}' for index in range(6)
+                 if store._connection().execute('SELECT 1 FROM results WHERE key = ?',
+                                                 (f'k{index}',)).fetchone()]
+    assert remaining == ['k0', 'k3', 'k4', 'k5']
+    assert store.get_text('k1') is None
+    assert store.stats()['namespaces']['compile']['bytes'] <= 900
+
+
+def test_eviction_runs_every_interval_writes(store, monkeypatch):
+    monkeypatch.setattr(ResultStore, 'EVICTION_INTERVAL', 4)
+    for index in range(8):
+        store.put_text(f'k{index}', 'compile', 'x' * 200)
+
+    # Checked after the 4th and 8th writes: at most 900 bytes remain
+    assert store.stats()['namespaces']['compile']['bytes'] <= 900
@@ -0,0 +1,59 @@
+"""
+Streaming Tests
+Line framing across reads and CSV/NDJSON round trips with per-row errors
+"""
+
+import io
+import json
+
+import pytest
+
+from streaming import iter_line_blocks, stream_csv, stream_ndjson
+
+
+def blocks(text, block_size=7):
+    return iter_line_blocks(io.BytesIO(text.encode()), block_size)
+
+
+def test_lines_are_reassembled_across_reads():
+    lines = [line for block in blocks('x,y\r\n1,2\n\n30,40\n5,6', block_size=3) for line in block]
+    assert lines == ['x,y', '1,2', '30,40', '5,6']
+
+
+@pytest.mark.parametrize('block_size', [1, 5, 4096])
+def test_csv_round_trip(prepare, block_size):
+    body = 'y,x,label\n1,2,a\n3,0,b\n4,x,c\n5\n0.5,1.5,d\n'
+
+    output = ''.join(stream_csv(prepare('y / x'), blocks(body, block_size)))
+
+    assert output.splitlines() == [
+        'result,error',
+        '0.5,',
+        ',"Division by zero"',
+        ',"Invalid number for x"',
+        ',"Wrong number of columns"',
+        '0.3333333333333333,',
+    ]
+
+
+def test_csv_requires_every_variable(prepare):
+    output = ''.join(stream_csv(prepare('x + z'), blocks('x,y\n1,2\n')))
+    assert output == 'result,error\n,"Undefined variable: z"\n'
+
+
+@pytest.mark.parametrize('block_size', [1, 9, 4096])
+def test_ndjson_round_trip(prepare, block_size):
+    rows = [{'x': 2, 'n': 5}, {'x': -1, 'n': 3}, {'x': 1}, {'x': True, 'n': 1}, [1], {'x': 0.1, 'n': 2}]
+    body = '\n'.join(json.dumps(row) for row in rows) + '\n'
+
+    output = [json.loads(line) for chunk in stream_ndjson(prepare('sqrt(x) * n'), blocks(body, block_size))
+              for line in chunk.splitlines()]
+
+    assert output[0]['result'] == pytest.approx(2 ** 0.5 * 5)
+    assert output[1:5] == [
+        {'result': None, 'error': 'sqrt domain error'},
+        {'result': None, 'error': 'Undefined variable: n'},
+        {'result': None, 'error': 'Invalid number for x'},
+        {'result': None, 'error': 'Invalid JSON object'},
+    ]
+    assert output[5] == {'result': pytest.approx(0.1 ** 0.5 * 2)}
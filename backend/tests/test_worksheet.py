@@ -0,0 +1,115 @@
+"""
+Worksheet Tests
+Dependency-ordered propagation, early cutoff, cycles and edits that break
+a definition
+"""
+
+import pytest
+
+from worksheet import Worksheet, WorksheetError, WorksheetRegistry
+
+
+def values(report):
+    return {name: (entry['value'], entry['error']) for name, entry in report['definitions'].items()}
+
+
+def recomputed(report):
+    return [entry['name'] for entry in report['recomputed']]
+
+
+def test_evaluates_in_dependency_order(prepare):
+    worksheet = Worksheet(prepare)
+    report = worksheet.update({'c': 'b + 1', 'b': 'a * 3', 'a': '2'})
+
+    assert values(report) == {'c': (7.0, None), 'b': (6.0, None), 'a': (2.0, None)}
+    assert recomputed(report) == ['a', 'b', 'c']
+
+
+def test_edit_recomputes_only_downstream(prepare):
+    worksheet = Worksheet(prepare)
+    worksheet.update({'a': '2', 'b': 'a * 3', 'other': '10'})
+
+    report = worksheet.update({'a': '4'})
+
+    assert values(report)['b'] == (12.0, None)
+    assert recomputed(report) == ['a', 'b']
+    assert report['reused'] == ['other']
+
+
+def test_unchanged_value_stops_propagation(prepare):
+    worksheet = Worksheet(prepare)
+    worksheet.update({'a': '2', 'b': 'a * 3'})
+
+    report = worksheet.update({'a': '1 + 1'})
+
+    assert recomputed(report) == ['a']
+    assert values(report)['b'] == (6.0, None)
+
+
+def test_parse_error_invalidates_dependents(prepare):
+    worksheet = Worksheet(prepare)
+    worksheet.update({'a': '2', 'b': 'a * 3'})
+
+    report = worksheet.update({'a': '2+*'})
+
+    value, error = values(report)['a']
+    assert value is None and error
+    assert values(report)['b'] == (None, 'a has an error')
+
+    report = worksheet.update({'a': '5'})
+    assert values(report) == {'a': (5.0, None), 'b': (15.0, None)}
+
+
+def test_cycle_is_reported_on_its_members(prepare):
+    worksheet = Worksheet(prepare)
+    report = worksheet.update({'a': 'b + 1', 'b': 'a + 1', 'c': 'a * 2', 'd': '3'})
+
+    assert values(report)['a'] == (None, 'Circular definition: a depends on itself')
+    assert values(report)['b'] == (None, 'Circular definition: b depends on itself')
+    assert values(report)['c'] == (None, 'a has an error')
+    assert values(report)['d'] == (3.0, None)
+
+    report = worksheet.update({'b': '1'})
+    assert values(report)['a'] == (2.0, None)
+    assert values(report)['c'] == (4.0, None)
+
+
+def test_removal_invalidates_users(prepare):
+    worksheet = Worksheet(prepare)
+    worksheet.update({'a': '2', 'b': 'a * 3'})
+
+    report = worksheet.update({}, remove=['a'])
+
+    assert values(report) == {'b': (None, 'Undefined variable: a')}
+
+
+def test_calculus_variables_stay_local(prepare):
+    worksheet = Worksheet(prepare)
+    report = worksheet.update({'x': '100', 'area': 'integrate(x, x, 0, 2)'})
+
+    assert report['definitions']['area']['uses'] == []
+    assert values(report)['area'][0] == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize('definitions, remove', [
+    ({'1a': '2'}, []),
+    ({'sin': '2'}, []),
+    ({'a': '  '}, []),
+    ({'a': '2'}, ['a']),
+])
+def test_rejects_malformed_edits(prepare, definitions, remove):
+    with pytest.raises(WorksheetError):
+        Worksheet(prepare).update(definitions, remove)
+
+
+def test_registry_evicts_least_recently_used(prepare):
+    registry = WorksheetRegistry(max_entries=2)
+    first, second, third = (Worksheet(prepare) for _ in range(3))
+    registry.add(first)
+    registry.add(second)
+    registry.get(first.id)
+    registry.add(third)
+
+    assert registry.get(second.id) is None
+    assert registry.get(first.id) is first
+    assert len(registry) == 2
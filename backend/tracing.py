@@ -0,0 +1,120 @@
+"""
+Request Tracing Module
+Breaks requests into timed spans and keeps the most recent traces in a
+fixed-size ring buffer, optionally exporting them as JSON lines
+"""
+
+import json
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+
+class Tracer:
+    """Per-thread request traces with named spans"""
+
+    def __init__(self, capacity: int = 256, export_path: Optional[str] = None):
+        self.export_path = export_path
+
+        self._traces = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin(self, name: str) -> Dict[str, Any]:
+        """Start a trace for the calling thread"""
+        trace = {
+            'id': uuid.uuid4().hex[:16],
+            'name': name,
+            'start': time.time(),
+            'spans': [],
+            '_t0': time.perf_counter()
+        }
+        self._local.trace = trace
+        return trace
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block as a span of the current trace (no-op without one)"""
+        trace = self.current()
+        if trace is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            trace['spans'].append({
+                'name': name,
+                'offset_ms': round((start - trace['_t0']) * 1000, 3),
+                'duration_ms': round((end - start) * 1000, 3)
+            })
+
+    def annotate(self, **fields):
+        """Attach fields (e.g. cache hit, lane) to the current trace"""
+        trace = self.current()
+        if trace is not None:
+            trace.setdefault('tags', {}).update(fields)
+
+    def end(self, status: int) -> Optional[Dict[str, Any]]:
+        """Finish the current trace and record it"""
+        trace = self.current()
+        if trace is None:
+            return None
+        self._local.trace = None
+
+        trace['status'] = status
+        trace['duration_ms'] = round((time.perf_counter() - trace.pop('_t0')) * 1000, 3)
+
+        with self._lock:
+            self._traces.append(trace)
+
+        if self.export_path:
+            line = json.dumps(trace) + '\n'
+            with self._export_lock:
+                with open(self.export_path, 'a') as f:
+                    f.write(line)
+        return trace
+
+    def traces(self, order: str = 'slowest', limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Recorded traces, slowest or most recent first"""
+        with self._lock:
+            traces = list(self._traces)
+        if order == 'slowest':
+            traces.sort(key=lambda trace: trace['duration_ms'], reverse=True)
+        else:
+            traces.reverse()
+        return traces[:limit] if limit else traces
+
+    def run(self, cmd: List[str], timeout: float, input: Optional[str] = None) -> subprocess.CompletedProcess:
+        """
+        subprocess.run with separate spans for spawning and running the child
+
+        Kills the child and raises subprocess.TimeoutExpired on timeout.
+        """
+        with self.span('subprocess spawn'):
+            process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+
+        with self.span('child execution'):
+            try:
+                stdout, stderr = process.communicate(input=input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
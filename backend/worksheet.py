@@ -0,0 +1,252 @@
+"""
+Worksheet Module
+Named definitions that may refer to each other, kept in a dependency graph
+so an edit re-evaluates only what is downstream of it
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Iterable, Optional
+
+from cpp_codegen import CodegenError
+from prepared import PreparedExpression, BindingError
+
+
+NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Names the engine reads as constants or functions, not variables
+RESERVED = {'pi', 'e', 'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'log', 'ln', 'exp',
+            'sqrt', 'cbrt', 'abs', 'factorial', 'nCr', 'nPr', 'diff', 'integrate'}
+
+
+class WorksheetError(ValueError):
+    """Raised for malformed definitions or edits"""
+    pass
+
+
+def validate_name(name: str):
+    """Reject names the engine would not parse as a variable"""
+    if not isinstance(name, str) or not NAME.match(name) or name in RESERVED:
+        raise WorksheetError(f'Invalid definition name: {name!r}')
+
+
+class Worksheet:
+    """
+    Definitions name -> expression, each evaluated to a number
+
+    A definition depends on the other definitions its expression uses as
+    free variables. Values are kept between edits; an edit re-evaluates the
+    edited definitions and, in dependency order, those whose inputs changed
+    value. A definition that recomputes to the same value stops the
+    propagation there.
+    """
+
+    def __init__(self, prepare: Callable[[str], PreparedExpression]):
+        self.prepare = prepare
+        self.id = uuid.uuid4().hex[:16]
+        self.version = 0
+        # name -> {'expression', 'prepared', 'uses', 'value', 'error', 'seconds', 'version'}
+        self.nodes = {}
+        self._lock = threading.Lock()
+
+    def update(self, definitions: Dict[str, str], remove: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Apply edits and re-evaluate what they affect
+
+        Returns the report of this update: every value, the definitions
+        recomputed (in evaluation order, with their evaluation times) and
+        those whose cached values were reused.
+        """
+        for name, expression in definitions.items():
+            validate_name(name)
+            if not isinstance(expression, str) or not expression.strip():
+                raise WorksheetError(f'Definition {name} must be a non-empty expression')
+        remove = list(remove)
+        for name in remove:
+            if name in definitions:
+                raise WorksheetError(f'{name} is both defined and removed')
+
+        with self._lock:
+            self.version += 1
+            removed = {name for name in remove if self.nodes.pop(name, None) is not None}
+            changed = set()
+            for name, expression in definitions.items():
+                expression = expression.strip()
+                node = self.nodes.get(name)
+                if node is not None and node['expression'] == expression:
+                    continue
+                self.nodes[name] = self._parse(expression)
+                if node is not None and self.nodes[name]['prepared'] is not None:
+                    # Keep the old value so an edit that does not change it
+                    # stops there; a parse error replaces it
+                    self.nodes[name]['value'], self.nodes[name]['error'] = node['value'], node['error']
+                changed.add(name)
+
+            recomputed = self._propagate(changed, removed)
+            return self._report(recomputed)
+
+    def _parse(self, expression: str) -> Dict[str, Any]:
+        """A new node for an expression; parse errors become its error"""
+        node = {'expression': expression, 'prepared': None, 'uses': [], 'value': None,
+                'error': None, 'seconds': 0.0, 'version': self.version}
+        try:
+            node['prepared'] = self.prepare(expression)
+            node['uses'] = node['prepared'].variables
+        except CodegenError as e:
+            node['error'] = str(e)
+        return node
+
+    def _order(self):
+        """
+        Definitions in dependency order, and the set of those on a cycle
+
+        Kahn's algorithm over the uses of defined names. What it cannot
+        order is on a cycle or downstream of one; cycle members go first.
+        """
+        inputs = {name: {used for used in node['uses'] if used in self.nodes}
+                  for name, node in self.nodes.items()}
+        users = {name: [] for name in self.nodes}
+        for name, used in inputs.items():
+            for source in used:
+                users[source].append(name)
+
+        def release(order, pending):
+            for name in order:
+                for user in users[name]:
+                    if user in pending:
+                        pending[user] -= 1
+                        if not pending[user]:
+                            del pending[user]
+                            order.append(user)
+            return order
+
+        pending = {name: len(used) for name, used in inputs.items() if used}
+        order = release([name for name in self.nodes if not inputs[name]], pending)
+
+        left = set(pending)
+        cyclic = set()
+        for name in left:
+            stack, seen = [used for used in inputs[name] if used in left], set()
+            while stack:
+                used = stack.pop()
+                if used == name:
+                    cyclic.add(name)
+                    break
+                if used not in seen:
+                    seen.add(used)
+                    stack.extend(source for source in inputs[used] if source in left)
+        for name in cyclic:
+            del pending[name]
+        return order + release(sorted(cyclic), pending), cyclic
+
+    def _propagate(self, changed: set, removed: set) -> List[str]:
+        """Re-evaluate changed definitions and what their new values affect"""
+        order, cyclic = self._order()
+        updated = set(removed)
+        recomputed = []
+
+        for name in order:
+            node = self.nodes[name]
+            if name not in changed and not any(used in updated for used in node['uses']):
+                continue
+
+            before = (node['value'], node['error'])
+            if name in cyclic and node['prepared'] is not None:
+                node['value'], node['error'] = None, f'Circular definition: {name} depends on itself'
+                node['seconds'] = 0.0
+            elif node['prepared'] is not None:
+                self._evaluate(node)
+            node['version'] = self.version
+            recomputed.append(name)
+
+            # A definition that no longer parses always invalidates its users
+            if (node['value'], node['error']) != before or node['prepared'] is None:
+                updated.add(name)
+
+        return recomputed
+
+    def _evaluate(self, node: Dict[str, Any]):
+        """Evaluate one definition from the current values of its inputs"""
+        start = time.perf_counter()
+        bindings = {}
+        node['value'] = node['error'] = None
+        for used in node['uses']:
+            source = self.nodes.get(used)
+            if source is None:
+                node['error'] = f'Undefined variable: {used}'
+            elif source['error'] is not None:
+                node['error'] = f'{used} has an error'
+            else:
+                bindings[used] = source['value']
+            if node['error'] is not None:
+                break
+
+        if node['error'] is None:
+            try:
+                value, error = node['prepared'].evaluate(bindings)
+                node['value'], node['error'] = (None, error) if error else (float(value), None)
+            except BindingError as e:
+                node['error'] = str(e)
+        node['seconds'] = time.perf_counter() - start
+
+    def _report(self, recomputed: List[str]) -> Dict[str, Any]:
+        """Values of every definition plus what this update did"""
+        return {
+            'id': self.id,
+            'version': self.version,
+            'definitions': self.definitions(),
+            'recomputed': [
+                {'name': name, 'seconds': round(self.nodes[name]['seconds'], 6)}
+                for name in recomputed
+            ],
+            'reused': sorted(set(self.nodes) - set(recomputed))
+        }
+
+    def definitions(self) -> Dict[str, Dict[str, Any]]:
+        """name -> expression, value or error, inputs and the version it last changed"""
+        return {
+            name: {
+                'expression': node['expression'],
+                'value': node['value'],
+                'error': node['error'],
+                'uses': list(node['uses']),
+                'version': node['version']
+            }
+            for name, node in self.nodes.items()
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'id': self.id, 'version': self.version, 'definitions': self.definitions()}
+
+
+class WorksheetRegistry:
+    """Bounded map of ids to worksheets with LRU eviction"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, worksheet: Worksheet):
+        with self._lock:
+            self._entries[worksheet.id] = worksheet
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, worksheet_id: str) -> Optional[Worksheet]:
+        with self._lock:
+            worksheet = self._entries.get(worksheet_id)
+            if worksheet is not None:
+                self._entries.move_to_end(worksheet_id)
+            return worksheet
+
+    def remove(self, worksheet_id: str) -> bool:
+        with self._lock:
+            return self._entries.pop(worksheet_id, None) is not None
+
+    def __len__(self):
+        return len(self._entries)
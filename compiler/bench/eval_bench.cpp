@@ -0,0 +1,125 @@
+// Evaluation benchmark: the tree-walking Evaluator against the compiled
+// node array, on the same parsed expressions
+//
+// Build and run from compiler/: make bench
+// With --check (make check), only compares results and errors, untimed
+
+#include <chrono>
+#include <cstdio>
+#include <cstring>
+#include <memory>
+#include <string>
+#include <vector>
+#include "../lexer.h"
+#include "../parser.h"
+#include "../evaluator.h"
+#include "../compiled.h"
+
+static std::shared_ptr<ASTNode> parse(const std::string& expression) {
+    Lexer lexer(expression);
+    std::vector<Token> tokens = lexer.tokenize();
+    Parser parser(tokens);
+    return parser.parse();
+}
+
+// Exact result (hex float) or error message of one evaluation
+template <typename F>
+static std::string outcome(F f) {
+    try {
+        char text[64];
+        std::snprintf(text, sizeof(text), "%a", f());
+        return text;
+    } catch (const std::exception& e) {
+        return std::string("error: ") + e.what();
+    }
+}
+
+// Runs f until about minSeconds have passed; returns nanoseconds per call
+template <typename F>
+static double timePerCall(F f, double minSeconds, double& sink) {
+    using Clock = std::chrono::steady_clock;
+    long iterations = 1;
+    while (true) {
+        auto start = Clock::now();
+        for (long i = 0; i < iterations; i++) {
+            sink += f();
+        }
+        double seconds = std::chrono::duration<double>(Clock::now() - start).count();
+        if (seconds >= minSeconds) {
+            return seconds * 1e9 / iterations;
+        }
+        iterations *= seconds > 0 ? std::max(2L, static_cast<long>(minSeconds / seconds * 1.2)) : 10;
+    }
+}
+
+int main(int argc, char* argv[]) {
+    bool checkOnly = argc > 1 && std::strcmp(argv[1], "--check") == 0;
+    double minSeconds = argc > 1 && !checkOnly ? std::atof(argv[1]) : 0.5;
+
+    const std::vector<std::string> expressions = {
+        "2 + 3 * 4",
+        "sin(pi/4) + cos(pi/4)",
+        "sqrt(144) + 2^10 - log(100) * ln(e^5)",
+        "nCr(52,5) / nPr(10,3) + 5!",
+        "abs(-5!) + cbrt(27) + atan(1) * acos(0.5) - exp(2) % 3",
+        "diff(x^3 + sin(x) * cos(x), x, 2)",
+        "integrate(x^2 + sin(x), x, 0, 3)",
+        "integrate(exp(0 - x^2) * cos(x) + sqrt(x + 4), x, 0, 3)",
+        "integrate(integrate(x*y + x^2, x, 0, 1), y, 0, 1)",
+    };
+
+    // Checked, not timed: the first error raised must be the same, in the
+    // same evaluation order, and calculus bindings must stay set afterwards
+    const std::vector<std::string> errors = {
+        "nCr(sqrt(0 - 1), ln(0 - 1))",
+        "1 / (2 - 2) + sqrt(0 - 1)",
+        "sqrt(0 - 1) + 5 % 0",
+        "(0 - 3)! + 171!",
+        "171! * nPr(3, 5)",
+        "nCr(2.5, 1) - nCr(0 - 1, 1)",
+        "asin(2) * acos(3)",
+        "log(0) - ln(0)",
+        "integrate(1 / (x - 0.5), x, 0, 1)",
+        "diff(sqrt(x), x, 0)",
+        "integrate(integrate(x / y, x, 0, 1), y, 0, 1)",
+        "x + 1",
+        "integrate(x, x, 0, 1) + x",
+    };
+
+    int mismatches = 0;
+    std::vector<std::string> checked(expressions);
+    checked.insert(checked.end(), errors.begin(), errors.end());
+    for (const std::string& expression : checked) {
+        std::shared_ptr<ASTNode> ast = parse(expression);
+        Evaluator evaluator;
+        CompiledExpression program(ast);
+
+        std::string expected = outcome([&] { return evaluator.evaluate(ast); });
+        std::string actual = outcome([&] { return program.evaluate(); });
+        if (expected != actual) {
+            std::printf("MISMATCH %s: tree %s, compiled %s\n", expression.c_str(), expected.c_str(), actual.c_str());
+            mismatches++;
+        }
+    }
+    if (checkOnly) {
+        std::printf("%zu expressions, %d mismatches\n", checked.size(), mismatches);
+        return mismatches ? 1 : 0;
+    }
+
+    std::printf("%-58s %6s %12s %12s %8s\n", "expression", "nodes", "tree ns", "compiled ns", "speedup");
+    double sink = 0.0;
+    for (const std::string& expression : expressions) {
+        std::shared_ptr<ASTNode> ast = parse(expression);
+        Evaluator evaluator;
+        CompiledExpression program(ast);
+
+        double tree = timePerCall([&] { return evaluator.evaluate(ast); }, minSeconds, sink);
+        double compiled = timePerCall([&] { return program.evaluate(); }, minSeconds, sink);
+        std::printf("%-58s %6zu %12.1f %12.1f %7.1fx\n",
+                    expression.c_str(), program.size(), tree, compiled, tree / compiled);
+    }
+
+    // Keeps the timed calls from being optimized away
+    std::fprintf(stderr, "checksum %g\n", sink);
+    return mismatches ? 1 : 0;
+}
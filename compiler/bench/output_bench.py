@@ -0,0 +1,64 @@
+"""
+Output Forwarding Benchmark
+Times the backend's handling of engine output for /api/compile: decoding
+and re-encoding it, decoding it to validate, and the framing check that
+lets the text be forwarded as is
+
+Build the compiler, then run from compiler/: make bench-output
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILER = os.path.join(BENCH_DIR, '..', 'compiler')
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..', 'backend'))
+
+import fast_json  # noqa: E402
+
+EXPRESSIONS = [
+    '2 + 3 * 4',
+    'sqrt(144) + 2^10 - log(100) * ln(e^5)',
+    'diff(x^3 + sin(x) * cos(x), x, 2)',
+    'integrate(exp(0 - x^2) * cos(x) + sqrt(x + 4), x, 0, 3)',
+    '+'.join(f'sin({i}) * cos({i})' for i in range(200)),
+]
+
+
+def time_per_call(f, min_seconds):
+    """Runs f until about min_seconds have passed; returns milliseconds per call"""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            f()
+        seconds = time.perf_counter() - start
+        if seconds >= min_seconds:
+            return seconds * 1e3 / iterations
+        iterations *= max(2, int(min_seconds / seconds * 1.2)) if seconds > 0 else 10
+
+
+def main():
+    min_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    strategies = [
+        ('re-encode', lambda text: json.dumps(json.loads(text))),
+        ('decode', lambda text: fast_json.loads(text)),
+        ('check', lambda text: fast_json.is_engine_success(text)),
+    ]
+
+    print(f"JSON codec: {'orjson' if fast_json.orjson is not None else 'standard library'}")
+    print(f"{'expression':<42} {'bytes':>8}" + ''.join(f' {name + " ms":>14}' for name, _ in strategies))
+    for expression in EXPRESSIONS:
+        text = subprocess.run([COMPILER, expression], capture_output=True, text=True, check=True).stdout
+        if not fast_json.is_engine_success(text) or not fast_json.loads(text)['success']:
+            sys.exit(f'Unexpected engine output for {expression}')
+        label = expression if len(expression) <= 42 else expression[:39] + '...'
+        print(f'{label:<42} {len(text):>8}' +
+              ''.join(f' {time_per_call(lambda: run(text), min_seconds):>14.4f}' for _, run in strategies))
+
+
+if __name__ == '__main__':
+    main()
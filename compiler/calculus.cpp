@@ -11,22 +11,31 @@ double Calculus::differentiate(
     double point,
     Evaluator* evaluator,
     std::vector<CalculusStep>& steps
+) {
+    return differentiate([&](double x) {
+        evaluator->setVariable(variable, x);
+        return evaluator->evaluate(expr);
+    }, point, steps);
+}
+
+double Calculus::differentiate(
+    const std::function<double(double)>& f,
+    double point,
+    std::vector<CalculusStep>& steps
 ) {
     steps.clear();
     
     double h = EPSILON;
     
     // Evaluate f(x + h)
-    evaluator->setVariable(variable, point + h);
-    double f_plus = evaluator->evaluate(expr);
+    double f_plus = f(point + h);
     
     std::ostringstream oss1;
     oss1 << "f(" << point + h << ") = " << f_plus;
     steps.push_back({point + h, f_plus, oss1.str()});
     
     // Evaluate f(x - h)
-    evaluator->setVariable(variable, point - h);
-    double f_minus = evaluator->evaluate(expr);
+    double f_minus = f(point - h);
     
     std::ostringstream oss2;
     oss2 << "f(" << point - h << ") = " << f_minus;
@@ -51,6 +60,19 @@ double Calculus::integrateTrapezoid(
     Evaluator* evaluator,
     std::vector<CalculusStep>& steps,
     int numSteps
+) {
+    return integrateTrapezoid([&](double x) {
+        evaluator->setVariable(variable, x);
+        return evaluator->evaluate(expr);
+    }, lowerBound, upperBound, steps, numSteps);
+}
+
+double Calculus::integrateTrapezoid(
+    const std::function<double(double)>& f,
+    double lowerBound,
+    double upperBound,
+    std::vector<CalculusStep>& steps,
+    int numSteps
 ) {
     steps.clear();
     
@@ -58,8 +80,7 @@ double Calculus::integrateTrapezoid(
     double sum = 0.0;
     
     // Evaluate at lower bound
-    evaluator->setVariable(variable, lowerBound);
-    double f_lower = evaluator->evaluate(expr);
+    double f_lower = f(lowerBound);
     sum += f_lower;
     
     std::ostringstream oss1;
@@ -69,8 +90,7 @@ double Calculus::integrateTrapezoid(
     // Evaluate at interior points
     for (int i = 1; i < numSteps; i++) {
         double x = lowerBound + i * h;
-        evaluator->setVariable(variable, x);
-        double fx = evaluator->evaluate(expr);
+        double fx = f(x);
         sum += 2.0 * fx;
         
         // Only record some steps to avoid overwhelming output
@@ -82,8 +102,7 @@ double Calculus::integrateTrapezoid(
     }
     
     // Evaluate at upper bound
-    evaluator->setVariable(variable, upperBound);
-    double f_upper = evaluator->evaluate(expr);
+    double f_upper = f(upperBound);
     sum += f_upper;
     
     std::ostringstream oss2;
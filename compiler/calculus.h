@@ -1,6 +1,7 @@
 #ifndef CALCULUS_H
 #define CALCULUS_H
 
+#include <functional>
 #include <memory>
 #include <vector>
 #include <string>
@@ -18,7 +19,26 @@ class Calculus {
 private:
     static const double EPSILON; // Step size for numerical methods
     
+    // CompiledExpression evaluates calculus nodes with the same constants
+    friend class CompiledExpression;
+    
 public:
+    // Both rules over any function of the bound variable, recording steps
+    static double differentiate(
+        const std::function<double(double)>& f,
+        double point,
+        std::vector<CalculusStep>& steps
+    );
+    
+    static double integrateTrapezoid(
+        const std::function<double(double)>& f,
+        double lowerBound,
+        double upperBound,
+        std::vector<CalculusStep>& steps,
+        int numSteps = 1000
+    );
+    
+
     // Numerical Differentiation using Central Finite Difference
     static double differentiate(
         std::shared_ptr<ASTNode> expr,
@@ -0,0 +1,288 @@
+#include "compiled.h"
+#include "calculus.h"
+#include "evaluator.h"
+#include <cmath>
+#include <stdexcept>
+
+// Function targets, with the domain checks of Evaluator
+static double fnSin(double x) { return std::sin(x); }
+static double fnCos(double x) { return std::cos(x); }
+static double fnTan(double x) { return std::tan(x); }
+static double fnAtan(double x) { return std::atan(x); }
+static double fnExp(double x) { return std::exp(x); }
+static double fnCbrt(double x) { return std::cbrt(x); }
+static double fnAbs(double x) { return std::abs(x); }
+
+static double fnAsin(double x) {
+    if (x < -1.0 || x > 1.0) throw std::runtime_error("asin domain error");
+    return std::asin(x);
+}
+
+static double fnAcos(double x) {
+    if (x < -1.0 || x > 1.0) throw std::runtime_error("acos domain error");
+    return std::acos(x);
+}
+
+static double fnLog(double x) {
+    if (x <= 0.0) throw std::runtime_error("log domain error");
+    return std::log10(x);
+}
+
+static double fnLn(double x) {
+    if (x <= 0.0) throw std::runtime_error("ln domain error");
+    return std::log(x);
+}
+
+static double fnSqrt(double x) {
+    if (x < 0.0) throw std::runtime_error("sqrt domain error");
+    return std::sqrt(x);
+}
+
+static double (*resolveFunction(const std::string& name))(double) {
+    if (name == "sin") return fnSin;
+    if (name == "cos") return fnCos;
+    if (name == "tan") return fnTan;
+    if (name == "asin") return fnAsin;
+    if (name == "acos") return fnAcos;
+    if (name == "atan") return fnAtan;
+    if (name == "log") return fnLog;
+    if (name == "ln") return fnLn;
+    if (name == "exp") return fnExp;
+    if (name == "sqrt") return fnSqrt;
+    if (name == "cbrt") return fnCbrt;
+    if (name == "abs") return fnAbs;
+    throw std::runtime_error("Unknown function: " + name);
+}
+
+// nCr and nPr with Evaluator's validation order and arithmetic
+static double combinatoric(const char* name, double n, double r, bool ordered) {
+    if (n < 0 || r < 0) {
+        throw std::runtime_error(std::string(name) + " requires non-negative integers");
+    }
+    if (n != std::floor(n) || r != std::floor(r)) {
+        throw std::runtime_error(std::string(name) + " requires integer arguments");
+    }
+    if (r > n) {
+        throw std::runtime_error(std::string(name) + " requires n >= r");
+    }
+
+    double nFact = Evaluator::factorial(n);
+    if (ordered) {
+        return nFact / Evaluator::factorial(n - r);
+    }
+    double rFact = Evaluator::factorial(r);
+    double nMinusRFact = Evaluator::factorial(n - r);
+    return nFact / (rFact * nMinusRFact);
+}
+
+CompiledExpression::CompiledExpression(const std::shared_ptr<ASTNode>& ast) {
+    lower(ast);
+    values.resize(nodes.size());
+}
+
+uint32_t CompiledExpression::slotFor(const std::string& name) {
+    for (uint32_t i = 0; i < slotNames.size(); i++) {
+        if (slotNames[i] == name) return i;
+    }
+    slotNames.push_back(name);
+    slots.push_back(0.0);
+    bound.push_back(0);
+    return static_cast<uint32_t>(slotNames.size() - 1);
+}
+
+uint32_t CompiledExpression::emit(const CompiledNode& node) {
+    nodes.push_back(node);
+    return static_cast<uint32_t>(nodes.size() - 1);
+}
+
+uint32_t CompiledExpression::lower(const std::shared_ptr<ASTNode>& node) {
+    CompiledNode out{};
+
+    switch (node->type) {
+        case ASTNodeType::NUMBER:
+            out.op = OpCode::CONST;
+            out.value = std::static_pointer_cast<NumberNode>(node)->value;
+            return emit(out);
+
+        case ASTNodeType::VARIABLE:
+            out.op = OpCode::VAR;
+            out.a = slotFor(std::static_pointer_cast<VariableNode>(node)->name);
+            return emit(out);
+
+        case ASTNodeType::BINARY_OP: {
+            auto binNode = std::static_pointer_cast<BinaryOpNode>(node);
+            const std::string& op = binNode->op;
+            if (op == "+") out.op = OpCode::ADD;
+            else if (op == "-") out.op = OpCode::SUB;
+            else if (op == "*") out.op = OpCode::MUL;
+            else if (op == "/") out.op = OpCode::DIV;
+            else if (op == "%") out.op = OpCode::MOD;
+            else if (op == "^") out.op = OpCode::POW;
+            else throw std::runtime_error("Unknown binary operator: " + op);
+            out.a = lower(binNode->left);
+            out.b = lower(binNode->right);
+            return emit(out);
+        }
+
+        case ASTNodeType::UNARY_OP: {
+            auto unaryNode = std::static_pointer_cast<UnaryOpNode>(node);
+            if (unaryNode->op == "neg") out.op = OpCode::NEG;
+            else if (unaryNode->op == "!") out.op = OpCode::FACTORIAL;
+            else throw std::runtime_error("Unknown unary operator: " + unaryNode->op);
+            out.a = lower(unaryNode->operand);
+            return emit(out);
+        }
+
+        case ASTNodeType::FUNCTION_CALL: {
+            auto funcNode = std::static_pointer_cast<FunctionCallNode>(node);
+            out.op = OpCode::CALL;
+            out.function = resolveFunction(funcNode->name);
+            out.a = lower(funcNode->arguments[0]);
+            return emit(out);
+        }
+
+        case ASTNodeType::FACTORIAL:
+            out.op = OpCode::FACTORIAL;
+            out.a = lower(std::static_pointer_cast<FactorialNode>(node)->operand);
+            return emit(out);
+
+        case ASTNodeType::NCR: {
+            auto ncrNode = std::static_pointer_cast<NCrNode>(node);
+            out.op = OpCode::NCR;
+            out.a = lower(ncrNode->n);
+            out.b = lower(ncrNode->r);
+            return emit(out);
+        }
+
+        case ASTNodeType::NPR: {
+            auto nprNode = std::static_pointer_cast<NPrNode>(node);
+            out.op = OpCode::NPR;
+            out.a = lower(nprNode->n);
+            out.b = lower(nprNode->r);
+            return emit(out);
+        }
+
+        case ASTNodeType::DIFF_NODE: {
+            auto diffNode = std::static_pointer_cast<DiffNode>(node);
+            out.op = OpCode::DIFF;
+            out.a = slotFor(diffNode->variable);
+            out.value = diffNode->point;
+            uint32_t index = emit(out);
+            lower(diffNode->expression);
+            nodes[index].b = static_cast<uint32_t>(nodes.size());
+            return index;
+        }
+
+        case ASTNodeType::INTEGRATE_NODE: {
+            auto intNode = std::static_pointer_cast<IntegrateNode>(node);
+            out.op = OpCode::INTEGRATE;
+            out.a = slotFor(intNode->variable);
+            out.value = intNode->lowerBound;
+            out.upper = intNode->upperBound;
+            uint32_t index = emit(out);
+            lower(intNode->expression);
+            nodes[index].b = static_cast<uint32_t>(nodes.size());
+            return index;
+        }
+
+        default:
+            throw std::runtime_error("Unknown node type");
+    }
+}
+
+void CompiledExpression::setVariable(const std::string& name, double value) {
+    for (size_t i = 0; i < slotNames.size(); i++) {
+        if (slotNames[i] == name) {
+            slots[i] = value;
+            bound[i] = 1;
+            return;
+        }
+    }
+}
+
+double CompiledExpression::evaluate() {
+    return run(0, static_cast<uint32_t>(nodes.size()));
+}
+
+double CompiledExpression::run(uint32_t begin, uint32_t end) {
+    double* v = values.data();
+
+    for (uint32_t i = begin; i < end; i++) {
+        const CompiledNode& node = nodes[i];
+
+        switch (node.op) {
+            case OpCode::CONST:
+                v[i] = node.value;
+                break;
+
+            case OpCode::VAR:
+                if (!bound[node.a]) {
+                    throw std::runtime_error("Undefined variable: " + slotNames[node.a]);
+                }
+                v[i] = slots[node.a];
+                break;
+
+            case OpCode::ADD: v[i] = v[node.a] + v[node.b]; break;
+            case OpCode::SUB: v[i] = v[node.a] - v[node.b]; break;
+            case OpCode::MUL: v[i] = v[node.a] * v[node.b]; break;
+
+            case OpCode::DIV:
+                if (v[node.b] == 0.0) throw std::runtime_error("Division by zero");
+                v[i] = v[node.a] / v[node.b];
+                break;
+
+            case OpCode::MOD:
+                if (v[node.b] == 0.0) throw std::runtime_error("Modulo by zero");
+                v[i] = std::fmod(v[node.a], v[node.b]);
+                break;
+
+            case OpCode::POW: v[i] = std::pow(v[node.a], v[node.b]); break;
+            case OpCode::NEG: v[i] = -v[node.a]; break;
+            case OpCode::FACTORIAL: v[i] = Evaluator::factorial(v[node.a]); break;
+            case OpCode::CALL: v[i] = node.function(v[node.a]); break;
+            case OpCode::NCR: v[i] = combinatoric("nCr", v[node.a], v[node.b], false); break;
+            case OpCode::NPR: v[i] = combinatoric("nPr", v[node.a], v[node.b], true); break;
+
+            case OpCode::DIFF: {
+                // Central difference, as Calculus::differentiate
+                double h = Calculus::EPSILON;
+                slots[node.a] = node.value + h;
+                bound[node.a] = 1;
+                double f_plus = run(i + 1, node.b);
+                slots[node.a] = node.value - h;
+                double f_minus = run(i + 1, node.b);
+                v[i] = (f_plus - f_minus) / (2.0 * h);
+                i = node.b - 1;
+                break;
+            }
+
+            case OpCode::INTEGRATE: {
+                // Trapezoid rule, as Calculus::integrateTrapezoid
+                const int numSteps = 1000;
+                double lowerBound = node.value;
+                double upperBound = node.upper;
+                double h = (upperBound - lowerBound) / numSteps;
+                double sum = 0.0;
+
+                slots[node.a] = lowerBound;
+                bound[node.a] = 1;
+                sum += run(i + 1, node.b);
+                for (int step = 1; step < numSteps; step++) {
+                    slots[node.a] = lowerBound + step * h;
+                    sum += 2.0 * run(i + 1, node.b);
+                }
+                slots[node.a] = upperBound;
+                sum += run(i + 1, node.b);
+
+                v[i] = (h / 2.0) * sum;
+                i = node.b - 1;
+                break;
+            }
+        }
+    }
+
+    // A subtree ends with its root, except a calculus node, which leads
+    const CompiledNode& first = nodes[begin];
+    bool calculusRoot = (first.op == OpCode::DIFF || first.op == OpCode::INTEGRATE) && first.b == end;
+    return v[calculusRoot ? begin : end - 1];
+}
@@ -0,0 +1,71 @@
+#ifndef COMPILED_H
+#define COMPILED_H
+
+#include <cstdint>
+#include <memory>
+#include <string>
+#include <vector>
+#include "ast.h"
+
+// Operation of a compiled node
+enum class OpCode : uint8_t {
+    CONST,
+    VAR,
+    ADD,
+    SUB,
+    MUL,
+    DIV,
+    MOD,
+    POW,
+    NEG,
+    FACTORIAL,
+    CALL,
+    NCR,
+    NPR,
+    DIFF,
+    INTEGRATE
+};
+
+// One node of a compiled expression (32 bytes). Operands are indices of
+// earlier nodes. A calculus node comes right before its body, which runs
+// up to (not including) node `b`.
+struct CompiledNode {
+    OpCode op;
+    uint32_t a;         // first operand; variable slot for VAR, DIFF, INTEGRATE
+    uint32_t b;         // second operand; body end for DIFF, INTEGRATE
+    double value;       // CONST value, DIFF point, INTEGRATE lower bound
+    union {
+        double upper;                  // INTEGRATE upper bound
+        double (*function)(double);    // CALL target, resolved at compile time
+    };
+};
+
+// An AST lowered into a contiguous node array in evaluation order, with
+// variables resolved to slots. Evaluation is a single loop over the array
+// and follows Evaluator exactly: same results, same errors in the same
+// order, and calculus bindings that stay set afterwards.
+class CompiledExpression {
+private:
+    std::vector<CompiledNode> nodes;
+    std::vector<double> values;          // one scratch value per node
+    std::vector<std::string> slotNames;
+    std::vector<double> slots;
+    std::vector<char> bound;
+
+    uint32_t slotFor(const std::string& name);
+    uint32_t lower(const std::shared_ptr<ASTNode>& node);
+    uint32_t emit(const CompiledNode& node);
+    double run(uint32_t begin, uint32_t end);
+
+public:
+    explicit CompiledExpression(const std::shared_ptr<ASTNode>& ast);
+
+    // Binds a variable; names the expression does not use are ignored
+    void setVariable(const std::string& name, double value);
+
+    double evaluate();
+
+    size_t size() const { return nodes.size(); }
+};
+
+#endif // COMPILED_H
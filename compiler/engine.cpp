@@ -0,0 +1,386 @@
+#include <cstdlib>
+#include <cstring>
+#include <new>
+#include <sstream>
+#include <string>
+#include <vector>
+#include <memory>
+#include <charconv>
+#include <cmath>
+#include "engine.h"
+#include "lexer.h"
+#include "parser.h"
+#include "ast.h"
+#include "evaluator.h"
+#include "calculus.h"
+#include "compiled.h"
+
+// JSON helper functions
+std::string escapeJSON(const std::string& str) {
+    std::string result;
+    for (char c : str) {
+        switch (c) {
+            case '"': result += "\\\""; break;
+            case '\\': result += "\\\\"; break;
+            case '\n': result += "\\n"; break;
+            case '\r': result += "\\r"; break;
+            case '\t': result += "\\t"; break;
+            default: result += c;
+        }
+    }
+    return result;
+}
+
+std::string tokensToJSON(const std::vector<Token>& tokens) {
+    std::ostringstream json;
+    json << "[";
+    for (size_t i = 0; i < tokens.size(); i++) {
+        if (i > 0) json << ",";
+        json << "{\"type\":\"" << Lexer::tokenTypeToString(tokens[i].type) << "\",";
+        json << "\"value\":\"" << escapeJSON(tokens[i].value) << "\"";
+        if (tokens[i].type == TokenType::NUMBER || tokens[i].type == TokenType::CONSTANT) {
+            json << ",\"numValue\":" << tokens[i].numValue;
+        }
+        json << "}";
+    }
+    json << "]";
+    return json.str();
+}
+
+std::string astToJSON(std::shared_ptr<ASTNode> node) {
+    if (!node) return "null";
+    
+    std::ostringstream json;
+    json << "{";
+    
+    switch (node->type) {
+        case ASTNodeType::NUMBER: {
+            auto numNode = std::dynamic_pointer_cast<NumberNode>(node);
+            json << "\"type\":\"NUMBER\",\"value\":" << numNode->value;
+            break;
+        }
+        case ASTNodeType::VARIABLE: {
+            auto varNode = std::dynamic_pointer_cast<VariableNode>(node);
+            json << "\"type\":\"VARIABLE\",\"name\":\"" << varNode->name << "\"";
+            break;
+        }
+        case ASTNodeType::BINARY_OP: {
+            auto binNode = std::dynamic_pointer_cast<BinaryOpNode>(node);
+            json << "\"type\":\"BINARY_OP\",\"op\":\"" << escapeJSON(binNode->op) << "\",";
+            json << "\"left\":" << astToJSON(binNode->left) << ",";
+            json << "\"right\":" << astToJSON(binNode->right);
+            break;
+        }
+        case ASTNodeType::UNARY_OP: {
+            auto unaryNode = std::dynamic_pointer_cast<UnaryOpNode>(node);
+            json << "\"type\":\"UNARY_OP\",\"op\":\"" << escapeJSON(unaryNode->op) << "\",";
+            json << "\"operand\":" << astToJSON(unaryNode->operand);
+            break;
+        }
+        case ASTNodeType::FUNCTION_CALL: {
+            auto funcNode = std::dynamic_pointer_cast<FunctionCallNode>(node);
+            json << "\"type\":\"FUNCTION_CALL\",\"name\":\"" << funcNode->name << "\",";
+            json << "\"arguments\":[";
+            for (size_t i = 0; i < funcNode->arguments.size(); i++) {
+                if (i > 0) json << ",";
+                json << astToJSON(funcNode->arguments[i]);
+            }
+            json << "]";
+            break;
+        }
+        case ASTNodeType::DIFF_NODE: {
+            auto diffNode = std::dynamic_pointer_cast<DiffNode>(node);
+            json << "\"type\":\"DIFF_NODE\",\"variable\":\"" << diffNode->variable << "\",";
+            json << "\"point\":" << diffNode->point << ",";
+            json << "\"expression\":" << astToJSON(diffNode->expression);
+            break;
+        }
+        case ASTNodeType::INTEGRATE_NODE: {
+            auto intNode = std::dynamic_pointer_cast<IntegrateNode>(node);
+            json << "\"type\":\"INTEGRATE_NODE\",\"variable\":\"" << intNode->variable << "\",";
+            json << "\"lowerBound\":" << intNode->lowerBound << ",";
+            json << "\"upperBound\":" << intNode->upperBound << ",";
+            json << "\"expression\":" << astToJSON(intNode->expression);
+            break;
+        }
+        case ASTNodeType::FACTORIAL: {
+            auto factNode = std::dynamic_pointer_cast<FactorialNode>(node);
+            json << "\"type\":\"FACTORIAL\",";
+            json << "\"operand\":" << astToJSON(factNode->operand);
+            break;
+        }
+        case ASTNodeType::NCR: {
+            auto ncrNode = std::dynamic_pointer_cast<NCrNode>(node);
+            json << "\"type\":\"NCR\",";
+            json << "\"n\":" << astToJSON(ncrNode->n) << ",";
+            json << "\"r\":" << astToJSON(ncrNode->r);
+            break;
+        }
+        case ASTNodeType::NPR: {
+            auto nprNode = std::dynamic_pointer_cast<NPrNode>(node);
+            json << "\"type\":\"NPR\",";
+            json << "\"n\":" << astToJSON(nprNode->n) << ",";
+            json << "\"r\":" << astToJSON(nprNode->r);
+            break;
+        }
+    }
+    
+    json << "}";
+    return json.str();
+}
+
+// Shortest decimal form that reads back as the same double
+std::string formatNumber(double value) {
+    if (!std::isfinite(value)) return "null";
+    char buffer[32];
+    auto result = std::to_chars(buffer, buffer + sizeof(buffer), value);
+    return std::string(buffer, result.ptr);
+}
+
+// Flatten the AST into a post-order node list where children are
+// referenced by index; the root is the last node
+int flattenAST(std::shared_ptr<ASTNode> node, std::vector<std::string>& nodes) {
+    std::ostringstream json;
+    json << "{";
+    
+    switch (node->type) {
+        case ASTNodeType::NUMBER: {
+            auto numNode = std::dynamic_pointer_cast<NumberNode>(node);
+            json << "\"type\":\"NUMBER\",\"value\":" << formatNumber(numNode->value);
+            break;
+        }
+        case ASTNodeType::VARIABLE: {
+            auto varNode = std::dynamic_pointer_cast<VariableNode>(node);
+            json << "\"type\":\"VARIABLE\",\"name\":\"" << escapeJSON(varNode->name) << "\"";
+            break;
+        }
+        case ASTNodeType::BINARY_OP: {
+            auto binNode = std::dynamic_pointer_cast<BinaryOpNode>(node);
+            int left = flattenAST(binNode->left, nodes);
+            int right = flattenAST(binNode->right, nodes);
+            json << "\"type\":\"BINARY_OP\",\"op\":\"" << escapeJSON(binNode->op) << "\",";
+            json << "\"children\":[" << left << "," << right << "]";
+            break;
+        }
+        case ASTNodeType::UNARY_OP: {
+            auto unaryNode = std::dynamic_pointer_cast<UnaryOpNode>(node);
+            int operand = flattenAST(unaryNode->operand, nodes);
+            json << "\"type\":\"UNARY_OP\",\"op\":\"" << escapeJSON(unaryNode->op) << "\",";
+            json << "\"children\":[" << operand << "]";
+            break;
+        }
+        case ASTNodeType::FUNCTION_CALL: {
+            auto funcNode = std::dynamic_pointer_cast<FunctionCallNode>(node);
+            std::vector<int> args;
+            for (auto& arg : funcNode->arguments) {
+                args.push_back(flattenAST(arg, nodes));
+            }
+            json << "\"type\":\"FUNCTION_CALL\",\"name\":\"" << funcNode->name << "\",";
+            json << "\"children\":[";
+            for (size_t i = 0; i < args.size(); i++) {
+                if (i > 0) json << ",";
+                json << args[i];
+            }
+            json << "]";
+            break;
+        }
+        case ASTNodeType::DIFF_NODE: {
+            auto diffNode = std::dynamic_pointer_cast<DiffNode>(node);
+            int expr = flattenAST(diffNode->expression, nodes);
+            json << "\"type\":\"DIFF_NODE\",\"variable\":\"" << escapeJSON(diffNode->variable) << "\",";
+            json << "\"point\":" << formatNumber(diffNode->point) << ",";
+            json << "\"children\":[" << expr << "]";
+            break;
+        }
+        case ASTNodeType::INTEGRATE_NODE: {
+            auto intNode = std::dynamic_pointer_cast<IntegrateNode>(node);
+            int expr = flattenAST(intNode->expression, nodes);
+            json << "\"type\":\"INTEGRATE_NODE\",\"variable\":\"" << escapeJSON(intNode->variable) << "\",";
+            json << "\"lowerBound\":" << formatNumber(intNode->lowerBound) << ",";
+            json << "\"upperBound\":" << formatNumber(intNode->upperBound) << ",";
+            json << "\"children\":[" << expr << "]";
+            break;
+        }
+        case ASTNodeType::FACTORIAL: {
+            auto factNode = std::dynamic_pointer_cast<FactorialNode>(node);
+            int operand = flattenAST(factNode->operand, nodes);
+            json << "\"type\":\"FACTORIAL\",\"children\":[" << operand << "]";
+            break;
+        }
+        case ASTNodeType::NCR: {
+            auto ncrNode = std::dynamic_pointer_cast<NCrNode>(node);
+            int n = flattenAST(ncrNode->n, nodes);
+            int r = flattenAST(ncrNode->r, nodes);
+            json << "\"type\":\"NCR\",\"children\":[" << n << "," << r << "]";
+            break;
+        }
+        case ASTNodeType::NPR: {
+            auto nprNode = std::dynamic_pointer_cast<NPrNode>(node);
+            int n = flattenAST(nprNode->n, nodes);
+            int r = flattenAST(nprNode->r, nodes);
+            json << "\"type\":\"NPR\",\"children\":[" << n << "," << r << "]";
+            break;
+        }
+    }
+    
+    json << "}";
+    nodes.push_back(json.str());
+    return static_cast<int>(nodes.size()) - 1;
+}
+
+std::string intermediateCodeToJSON(const std::vector<std::string>& code) {
+    std::ostringstream json;
+    json << "[";
+    for (size_t i = 0; i < code.size(); i++) {
+        if (i > 0) json << ",";
+        json << "\"" << escapeJSON(code[i]) << "\"";
+    }
+    json << "]";
+    return json.str();
+}
+
+std::string calculusStepsToJSON(const std::vector<CalculusStep>& steps) {
+    std::ostringstream json;
+    json << "[";
+    for (size_t i = 0; i < steps.size(); i++) {
+        if (i > 0) json << ",";
+        json << "{\"x\":" << steps[i].x << ",";
+        json << "\"fx\":" << steps[i].fx << ",";
+        json << "\"description\":\"" << escapeJSON(steps[i].description) << "\"}";
+    }
+    json << "]";
+    return json.str();
+}
+
+int compileExpression(const std::string& expression, bool astOnly,
+                      std::ostream& out, std::ostream& err) {
+    try {
+        if (expression.empty()) {
+            err << "{\"error\":\"Empty expression\"}" << std::endl;
+            return 1;
+        }
+        
+        // Lexical Analysis
+        Lexer lexer(expression);
+        std::vector<Token> tokens = lexer.tokenize();
+        
+        // Parsing
+        Parser parser(tokens);
+        std::shared_ptr<ASTNode> ast = parser.parse();
+        
+        if (astOnly) {
+            std::vector<std::string> nodes;
+            flattenAST(ast, nodes);
+            out << "{\"success\":true,";
+            out << "\"expression\":\"" << escapeJSON(expression) << "\",";
+            out << "\"nodes\":[";
+            for (size_t i = 0; i < nodes.size(); i++) {
+                if (i > 0) out << ",";
+                out << nodes[i];
+            }
+            out << "]}" << std::endl;
+            return 0;
+        }
+        
+        // Intermediate Code Generation
+        Evaluator evaluator;
+        evaluator.clearIntermediateCode();
+        evaluator.generateIntermediateCode(ast);
+        std::vector<std::string> intermediateCode = evaluator.getIntermediateCode();
+        
+        // Evaluation, on the AST lowered to a flat node array
+        CompiledExpression program(ast);
+        double result = program.evaluate();
+        
+        // Check for calculus operations and get steps
+        std::vector<CalculusStep> calculusSteps;
+        std::string calculusType = "none";
+        
+        if (ast->type == ASTNodeType::DIFF_NODE) {
+            auto diffNode = std::dynamic_pointer_cast<DiffNode>(ast);
+            calculusType = "differentiation";
+            CompiledExpression body(diffNode->expression);
+            Calculus::differentiate(
+                [&](double x) {
+                    body.setVariable(diffNode->variable, x);
+                    return body.evaluate();
+                },
+                diffNode->point, 
+                calculusSteps
+            );
+        } else if (ast->type == ASTNodeType::INTEGRATE_NODE) {
+            auto intNode = std::dynamic_pointer_cast<IntegrateNode>(ast);
+            calculusType = "integration";
+            CompiledExpression body(intNode->expression);
+            Calculus::integrateTrapezoid(
+                [&](double x) {
+                    body.setVariable(intNode->variable, x);
+                    return body.evaluate();
+                },
+                intNode->lowerBound, 
+                intNode->upperBound, 
+                calculusSteps
+            );
+        }
+        
+        // Generate JSON output
+        out << "{";
+        out << "\"success\":true,";
+        out << "\"expression\":\"" << escapeJSON(expression) << "\",";
+        out << "\"tokens\":" << tokensToJSON(tokens) << ",";
+        out << "\"postfix\":" << tokensToJSON(parser.postfixTokens) << ",";
+        out << "\"operatorStack\":[";
+        for (size_t i = 0; i < parser.operatorStack.size(); i++) {
+            if (i > 0) out << ",";
+            out << "\"" << escapeJSON(parser.operatorStack[i]) << "\"";
+        }
+        out << "],";
+        out << "\"ast\":" << astToJSON(ast) << ",";
+        out << "\"intermediateCode\":" << intermediateCodeToJSON(intermediateCode) << ",";
+        out << "\"result\":" << result << ",";
+        out << "\"calculusType\":\"" << calculusType << "\",";
+        out << "\"calculusSteps\":" << calculusStepsToJSON(calculusSteps);
+        out << "}" << std::endl;
+        
+        return 0;
+        
+        
+    } catch (const std::exception& e) {
+        err << "{\"success\":false,\"error\":\"" << escapeJSON(e.what()) << "\"}" << std::endl;
+        return 1;
+    }
+}
+
+// Copies a document into a malloc'd buffer the caller releases with sec_free
+static char* copyDocument(const std::string& document) {
+    char* buffer = static_cast<char*>(std::malloc(document.size() + 1));
+    if (buffer) {
+        std::memcpy(buffer, document.c_str(), document.size() + 1);
+    }
+    return buffer;
+}
+
+extern "C" int sec_compile(const char* expression, int flags, char** json_out) {
+    // No C++ exception may cross the C ABI
+    try {
+        std::ostringstream out;
+        std::ostringstream err;
+        int status = compileExpression(expression ? expression : "", (flags & SEC_AST_ONLY) != 0, out, err);
+        *json_out = copyDocument(status == 0 ? out.str() : err.str());
+        return *json_out ? status : -1;
+    } catch (const std::bad_alloc&) {
+        *json_out = nullptr;
+        return -1;
+    } catch (...) {
+        *json_out = copyDocument("{\"success\":false,\"error\":\"Internal engine error\"}");
+        return *json_out ? 1 : -1;
+    }
+}
+
+extern "C" void sec_free(char* json) {
+    std::free(json);
+}
+
+extern "C" int sec_abi_version() {
+    return 1;
+}
@@ -0,0 +1,28 @@
+#ifndef ENGINE_H
+#define ENGINE_H
+
+#include <ostream>
+#include <string>
+
+// Runs the whole pipeline on one expression and writes the JSON document
+// to out (success) or err (failure). Returns the process exit code: 0 or 1.
+int compileExpression(const std::string& expression, bool astOnly,
+                      std::ostream& out, std::ostream& err);
+
+// Stable C ABI for loading the engine as a shared library
+#define SEC_AST_ONLY 1
+
+extern "C" {
+    // Compiles a NUL-terminated UTF-8 expression. *json_out receives a
+    // NUL-terminated JSON document owned by the caller (free it with
+    // sec_free): the result when 0 is returned, the error when 1 is
+    // returned. Returns -1 without output if memory runs out. Never throws.
+    int sec_compile(const char* expression, int flags, char** json_out);
+
+    void sec_free(char* json);
+
+    // Version of the C ABI; bumped on incompatible changes
+    int sec_abi_version();
+}
+
+#endif // ENGINE_H
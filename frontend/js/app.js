@@ -5,6 +5,7 @@ const API_BASE_URL = "http://localhost:5000";
 // Set example expression
 function setExample(expr) {
   document.getElementById("expressionInput").value = expr;
+  sendLiveInput();
 }
 
 // Main compilation function
@@ -42,6 +43,68 @@ async function compileExpression() {
   }
 }
 
+// Live preview: results arrive on one server-sent event stream per page,
+// and every keystroke supersedes (and cancels) the previous input's compile
+const LIVE_API = `${API_BASE_URL}/api/live`;
+let liveSession = null;
+let liveSource = null;
+let liveSeq = 0;
+
+function toggleLivePreview(enabled) {
+  if (!enabled) {
+    if (liveSource) {
+      liveSource.close();
+    }
+    liveSource = null;
+    return;
+  }
+
+  liveSession =
+    liveSession ||
+    (window.crypto && crypto.randomUUID
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+  liveSource = new EventSource(`${LIVE_API}/${liveSession}/events`);
+  liveSource.onmessage = (event) => {
+    const data = JSON.parse(event.data);
+    if (data.seq !== liveSeq) {
+      return; // Superseded by newer input
+    }
+    if (data.output.success) {
+      hideAllSections();
+      displayResults(data.output);
+    } else {
+      showError(data.output.error || "Compilation failed");
+    }
+  };
+  sendLiveInput();
+}
+
+async function sendLiveInput() {
+  if (!liveSource) {
+    return;
+  }
+  const input = document.getElementById("expressionInput").value.trim();
+  if (!input) {
+    return;
+  }
+
+  liveSeq += 1;
+  try {
+    await fetch(`${LIVE_API}/${liveSession}`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ expression: input, seq: liveSeq }),
+    });
+  } catch (error) {
+    showError(
+      `Network error: ${error.message}. Make sure the backend server is running.`,
+    );
+  }
+}
+
 // Display all compilation results
 function displayResults(data) {
   // Show result
@@ -200,7 +263,7 @@ function createCalculusChart(data) {
       yValues.push(closestStep.fx);
     }
 
-    window.calculusChartInstance = new Chart(ctx, {
+    const chart = new Chart(ctx, {
       type: "line",
       data: {
         labels: xValues.map((x) => x.toFixed(2)),
@@ -279,6 +342,32 @@ function createCalculusChart(data) {
         },
       },
     });
+    window.calculusChartInstance = chart;
+
+    // Replace the step approximation with the actual curve, sampled
+    // adaptively so steep sections and poles stay accurate
+    const args = splitCallArguments(data.expression || "");
+    if (args && args.length === 3 && data.ast && data.ast.variable) {
+      fetchAdaptiveCurve(
+        args[0],
+        data.ast.variable,
+        point - range / 2,
+        point + range / 2,
+        canvas.width,
+        canvas.height,
+      )
+        .then(({ points }) => {
+          if (window.calculusChartInstance !== chart) {
+            return; // A newer result replaced this chart
+          }
+          chart.data.labels = [];
+          chart.data.datasets[0].data = points;
+          chart.data.datasets[0].tension = 0;
+          chart.data.datasets[0].spanGaps = false;
+          chart.update();
+        })
+        .catch((err) => console.log(err));
+    }
   } else {
     // Integration: show function with area fill
     const labels = steps.map((s) => s.x.toFixed(3));
@@ -402,7 +491,7 @@ async function analyzeExpressionOptimization() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ expression: input }),
+        body: JSON.stringify({ expression: input, include_size: true }),
       },
     );
 
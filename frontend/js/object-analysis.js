@@ -1,6 +1,7 @@
 /* Object File Analysis Module */
 
 const ANALYSIS_API = "http://localhost:5000/api/analyze";
+const JOBS_API = "http://localhost:5000/api/jobs";
 
 // Global state for analysis data
 let currentAnalysisData = {
@@ -32,7 +33,21 @@ async function buildObjectFiles() {
       method: "POST",
     });
 
-    const data = await response.json();
+    let data = await response.json();
+
+    // Builds run in the background; long-poll the job until it finishes
+    while (data.success && data.job && !data.data) {
+      const progress = data.job.progress || [];
+      if (progress.length > 0) {
+        const last = progress[progress.length - 1];
+        showAnalysisStatus(
+          `Building object files... ${last.message} (${last.completed}/${last.total})`,
+          "info"
+        );
+      }
+      const jobResponse = await fetch(`${JOBS_API}/${data.job.id}?wait=10`);
+      data = await jobResponse.json();
+    }
 
     if (data.success) {
       const built = data.data.built || [];
@@ -230,4 +230,56 @@ function exploreNode(nodeData) {
   alert(JSON.stringify(nodeData, null, 2));
 }
 
+/* Adaptive function plotting */
+
+// Arguments of the outermost call in an expression, e.g. diff(x^2, x, 3)
+function splitCallArguments(expression) {
+  const open = expression.indexOf("(");
+  if (open < 0 || !expression.trim().endsWith(")")) {
+    return null;
+  }
+
+  const args = [];
+  let depth = 0;
+  let start = open + 1;
+  const end = expression.lastIndexOf(")");
+  for (let i = start; i < end; i++) {
+    const c = expression[i];
+    if (c === "(") depth++;
+    else if (c === ")") depth--;
+    else if (c === "," && depth === 0) {
+      args.push(expression.slice(start, i).trim());
+      start = i + 1;
+    }
+  }
+  args.push(expression.slice(start, end).trim());
+  return args;
+}
+
+// Sample a curve on the server, refined where it bends, jumps or has gaps,
+// and return Chart.js points with null breaks between segments
+async function fetchAdaptiveCurve(expression, variable, xMin, xMax, width, height) {
+  const response = await fetch(`${API_BASE_URL}/api/plot`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({ expression, variable, xMin, xMax, width, height }),
+  });
+
+  const data = await response.json();
+  if (!data.success) {
+    throw new Error(data.error || "Plotting failed");
+  }
+
+  const points = [];
+  data.segments.forEach((segment, index) => {
+    if (index > 0) {
+      points.push({ x: segment[0][0], y: null });
+    }
+    segment.forEach(([x, y]) => points.push({ x, y }));
+  });
+  return { points, yRange: data.yRange };
+}
+
 console.log("Visualizer.js loaded successfully");